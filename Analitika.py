@@ -1,5 +1,13 @@
 import streamlit as st
-from config import get_supabase_client
+from config import get_supabase_client, get_supabase_pool_stats
+from data_cache import cached, clear_cache, cache_stats
+from persistence_queue import queue_stats
+from answer_cache import answer_cache_stats
+from chat_history import history_stats, session_memory
+from export import export_controls, iter_table_chunks
+from analytics_frame import QuestionFrame, UserFrame, overview as frame_overview
+from postgrest.exceptions import APIError
+from functools import wraps
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -7,16 +15,11 @@ from datetime import datetime, timedelta, date, timezone
 from AdminPanelLoginSystem import check_admin
 import numpy as np
 
-# Бет конфигурациясы
-st.set_page_config(
-    page_title="Аналитика Dashboard",
-    page_icon="📊",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
 # Custom CSS
-st.markdown("""
+def _inject_styles():
+    # Модуль процесте бір рет импортталады: модуль деңгейіндегі st.markdown тек
+    # бірінші көрсетуде шығатын, сондықтан стиль бет сайын қосылады
+    st.markdown("""
 <style>
     .main-header {
         font-size: 2.5rem;
@@ -64,152 +67,111 @@ st.markdown("""
         color: white;
     }
 </style>
-""", unsafe_allow_html=True)
+    """, unsafe_allow_html=True)
+
+# Жүктеушілердің TTL мәндері (секунд)
+OVERVIEW_TTL = 60
+AGGREGATE_TTL = 300
+ACTIVE_USERS_TTL = 120
+
+# Базада RPC/view әлі жоқ (database_setup.sql қайта іске қосылмаған) кездегі PostgREST кодтары
+MISSING_SCHEMA_CODES = {"PGRST202", "PGRST205", "42P01", "42883"}
+
+def frame_fallback(fallback):
+    """RPC/view жоқ болса, нәтижені бағаналық кадрдан есептеу (analytics_frame)"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except APIError as e:
+                if getattr(e, "code", None) not in MISSING_SCHEMA_CODES:
+                    raise
+                return fallback(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@cached("analytics.question_frame", AGGREGATE_TTL, tags=("questions",))
+def get_question_frame():
+    """Сұрақтардың уақыт/санат/пайдаланушы бағандары, бір рет талданған"""
+    return QuestionFrame.from_rows(list(iter_table_chunks("questions", "id, timestamp, category, username, user_id")))
 
-def get_total_users():
-    """Барлық пайдаланушыларды алу"""
-    try:
-        supabase = get_supabase_client()
-        response = supabase.table("users").select("*").execute()
-        return len(response.data), response.data
-    except Exception as e:
-        st.error(f"Қате: {e}")
-        return 0, []
+@cached("analytics.user_frame", AGGREGATE_TTL, tags=("users",))
+def get_user_frame():
+    """Пайдаланушылардың тіркелу уақыттары, бір рет талданған"""
+    return UserFrame.from_rows(list(iter_table_chunks("users", "id, created_at")))
 
-def get_total_questions():
-    """Барлық сұрақтарды алу"""
-    try:
-        supabase = get_supabase_client()
-        response = supabase.table("questions").select("*").execute()
-        return len(response.data), response.data
-    except Exception as e:
-        st.error(f"Қате: {e}")
-        return 0, []
+@cached("analytics.overview", OVERVIEW_TTL, tags=("questions", "users", "feedback"), default=dict)
+@frame_fallback(lambda: frame_overview(get_question_frame(), get_user_frame()))
+def get_statistics_overview():
+    """Жалпы көрсеткіштер (statistics_overview view-і, бір жол)"""
+    supabase = get_supabase_client()
+    response = supabase.table("statistics_overview").select("*").limit(1).execute()
+    return response.data[0] if response.data else {}
 
+@cached("analytics.recent_users", ACTIVE_USERS_TTL, tags=("users",), default=list)
+def get_recent_users(limit=20):
+    """Соңғы тіркелген пайдаланушылар"""
+    supabase = get_supabase_client()
+    response = supabase.table("users").select("username, email, created_at").order("created_at", desc=True).limit(limit).execute()
+    return response.data
+
+@cached("analytics.categories", AGGREGATE_TTL, tags=("questions",), default=dict)
+@frame_fallback(lambda: get_question_frame().category_counts())
 def get_questions_by_category():
     """Санаттар бойынша сұрақтар"""
-    try:
-        supabase = get_supabase_client()
-        response = supabase.table("questions").select("category").execute()
-        categories = {}
-        for item in response.data:
-            cat = item.get('category', 'Белгісіз')
-            categories[cat] = categories.get(cat, 0) + 1
-        return categories
-    except Exception:
-        return {}
+    supabase = get_supabase_client()
+    response = supabase.rpc("analytics_category_counts").execute()
+    return {item.get('category') or 'Белгісіз': item['total'] for item in response.data}
 
+@cached("analytics.daily", AGGREGATE_TTL, tags=("questions",), default=dict)
+@frame_fallback(lambda start_date, end_date: get_question_frame().daily_counts(start_date, end_date))
 def get_daily_statistics(start_date, end_date):
-    """Күнделікті статистика, күндер аралығы бойынша"""
-    try:
-        supabase = get_supabase_client()
-        response = supabase.table("questions").select("timestamp").gte('timestamp', start_date.isoformat()).lte('timestamp', end_date.isoformat()).execute()
-        
-        # Күндер бойынша топтау
-        daily_counts = {}
-        current_date = start_date
-        while current_date <= end_date:
-            date_str = current_date.strftime('%Y-%m-%d')
-            daily_counts[date_str] = 0
-            current_date += timedelta(days=1)
-        
-        for item in response.data:
-            try:
-                dt = datetime.fromisoformat(item['timestamp'].replace('Z', '+00:00'))
-                date_str = dt.strftime('%Y-%m-%d')
-                if date_str in daily_counts:
-                    daily_counts[date_str] += 1
-            except Exception:
-                continue
-        
-        return daily_counts
-    except Exception:
-        return {}
+    """Күнделікті статистика, күндер аралығы бойынша (daily_stats жиынтығынан)"""
+    supabase = get_supabase_client()
+    response = supabase.rpc("analytics_daily_questions", {
+        "p_start": start_date.isoformat(),
+        "p_end": end_date.isoformat()
+    }).execute()
+    return {item['day']: item['total'] for item in response.data}
 
+@cached("analytics.user_growth", AGGREGATE_TTL, tags=("users",), default=lambda: ({}, {}))
+@frame_fallback(lambda start_date, end_date: get_user_frame().growth(start_date, end_date))
 def get_user_growth(start_date, end_date):
     """Пайдаланушылардың өсу статистикасы"""
-    try:
-        supabase = get_supabase_client()
-        response = supabase.table("users").select("created_at").gte('created_at', start_date.isoformat()).lte('created_at', end_date.isoformat()).execute()
-        
-        daily_growth = {}
-        current_date = start_date
-        while current_date <= end_date:
-            date_str = current_date.strftime('%Y-%m-%d')
-            daily_growth[date_str] = 0
-            current_date += timedelta(days=1)
-        
-        for item in response.data:
-            try:
-                dt = datetime.fromisoformat(item['created_at'].replace('Z', '+00:00'))
-                date_str = dt.strftime('%Y-%m-%d')
-                if date_str in daily_growth:
-                    daily_growth[date_str] += 1
-            except Exception:
-                continue
-        
-        # Кумулятивті өсу
-        cumulative = {}
-        total = 0
-        for date_str in sorted(daily_growth.keys()):
-            total += daily_growth[date_str]
-            cumulative[date_str] = total
-        
-        return daily_growth, cumulative
-    except Exception:
-        return {}, {}
+    supabase = get_supabase_client()
+    response = supabase.rpc("analytics_user_growth", {
+        "p_start": start_date.isoformat(),
+        "p_end": end_date.isoformat()
+    }).execute()
+    
+    daily_growth = {item['day']: item['new_users'] for item in response.data}
+    cumulative = {item['day']: item['cumulative'] for item in response.data}
+    return daily_growth, cumulative
 
+@cached("analytics.top_users", AGGREGATE_TTL, tags=("questions",), default=list)
+@frame_fallback(lambda limit=10: get_question_frame().top_users(limit))
 def get_top_users(limit=10):
     """Ең белсенді пайдаланушылар"""
-    try:
-        supabase = get_supabase_client()
-        response = supabase.table("questions").select("user_id, username").execute()
-        user_counts = {}
-        for item in response.data:
-            user = item.get('username') or item.get('user_id', 'Белгісіз')
-            user_counts[user] = user_counts.get(user, 0) + 1
-        
-        sorted_users = sorted(user_counts.items(), key=lambda x: x[1], reverse=True)[:limit]
-        return sorted_users
-    except Exception:
-        return []
+    supabase = get_supabase_client()
+    response = supabase.rpc("analytics_top_users", {"p_limit": limit}).execute()
+    return [(item['username'], item['total']) for item in response.data]
 
+@cached("analytics.active_users", ACTIVE_USERS_TTL, tags=("questions",), default=int)
+@frame_fallback(lambda days=7: get_question_frame().active_users(datetime.now(timezone.utc) - timedelta(days=days)))
 def get_active_users(days=7):
     """Соңғы күндердегі белсенді пайдаланушылар"""
-    try:
-        start_date = datetime.now(tz=timezone.utc) - timedelta(days=days)
-        supabase = get_supabase_client()
-        response = supabase.table("questions").select("user_id, username, timestamp").gte('timestamp', start_date.isoformat()).execute()
-        
-        unique_users = set()
-        for item in response.data:
-            user = item.get('username') or item.get('user_id')
-            if user:
-                unique_users.add(user)
-        
-        return len(unique_users)
-    except Exception:
-        return 0
+    supabase = get_supabase_client()
+    response = supabase.rpc("analytics_active_users", {"p_days": days}).execute()
+    return int(response.data or 0)
 
+@cached("analytics.hourly", AGGREGATE_TTL, tags=("questions",), default=dict)
+@frame_fallback(lambda: get_question_frame().hourly())
 def get_hourly_distribution():
     """Сағат бойынша үлестірім"""
-    try:
-        supabase = get_supabase_client()
-        response = supabase.table("questions").select("timestamp").execute()
-        
-        hourly_counts = {i: 0 for i in range(24)}
-        
-        for item in response.data:
-            try:
-                dt = datetime.fromisoformat(item['timestamp'].replace('Z', '+00:00'))
-                hour = dt.hour
-                hourly_counts[hour] += 1
-            except Exception:
-                continue
-        
-        return hourly_counts
-    except Exception:
-        return {}
+    supabase = get_supabase_client()
+    response = supabase.rpc("analytics_hourly_distribution").execute()
+    return {item['hour']: item['total'] for item in response.data}
 
 def create_gauge_chart(value, max_value, title):
     """Gauge chart жасау"""
@@ -248,6 +210,8 @@ def analitika_page():
         st.info("Жүйеге админ ретінде кіріңіз")
         return
     
+    _inject_styles()
+
     # Тақырып
     st.markdown('<h1 class="main-header">📊 Жүйе аналитикасы - Толықтандырылған Dashboard</h1>', unsafe_allow_html=True)
     
@@ -280,15 +244,72 @@ def analitika_page():
         st.divider()
         
         if st.button("🔄 Деректерді жаңарту", use_container_width=True):
+            clear_cache()
             st.rerun()
+
+        with st.expander("🐞 Кэш статистикасы"):
+            stats = cache_stats()
+            if stats:
+                hits = sum(row['hits'] for row in stats)
+                lookups = hits + sum(row['misses'] for row in stats)
+                st.metric("Hit үлесі", f"{hits / lookups * 100:.1f}%" if lookups else "—")
+                st.dataframe(pd.DataFrame(stats), use_container_width=True, hide_index=True)
+            else:
+                st.caption("Кэш әлі бос")
+
+        with st.expander("🔌 Supabase пулы"):
+            pool = get_supabase_pool_stats()
+            st.metric("Қайта пайдалану үлесі", f"{pool['reuse_ratio'] * 100:.1f}%")
+            st.write(f"Клиент жасалды: **{pool['created']}** / шақырулар: **{pool['requests']}**")
+            st.write(f"Ашық қосылыстар: **{pool['open_connections'] if pool['open_connections'] is not None else '—'}**")
+            st.write(f"Бос қосылыстар: **{pool['idle_connections'] if pool['idle_connections'] is not None else '—'}**")
+            st.caption(f"Пул өлшемі: {pool['pool_size']} · Денсаулық тексерісі: {pool['health_checks']} (қате: {pool['health_failures']})")
+
+        with st.expander("📮 Жазу кезегі"):
+            queue = queue_stats()
+            st.metric("Кезек тереңдігі", queue['depth'])
+            st.write(f"Жазылды: **{queue['flushed']}** / кезекке қойылды: **{queue['enqueued']}**")
+            st.write(f"Flush кідірісі p50/p95: **{queue['flush_p50_ms'] or '—'}** / **{queue['flush_p95_ms'] or '—'}** мс")
+            st.caption(f"Партиялар: {queue['batches']} (қате: {queue['failed_batches']}) · Қайталау: {queue['retries']} · "
+                       f"Журналға: {queue['journaled']} · Журналдан: {queue['replayed']} · "
+                       f"Dead-letter: {queue['dead_lettered']} · Жоғалды: {queue['lost']}")
+            if queue['last_error']:
+                st.caption(f"Соңғы қате: {queue['last_error']}")
+
+        with st.expander("💡 Жауаптар кэші"):
+            answers = answer_cache_stats()
+            st.metric("Hit ratio", f"{answers['hit_ratio']:.0%}", f"барлық сұрақтан {answers['served_ratio']:.0%}")
+            st.write(f"Дәл: **{answers['exact_hits']}** / ұқсас: **{answers['semantic_hits']}** / өткізілді: **{answers['misses']}**")
+            st.write(f"Чат ішінде ({answers['context_policy']}): кэштен **{answers['context_hits']}** / "
+                     f"ізделді **{answers['context_lookups']}** · жалғасты сұрақ (кэшсіз): **{answers['follow_ups']}**")
+            st.write(f"Үнемделген токендер: **{answers['saved_tokens']}** · уақыт: **{answers['saved_ms'] / 1000:.1f}** с")
+            st.write(f"Іздеу p50/p95: **{answers['lookup_p50_ms'] or '—'}** / **{answers['lookup_p95_ms'] or '—'}** мс")
+            st.caption(f"Жазбалар: {answers['entries'] if answers['entries'] is not None else '—'} · "
+                       f"Шығарылды: {answers['evicted']} · Санаттар: {', '.join(answers['categories']) or '—'} · "
+                       f"Semantic: {'қосулы' if answers['semantic'] else 'өшірулі'}")
+            if answers['last_error']:
+                st.caption(f"Соңғы қате: {answers['last_error']}")
+
+        with st.expander("🗂️ Чат тарихы жады"):
+            histories = history_stats()
+            st.metric("Барлық тарихтар", f"{histories['bytes'] / 1024:.0f} КБ", f"{histories['histories']} чат")
+            st.write(f"Жадта: **{histories['messages']}** хабарлама · қайта жүктелген: **{histories['rehydrated']}** · "
+                     f"терезеден шыққан: **{histories['dropped']}**")
+            st.write(f"Бір чатқа орташа/ең көп: **{histories['avg_bytes'] / 1024:.1f}** / **{histories['max_bytes'] / 1024:.1f}** КБ")
+            own = session_memory()
+            st.caption(f"Терезе: {histories['window']} хабарлама · Осы сессия: "
+                       f"{sum(own.values()) / 1024:.1f} КБ ({', '.join(own) or '—'})")
     
     # Деректерді жүктеу
     with st.spinner('Деректер жүктелуде...'):
-        total_users, users_data = get_total_users()
-        total_questions, questions_data = get_total_questions()
+        overview = get_statistics_overview()
+        if not overview:
+            st.error("Қате: жалпы статистиканы жүктеу мүмкін болмады")
         categories = get_questions_by_category()
-        active_users_7d = get_active_users(7)
-        active_users_30d = get_active_users(30)
+        total_users = overview.get('total_users', 0)
+        total_questions = overview.get('total_questions', 0)
+        active_users_7d = overview.get('active_users_7d', 0)
+        active_users_30d = overview.get('active_users_30d', 0)
     
     # Табтар
     tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
@@ -308,7 +329,7 @@ def analitika_page():
         col1, col2, col3, col4, col5 = st.columns(5)
         
         with col1:
-            new_users_7d = len([u for u in users_data if (datetime.now(tz=timezone.utc) - datetime.fromisoformat(u.get('created_at', datetime.now(tz=timezone.utc).isoformat()).replace('Z', '+00:00'))).days <= 7])
+            new_users_7d = overview.get('new_users_7d', 0)
             st.metric(
                 "👥 Барлық пайдаланушылар",
                 f"{total_users:,}",
@@ -317,7 +338,7 @@ def analitika_page():
             )
         
         with col2:
-            today_questions = len([q for q in questions_data if q.get('timestamp', '').startswith(datetime.now(tz=timezone.utc).strftime('%Y-%m-%d'))])
+            today_questions = overview.get('questions_today', 0)
             st.metric(
                 "❓ Барлық сұрақтар",
                 f"{total_questions:,}",
@@ -335,8 +356,7 @@ def analitika_page():
             )
         
         with col4:
-            unique_dates = set([q.get('timestamp', '')[:10] for q in questions_data if q.get('timestamp')])
-            avg_daily_questions = round(total_questions / max(len(unique_dates), 1), 1)
+            avg_daily_questions = round(total_questions / max(overview.get('active_days', 0), 1), 1)
             percent_change = round((today_questions / avg_daily_questions - 1) * 100, 1) if avg_daily_questions > 0 else 0
             st.metric(
                 "📅 Бүгінгі сұрақтар",
@@ -374,32 +394,24 @@ def analitika_page():
         with col2:
             st.markdown('<div class="info-card">', unsafe_allow_html=True)
             st.subheader("📊 Сұрақтар статистикасы")
-            if questions_data:
-                last_7_days = [q for q in questions_data if (datetime.now(tz=timezone.utc) - datetime.fromisoformat(q.get('timestamp', datetime.now(tz=timezone.utc).isoformat()).replace('Z', '+00:00'))).days <= 7]
-                st.metric("Соңғы 7 күн", len(last_7_days))
+            if total_questions:
+                st.metric("Соңғы 7 күн", overview.get('questions_7d', 0))
                 
-                last_30_days = [q for q in questions_data if (datetime.now(tz=timezone.utc) - datetime.fromisoformat(q.get('timestamp', datetime.now(tz=timezone.utc).isoformat()).replace('Z', '+00:00'))).days <= 30]
-                st.metric("Соңғы 30 күн", len(last_30_days))
+                last_30_days = overview.get('questions_30d', 0)
+                st.metric("Соңғы 30 күн", last_30_days)
                 
-                avg_daily = round(len(last_30_days) / 30, 1)
+                avg_daily = round(last_30_days / 30, 1)
                 st.metric("Орташа күніне", avg_daily)
             st.markdown('</div>', unsafe_allow_html=True)
         
         with col3:
             st.markdown('<div class="info-card">', unsafe_allow_html=True)
             st.subheader("🏆 Рекордтар")
-            if questions_data:
-                dates_count = {}
-                for q in questions_data:
-                    date_str = q.get('timestamp', '')[:10]
-                    dates_count[date_str] = dates_count.get(date_str, 0) + 1
+            if total_questions and overview.get('busiest_day'):
+                st.metric("Ең белсенді күн", overview['busiest_day'])
+                st.metric("Сұрақтар саны", overview.get('busiest_day_count', 0))
                 
-                if dates_count:
-                    max_day = max(dates_count.items(), key=lambda x: x[1])
-                    st.metric("Ең белсенді күн", max_day[0])
-                    st.metric("Сұрақтар саны", max_day[1])
-                    
-                    st.metric("Санаттар саны", len(categories))
+                st.metric("Санаттар саны", len(categories))
             st.markdown('</div>', unsafe_allow_html=True)
         
         st.divider()
@@ -474,9 +486,9 @@ def analitika_page():
             # Санаттар бойынша детальды кесте
             st.subheader("📋 Санаттар детальды статистикасы")
             
-            min_timestamp = min([q.get('timestamp', datetime.now(tz=timezone.utc).isoformat()) for q in questions_data], default=datetime.now(tz=timezone.utc).isoformat())
-            min_dt = datetime.fromisoformat(min_timestamp.replace('Z', '+00:00'))
-            days_since_min = max((datetime.now(tz=timezone.utc) - min_dt).days, 1)
+            min_timestamp = overview.get('first_question_at') or datetime.now(tz=timezone.utc).isoformat()
+            min_dt = pd.Timestamp(min_timestamp)
+            days_since_min = max((pd.Timestamp.now(tz='UTC') - min_dt).days, 1)
             
             cat_df = pd.DataFrame([
                 {
@@ -686,9 +698,12 @@ def analitika_page():
         
         with col2:
             # Соңғы тіркелгендер
+            st.metric(f"🟢 Соңғы {period_days} күндегі белсенді", get_active_users(period_days))
+            
             st.subheader("🕒 Соңғы тіркелген пайдаланушылар")
-            if users_data:
-                users_df = pd.DataFrame(users_data)
+            recent_users = get_recent_users(20)
+            if recent_users:
+                users_df = pd.DataFrame(recent_users)
                 if 'created_at' in users_df.columns:
                     users_df['created_at'] = pd.to_datetime(users_df['created_at'])
                     users_df = users_df.sort_values('created_at', ascending=False)
@@ -790,35 +805,27 @@ def analitika_page():
         
         with col1:
             st.subheader("👥 Пайдаланушылар")
-            if st.button("CSV экспорт", key="export_users", use_container_width=True):
-                if users_data:
-                    df = pd.DataFrame(users_data)
-                    csv = df.to_csv(index=False).encode('utf-8-sig')
-                    st.download_button(
-                        "📥 Жүктеу",
-                        csv,
-                        f"users_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
-                        "text/csv",
-                        use_container_width=True
-                    )
-                else:
-                    st.warning("Деректер жоқ")
+            export_controls(
+                "export_users", "users",
+                lambda start, end, limit: iter_table_chunks(
+                    "users", "id, username, email, created_at, last_login, is_active",
+                    "created_at", start, end, limit,
+                ),
+                total=total_users,
+            )
         
         with col2:
             st.subheader("❓ Сұрақтар")
-            if st.button("CSV экспорт", key="export_questions", use_container_width=True):
-                if questions_data:
-                    df = pd.DataFrame(questions_data)
-                    csv = df.to_csv(index=False).encode('utf-8-sig')
-                    st.download_button(
-                        "📥 Жүктеу",
-                        csv,
-                        f"questions_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
-                        "text/csv",
-                        use_container_width=True
-                    )
-                else:
-                    st.warning("Деректер жоқ")
+            export_controls(
+                "export_questions", "questions",
+                lambda start, end, limit: iter_table_chunks(
+                    "questions",
+                    "id, user_id, username, question, answer, category, timestamp, is_answered, answer_quality",
+                    "timestamp", start, end, limit,
+                    apply_filters=lambda query: query.is_("deleted_at", "null"),
+                ),
+                total=overview.get('total_questions'),
+            )
         
         with col3:
             st.subheader("🗂️ Санаттар")
@@ -841,4 +848,10 @@ def analitika_page():
         st.info("ℹ️ Экспортталған файлдар UTF-8 кодтауда, Excel-де ашу үшін 'Data' > 'From Text/CSV' қолданыңыз.")
 
 if __name__ == "__main__":
+    st.set_page_config(
+        page_title="Аналитика Dashboard",
+        page_icon="📊",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
     analitika_page()
\ No newline at end of file
@@ -1,5 +1,6 @@
 import streamlit as st
 from config import FEEDBACK_FORM_URL, get_supabase_client
+from data_cache import invalidate
 from datetime import datetime
 
 def save_feedback(user_id, username, rating, feedback_text, suggestions):
@@ -14,6 +15,7 @@ def save_feedback(user_id, username, rating, feedback_text, suggestions):
             "suggestions": suggestions,
             "timestamp": datetime.now().isoformat()
         }).execute()
+        invalidate("feedback")
         return True
     except Exception as e:
         st.error(f"Сақтау қатесі: {str(e)}")
@@ -1,77 +1,124 @@
 import streamlit as st
-from openai import OpenAI
-from config import OPENAI_API_KEY, get_supabase_client
+from config import LLM_STREAMING
+from persistence_queue import enqueue
+import answer_cache
+import chat_context
+import chat_view
+from chat_history import session_history
+from keyword_matcher import KeywordMatcher
 from datetime import datetime
 
-# -------------------- CONFIG --------------------
+# -------------------- HELPERS --------------------
 
-st.set_page_config(
-    page_title="Дәрі-дәрмек чаты",
-    page_icon="💊",
-    layout="centered"
-)
+MEDICATION_KEYWORDS = [
+    "дәрі", "таблетка", "препарат", "капсула", "дәрмек",
+    "доза", "қабылдау", "жанама әсер",
+    "medicine", "drug", "pill", "medication"
+]
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+MEDICATION_MATCHER = KeywordMatcher(MEDICATION_KEYWORDS)
 
-# -------------------- HELPERS --------------------
 
 def is_medication_question(question: str) -> bool:
     """Дәрі-дәрмекке қатысты ма екенін тексеру"""
-    keywords = [
-        "дәрі", "таблетка", "препарат", "капсула", "дәрмек",
-        "доза", "қабылдау", "жанама әсер",
-        "medicine", "drug", "pill", "medication"
-    ]
-    q = question.lower()
-    return any(word in q for word in keywords)
+    return MEDICATION_MATCHER.contains(question)
+
+
+MEDICATION_SYSTEM_PROMPT = (
+    "Сіз дәрі-дәрмек туралы ақпарат беретін көмекшісіз.\n"
+    "ТЕК жалпы ақпарат беріңіз, диагноз қоймаңыз.\n\n"
+    "Құрылым:\n"
+    "1. 💊 Дәрінің атауы\n"
+    "2. 📌 Қолданылуы\n"
+    "3. 🕒 Қабылдау тәртібі (жалпы)\n"
+    "4. ⚠️ Қарсы көрсетілімдер\n"
+    "5. 🤒 Жанама әсерлер\n\n"
+    "Әрқашан: «Дәрігермен кеңесіңіз» деп ескертіңіз.\n"
+    "Жауапты қазақ тілінде беріңіз."
+)
 
 
-def get_medication_info(question: str) -> str:
+def get_medication_info(question: str, context=None) -> str:
     """Дәрі туралы қауіпсіз ақпарат"""
-    system_prompt = (
-        "Сіз дәрі-дәрмек туралы ақпарат беретін көмекшісіз.\n"
-        "ТЕК жалпы ақпарат беріңіз, диагноз қоймаңыз.\n\n"
-        "Құрылым:\n"
-        "1. 💊 Дәрінің атауы\n"
-        "2. 📌 Қолданылуы\n"
-        "3. 🕒 Қабылдау тәртібі (жалпы)\n"
-        "4. ⚠️ Қарсы көрсетілімдер\n"
-        "5. 🤒 Жанама әсерлер\n\n"
-        "Әрқашан: «Дәрігермен кеңесіңіз» деп ескертіңіз.\n"
-        "Жауапты қазақ тілінде беріңіз."
-    )
-
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": question},
-            ],
-            temperature=0.5,
-            max_tokens=1000,
-        )
-        return response.choices[0].message.content
+        return answer_cache.complete("medication", "gpt-4o", MEDICATION_SYSTEM_PROMPT, question,
+                                     temperature=0.5, max_tokens=1000, context=context)
     except Exception as e:
         return f"Қате орын алды: {str(e)}"
 
 
-def save_medication_query(user_id, question, answer):
-    """Supabase-ке сақтау"""
+def stream_medication_info(question: str, context=None):
+    """Дәрі туралы ақпаратты токендер келген сайын беру (stream)"""
     try:
-        supabase = get_supabase_client()
-        supabase.table("questions").insert({
-            "user_id": user_id,
-            "question": question,
-            "answer": answer,
-            "category": "medication",
-            "timestamp": datetime.now().isoformat(),
-        }).execute()
+        yield from answer_cache.stream("medication", "gpt-4o", MEDICATION_SYSTEM_PROMPT, question,
+                                       temperature=0.5, max_tokens=1000, context=context)
     except Exception as e:
-        st.error(f"Сақтау қатесі: {str(e)}")
+        yield f"Қате орын алды: {str(e)}"
+
+
+def save_medication_query(user_id, question, answer):
+    """Supabase-ке сақтау (фондық кезек арқылы)"""
+    enqueue("questions", {
+        "user_id": user_id,
+        "question": question,
+        "answer": answer,
+        "category": "medication",
+        "timestamp": datetime.now().isoformat(),
+    })
 
 # -------------------- UI PAGE --------------------
 
+@st.fragment
+def medication_chat():
+    """Тарих + енгізу: хабарлама жібергенде тек осы бөлік қайта орындалады"""
+    chat_view.render_history("medication", st.session_state.med_chat)
+
+    # Chat input
+    user_question = st.chat_input("Мысалы: Парацетамол не үшін қолданылады?")
+
+    if user_question:
+        # User message
+        st.session_state.med_chat.append("user", user_question)
+
+        with st.chat_message("user"):
+            st.write(user_question)
+
+        # Validation
+        if not is_medication_question(user_question):
+            warning = "⚠️ Тек дәрі-дәрмек туралы сұрақ қойыңыз."
+            st.session_state.med_chat.reject_last(warning)
+            with st.chat_message("assistant"):
+                st.warning(warning)
+            return
+
+        # Алдыңғы айналымдар (токен бюджеті шегінде)
+        history = st.session_state.med_chat
+        context = chat_context.build_context("medication", history[:-1], offset=history.dropped)
+
+        # AI response
+        if LLM_STREAMING:
+            with st.chat_message("assistant"):
+                answer = st.write_stream(stream_medication_info(user_question, context))
+                st.info("⚕️ Бұл диагноз емес. Дәрігермен кеңесіңіз.")
+        else:
+            with st.spinner("💊 Ақпарат дайындалуда..."):
+                answer = get_medication_info(user_question, context)
+
+            with st.chat_message("assistant"):
+                st.write(answer)
+                st.info("⚕️ Бұл диагноз емес. Дәрігермен кеңесіңіз.")
+
+        st.session_state.med_chat.append("assistant", answer)
+
+        # Save
+        if "user_id" in st.session_state:
+            save_medication_query(
+                st.session_state.user_id,
+                user_question,
+                answer
+            )
+
+
 def daridarmek_page():
     st.title("💊 Дәрі-дәрмек чаты")
     st.caption("Бұл сервис дәрігерді алмастырмайды ⚠️")
@@ -88,7 +135,8 @@ def daridarmek_page():
             """
         )
         if st.button("🗑️ Чатты тазалау"):
-            st.session_state.med_chat = []
+            session_history("med_chat", "medication").clear()
+            chat_context.reset_context("medication")
 
     # Disclaimer
     if "accepted_med_disclaimer" not in st.session_state:
@@ -104,57 +152,9 @@ def daridarmek_page():
         return
 
     # Chat history
-    if "med_chat" not in st.session_state:
-        st.session_state.med_chat = []
-
-    for msg in st.session_state.med_chat:
-        with st.chat_message(msg["role"]):
-            st.write(msg["content"])
-
-    # Chat input
-    user_question = st.chat_input("Мысалы: Парацетамол не үшін қолданылады?")
-
-    if user_question:
-        # User message
-        st.session_state.med_chat.append({
-            "role": "user",
-            "content": user_question
-        })
+    session_history("med_chat", "medication")
 
-        with st.chat_message("user"):
-            st.write(user_question)
-
-        # Validation
-        if not is_medication_question(user_question):
-            warning = "⚠️ Тек дәрі-дәрмек туралы сұрақ қойыңыз."
-            st.session_state.med_chat.append({
-                "role": "assistant",
-                "content": warning
-            })
-            with st.chat_message("assistant"):
-                st.warning(warning)
-            return
-
-        # AI response
-        with st.spinner("💊 Ақпарат дайындалуда..."):
-            answer = get_medication_info(user_question)
-
-        st.session_state.med_chat.append({
-            "role": "assistant",
-            "content": answer
-        })
-
-        with st.chat_message("assistant"):
-            st.write(answer)
-            st.info("⚕️ Бұл диагноз емес. Дәрігермен кеңесіңіз.")
-
-        # Save
-        if "user_id" in st.session_state:
-            save_medication_query(
-                st.session_state.user_id,
-                user_question,
-                answer
-            )
+    medication_chat()
 
     # FAQ
     with st.expander("❓ Жиі қойылатын сұрақтар"):
@@ -1,18 +1,78 @@
 import streamlit as st
 from config import get_supabase_client
-import pandas as pd
+from persistence_queue import flush
+from export import export_controls, iter_table_chunks
+from bulk_ops import soft_delete, undo, make_undo, undo_seconds_left, user_question_ids
 from datetime import datetime
 
-def get_user_questions(user_id):
-    """Пайдаланушының сұрақтарын алу"""
+PAGE_SIZE = 20
+SEARCH_LIMIT = 50
+
+CATEGORY_MAP = {
+    "Медициналық": "medical",
+    "Дәрі-дәрмек": "medication",
+    "Психология": "psychology",
+}
+
+
+def get_user_questions_page(user_id, category=None, cursor=None, limit=PAGE_SIZE):
+    """Бір бет сұрақ (жауапсыз), keyset курсоры = (timestamp, id)"""
     try:
         supabase = get_supabase_client()
-        response = supabase.table("questions").select("*").eq("user_id", user_id).order("timestamp", desc=True).execute()
-        return response.data
+        before_ts, before_id = cursor if cursor else (None, None)
+        response = supabase.rpc("user_questions_page", {
+            "p_user_id": user_id,
+            "p_category": category,
+            "p_before_ts": before_ts,
+            "p_before_id": before_id,
+            "p_limit": limit,
+        }).execute()
+        return response.data or []
     except Exception as e:
         st.error(f"Деректерді алу қатесі: {str(e)}")
         return []
 
+def search_user_questions(user_id, query, category=None, limit=SEARCH_LIMIT):
+    """Толық мәтінді іздеу: рейтинг бойынша, ерекшеленген үзіндімен"""
+    try:
+        supabase = get_supabase_client()
+        response = supabase.rpc("search_questions", {
+            "p_query": query,
+            "p_user_id": user_id,
+            "p_category": category,
+            "p_limit": limit,
+        }).execute()
+        return response.data or []
+    except Exception as e:
+        st.error(f"Іздеу қатесі: {str(e)}")
+        return []
+
+def get_user_question_counts(user_id):
+    """Санат бойынша сұрақ саны (серверде есептеледі)"""
+    try:
+        supabase = get_supabase_client()
+        response = supabase.rpc("user_question_counts", {"p_user_id": user_id}).execute()
+        return {row['category']: row['total'] for row in response.data or []}
+    except Exception as e:
+        st.error(f"Статистиканы алу қатесі: {str(e)}")
+        return {}
+
+def get_answer(user_id, question_id):
+    """Бір сұрақтың жауабын жүктеу (expander ішінде сұралғанда)"""
+    answers = st.session_state.setdefault('history_answers', {})
+    if question_id not in answers:
+        supabase = get_supabase_client()
+        response = supabase.table("questions").select("answer").eq("id", question_id).eq("user_id", user_id).limit(1).execute()
+        answers[question_id] = response.data[0]['answer'] if response.data else ""
+    return answers[question_id]
+
+def history_filters(user_id, category=None):
+    """Экспорт сұранысына пайдаланушы/санат сүзгілерін қосу"""
+    def apply(query):
+        query = query.eq("user_id", user_id).is_("deleted_at", "null")
+        return query.eq("category", category) if category else query
+    return apply
+
 def format_timestamp(timestamp_str):
     """Уақытты форматтау"""
     try:
@@ -21,6 +81,43 @@ def format_timestamp(timestamp_str):
     except:
         return timestamp_str
 
+def history_sidebar(user_id):
+    """Тарихты тазалау: бөліктермен жұмсақ өшіру, қайтару терезесімен"""
+    with st.sidebar:
+        st.header("⚙️ Параметрлер")
+        confirm = st.checkbox("Растаймын")
+        if st.button("🗑️ Тарихты тазалау", type="secondary", disabled=not confirm):
+            try:
+                # Кезекте қалған жолдар өшіруден кейін қайта пайда болмауы үшін
+                flush(timeout=5.0)
+                ids = user_question_ids(user_id)
+                bar = st.progress(0.0)
+                # Қайтару терезесі бірінші бөліктен бұрын басталады (deleted_at-пен бірге)
+                record = make_undo("delete", ids)
+                soft_delete(ids, progress=lambda n, total: bar.progress(n / total), user_id=user_id)
+                st.session_state.history_undo = record
+                st.session_state.pop('history_answers', None)
+                st.session_state.pop('history_filters', None)
+                st.success("Тарих тазаланды!")
+                st.rerun()
+            except Exception as e:
+                st.error(f"Қате: {str(e)}")
+
+        record = st.session_state.get('history_undo')
+        seconds = undo_seconds_left(record)
+        if seconds:
+            st.info(f"{len(record['ids'])} сұрақ өшірілді. Қайтаруға {seconds // 60}:{seconds % 60:02d} қалды.")
+            if st.button("↩️ Тарихты қайтару"):
+                try:
+                    undo(record, user_id=user_id)
+                    st.session_state.pop('history_undo', None)
+                    st.session_state.pop('history_filters', None)
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Қате: {str(e)}")
+        else:
+            st.session_state.pop('history_undo', None)
+
 def datasurak_page():
     st.title("📚 Менің сұрақтарым")
     st.write("Сіздің сұрақтар тарихыңыз")
@@ -29,55 +126,64 @@ def datasurak_page():
         st.warning("Тарихты көру үшін жүйеге кіріңіз.")
         return
     
-    # Пайдаланушы сұрақтарын алу
-    questions = get_user_questions(st.session_state.user_id)
-    
-    if not questions:
+    # Кезектегі соңғы жауаптар тарихта көрінуі үшін
+    flush(timeout=3.0)
+
+    user_id = st.session_state.user_id
+    history_sidebar(user_id)
+
+    # Статистика
+    counts = get_user_question_counts(user_id)
+    total = sum(counts.values())
+    if not total:
         st.info("Әлі сұрақтар жоқ. Сұрақ қоюды бастаңыз!")
         return
-    
-    # Статистика
+
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Барлығы сұрақтар", len(questions))
+        st.metric("Барлығы сұрақтар", total)
     with col2:
-        medical_count = len([q for q in questions if q.get('category') == 'medical'])
-        st.metric("Медициналық", medical_count)
+        st.metric("Медициналық", counts.get('medical', 0))
     with col3:
-        medication_count = len([q for q in questions if q.get('category') == 'medication'])
-        st.metric("Дәрі туралы", medication_count)
+        st.metric("Дәрі туралы", counts.get('medication', 0))
     
     st.divider()
     
     # Фильтрация
-    categories = ["Барлығы", "Медициналық", "Дәрі-дәрмек", "Психология"]
+    categories = ["Барлығы"] + list(CATEGORY_MAP)
     selected_category = st.selectbox("Санат бойынша сүзу:", categories)
+    category = CATEGORY_MAP.get(selected_category)
     
     # Іздеу
-    search_query = st.text_input("🔍 Іздеу:", placeholder="Сұрақта не жауапта іздеу...")
-    
-    # Сұрақтарды фильтрлеу
-    filtered_questions = questions
-    
-    if selected_category != "Барлығы":
-        category_map = {
-            "Медициналық": "medical",
-            "Дәрі-дәрмек": "medication",
-            "Психология": "psychology"
-        }
-        filtered_questions = [q for q in questions if q.get('category') == category_map.get(selected_category)]
-    
+    search_query = st.text_input("🔍 Іздеу:", placeholder="Сұрақта не жауапта іздеу...").strip()
+
+    # Сүзгі өзгерсе, бірінші бетке қайту
+    filters = (category, search_query)
+    if st.session_state.get('history_filters') != filters:
+        st.session_state.history_filters = filters
+        st.session_state.history_cursors = [None]
+        st.session_state.history_page = 0
+
+    page = st.session_state.history_page
     if search_query:
-        filtered_questions = [
-            q for q in filtered_questions 
-            if search_query.lower() in q.get('question', '').lower() 
-            or search_query.lower() in q.get('answer', '').lower()
-        ]
-    
-    st.write(f"Табылды: **{len(filtered_questions)}** нәтиже")
-    
+        # Іздеу режимі: ең сәйкес SEARCH_LIMIT нәтиже, беттеусіз
+        rows = search_user_questions(user_id, search_query, category)
+        has_more = False
+    else:
+        cursor = st.session_state.history_cursors[page]
+        rows = get_user_questions_page(user_id, category, cursor, PAGE_SIZE + 1)
+        has_more = len(rows) > PAGE_SIZE
+        rows = rows[:PAGE_SIZE]
+
+    if not rows:
+        st.info("Нәтиже табылмады")
+    elif search_query:
+        st.write(f"Табылды: **{len(rows)}** нәтиже (сәйкестік бойынша)")
+    else:
+        st.write(f"Бет **{page + 1}** · осы бетте **{len(rows)}** нәтиже")
+
     # Сұрақтарды көрсету
-    for i, question in enumerate(filtered_questions):
+    for question in rows:
         with st.expander(f"📝 {question.get('question', 'Сұрақ')[:100]}..."):
             # Метадеректер
             col1, col2 = st.columns([2, 1])
@@ -94,39 +200,48 @@ def datasurak_page():
                 st.write(f"🕐 **Уақыт:** {timestamp}")
             
             st.divider()
+
+            if question.get('snippet'):
+                st.markdown(f"🔎 …{question['snippet']}…")
             
             # Сұрақ
             st.markdown("**Сұрақ:**")
             st.info(question.get('question', ''))
             
-            # Жауап
+            # Жауап: бір рет жүктеліп, сессияда сақталады
             st.markdown("**Жауап:**")
-            st.success(question.get('answer', ''))
-    
-    # Экспорт опциясы
-    st.divider()
-    if st.button("📥 CSV форматында жүктеу"):
-        if filtered_questions:
-            df = pd.DataFrame(filtered_questions)
-            csv = df.to_csv(index=False)
-            st.download_button(
-                label="CSV жүктеу",
-                data=csv,
-                file_name=f"questions_history_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
-            )
-        else:
-            st.warning("Экспорттау үшін деректер жоқ")
-    
-    # Тазалау опциясы
-    with st.sidebar:
-        st.header("⚙️ Параметрлер")
-        if st.button("🗑️ Тарихты тазалау", type="secondary"):
-            if st.checkbox("Растаймын"):
+            question_id = question['id']
+            if question_id in st.session_state.get('history_answers', {}) or \
+                    st.button("Жауапты көрсету", key=f"answer_{question_id}"):
                 try:
-                    supabase = get_supabase_client()
-                    supabase.table("questions").delete().eq("user_id", st.session_state.user_id).execute()
-                    st.success("Тарих тазаланды!")
-                    st.rerun()
+                    st.success(get_answer(user_id, question_id))
                 except Exception as e:
-                    st.error(f"Қате: {str(e)}")
\ No newline at end of file
+                    st.error(f"Жауапты алу қатесі: {str(e)}")
+
+    # Беттер арасында жылжу
+    col_prev, col_next = st.columns(2)
+    with col_prev:
+        if page > 0 and st.button("⬅️ Алдыңғы", use_container_width=True):
+            st.session_state.history_page -= 1
+            st.rerun()
+    with col_next:
+        if has_more and st.button("Келесі ➡️", use_container_width=True):
+            last = rows[-1]
+            cursors = st.session_state.history_cursors
+            del cursors[page + 1:]
+            cursors.append((last['timestamp'], last['id']))
+            st.session_state.history_page += 1
+            st.rerun()
+    
+    # Экспорт опциясы: беттеп оқылып, уақытша файлға жазылады
+    st.divider()
+    with st.expander("📥 Тарихты жүктеу"):
+        export_controls(
+            "history_export", "questions_history",
+            lambda start, end, limit: iter_table_chunks(
+                "questions", "id, question, answer, category, timestamp",
+                "timestamp", start, end, limit,
+                apply_filters=history_filters(user_id, category),
+            ),
+            total=counts.get(category) if category else total,
+        )
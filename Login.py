@@ -1,12 +1,28 @@
 import streamlit as st
-import hashlib
-from config import get_supabase_client
+import auth
+from config import LOGIN_TRUSTED_PROXIES
+from data_cache import invalidate
 
 # -----------------------------
-# 🔐 Құпия сөзді хэштеу
+# 🌐 Клиент IP адресі (кіру шектеуішіне)
 # -----------------------------
-def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
+def client_ip():
+    """Сенімді прокси жазған клиент адресі; анықталмаса None.
+
+    X-Forwarded-For-тың сол жағын клиент өзі жаза алады (жалған IP-мен шектеуішті
+    айналып өту немесе басқаның IP-ін бұғаттау), сондықтан оң жақтан
+    LOGIN_TRUSTED_PROXIES-інші адрес алынады — оны біздің соңғы сенімді прокси қосқан.
+    Прокси жоқ (0) немесе тізбек қысқа болса, тікелей қосылыс адресі.
+    """
+    try:
+        if LOGIN_TRUSTED_PROXIES > 0:
+            forwarded = st.context.headers.get("X-Forwarded-For")
+            hops = [hop.strip() for hop in forwarded.split(",")] if forwarded else []
+            if len(hops) >= LOGIN_TRUSTED_PROXIES and hops[-LOGIN_TRUSTED_PROXIES]:
+                return hops[-LOGIN_TRUSTED_PROXIES]
+        return getattr(st.context, "ip_address", None)
+    except Exception:
+        return None
 
 # -----------------------------
 # 🚪 Кіру беті
@@ -30,23 +46,13 @@ def login_page():
 
             if submit:
                 if login_value and password:
-                    supabase = get_supabase_client()
-                    hashed_pw = hash_password(password)
-
                     try:
-                        # ✅ username OR email арқылы іздеу
-                        response = (
-                            supabase.table("users")
-                            .select("*")
-                            .or_(f"username.eq.{login_value},email.eq.{login_value}")
-                            .eq("password", hashed_pw)
-                            .limit(1)
-                            .execute()
-                        )
-
-                        if response.data:
-                            user = response.data[0]
+                        # ✅ username OR email бойынша іздеу, scrypt тексеру (auth / passwords)
+                        user, wait = auth.authenticate(login_value, password, client_ip())
 
+                        if wait:
+                            st.error(f"⏳ Тым көп сәтсіз әрекет. {wait} секундтан кейін қайталаңыз.")
+                        elif user:
                             st.session_state.logged_in = True
                             st.session_state.username = user["username"]      # ✅ нақты username сақтаймыз
                             st.session_state.user_id = user["id"]
@@ -78,27 +84,12 @@ def login_page():
                     if new_password != confirm_password:
                         st.error("❌ Құпия сөздер сәйкес келмейді!")
                     else:
-                        supabase = get_supabase_client()
-                        hashed_pw = hash_password(new_password)
-
                         try:
-                            # ✅ username немесе email бұрын бар ма тексеру
-                            existing = (
-                                supabase.table("users")
-                                .select("id")
-                                .or_(f"username.eq.{new_username},email.eq.{new_email}")
-                                .limit(1)
-                                .execute()
-                            )
-
-                            if existing.data:
+                            # ✅ Бір INSERT: username/email бос емес болса, UNIQUE шектеуі тоқтатады
+                            if auth.register(new_username, new_email, new_password) is None:
                                 st.error("⚠️ Бұл username немесе email бұрын тіркелген!")
                             else:
-                                supabase.table("users").insert({
-                                    "username": new_username,
-                                    "email": new_email,
-                                    "password": hashed_pw
-                                }).execute()
+                                invalidate("users")
 
                                 st.success("🎄 Тіркелу сәтті өтті! Енді жүйеге кіре аласыз 🎅")
                         except Exception as e:
@@ -1,34 +1,29 @@
 import streamlit as st
-from openai import OpenAI
-from config import OPENAI_API_KEY
 from datetime import datetime
 import random
 from html import escape
-
-client = OpenAI(api_key=OPENAI_API_KEY)
+import motivation_pool
 
 # -------------------- HELPERS --------------------
 
-def get_daily_motivation():
-    system_prompt = (
-        "Сіз мотивациялық көмекшісіз.\n"
-        "Күн сайын адамдарға жігерлендіретін, рухтандыратын сөздер айтыңыз.\n"
-        "Хабарлама 3-5 сөйлемнен тұруы тиіс, позитивті, іс-әрекетке шақыратын, күш-жігер беретін сөздер."
-        "Жауапты қазақ тілінде беріңіз."
-    )
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": "Маған бүгінге мотивация беріңіз"}
-            ],
-            temperature=0.9,
-            max_tokens=300
-        )
-        return response.choices[0].message.content
-    except:
+DAILY_TOPIC = motivation_pool.DAILY_TOPIC
+TOPICS = motivation_pool.TOPICS
+
+
+def _from_pool(topic):
+    """Пулдан мәтін; сессияда көрсетілгендер қайталанбайды (пул таусылғанша)"""
+    seen = st.session_state.setdefault("motivation_seen", {}).setdefault(topic, [])
+    text = motivation_pool.pick(topic, exclude=seen)
+    if text is None:
         return get_fallback_motivation()
+    if text in seen:
+        seen.clear()
+    seen.append(text)
+    return text
+
+
+def get_daily_motivation():
+    return _from_pool(DAILY_TOPIC)
 
 
 def get_fallback_motivation():
@@ -46,21 +41,7 @@ def get_fallback_motivation():
 
 
 def get_custom_motivation(topic):
-    system_prompt = f"""Сіз мотивациялық көмекшісіз. {topic} тақырыбы бойынша шабыттандыратын сөздер беріңіз."
-Жауап 3-5 сөйлемнен тұрсын, қазақ тілінде."""
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"{topic} туралы мотивация"}
-            ],
-            temperature=0.9,
-            max_tokens=300
-        )
-        return response.choices[0].message.content
-    except:
-        return get_fallback_motivation()
+    return _from_pool(topic)
 
 
 def display_powerful_motivation(text):
@@ -107,9 +88,7 @@ def motivation_page():
     col1, col2 = st.columns([3, 1])
     with col1:
         if st.button("🎁 Бүгінгі мотивацияны алу", type="primary", use_container_width=True):
-            with st.spinner("Дайындалуда..."):
-                motivation = get_daily_motivation()
-                display_powerful_motivation(motivation)
+            display_powerful_motivation(get_daily_motivation())
 
     with col2:
         if st.button("🔄 Жаңарту"):
@@ -119,7 +98,7 @@ def motivation_page():
 
     # Custom topic motivation
     st.subheader("🎯 Арнайы мотивация")
-    topics = ["Денсаулық", "Жұмыс", "Оқу", "Спорт", "Өзін-өзі дамыту", "Отбасы", "Достық", "Шығармашылық"]
+    topics = TOPICS
     col1, col2 = st.columns([2, 1])
     with col1:
         selected_topic = st.selectbox("Тақырыпты таңдаңыз:", topics)
@@ -127,9 +106,7 @@ def motivation_page():
         st.write("")
         st.write("")
         if st.button("Алу", use_container_width=True):
-            with st.spinner("Дайындалуда..."):
-                custom_mot = get_custom_motivation(selected_topic)
-                display_powerful_motivation(custom_mot)
+            display_powerful_motivation(get_custom_motivation(selected_topic))
 
     st.divider()
 
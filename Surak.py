@@ -1,132 +1,124 @@
 import streamlit as st
-from openai import OpenAI
-from config import OPENAI_API_KEY, get_supabase_client
+from config import LLM_STREAMING, MEDICAL_INTENT_LOW, MEDICAL_INTENT_HIGH
+from medical_intent import gate
+from keyword_matcher import KeywordMatcher
+from persistence_queue import enqueue
+import answer_cache
+import chat_context
+import chat_view
+from chat_history import session_history
+import llm_gateway
 from datetime import datetime
 
-# -------------------- CONFIG --------------------
+# -------------------- AI HELPERS --------------------
 
-st.set_page_config(page_title="Medical Chat", page_icon="💬", layout="centered")
+MEDICAL_GATE_PROMPT = (
+    "Сіз медициналық сұрақтарды анықтаушысыз. "
+    "Келесі сұрақ медицинаға қатысты ма екенін анықтаңыз. "
+    "Медициналық сұрақтар: симптомдар, аурулар, денсаулық, емдеу, диагноз. "
+    "Тек 'ИӘ' немесе 'ЖОҚ' деп жауап беріңіз."
+)
 
-client = OpenAI(api_key=OPENAI_API_KEY)
 
+def is_medical_question(question: str) -> bool:
+    """Сұрақтың медициналық екенін тексеру.
 
-# -------------------- AI HELPERS --------------------
+    Алдымен жергілікті классификатор: сенімді медициналық сұрақ бірден өтеді,
+    тек күшті медициналық емес белгі болса бірден бас тартылады. Лексиконнан тыс
+    және сенімсіз сұрақтарды LLM шешеді (қате болса – рұқсат етеміз).
+    """
+    if detect_emergency(question):
+        return True
+    decision = gate(question, MEDICAL_INTENT_LOW, MEDICAL_INTENT_HIGH)
+    if decision is not None:
+        return decision
+    return llm_is_medical_question(question)
 
-def is_medical_question(question: str) -> bool:
-    """Сұрақтың медициналық екенін тексеру"""
-    system_prompt = (
-        "Сіз медициналық сұрақтарды анықтаушысыз. "
-        "Келесі сұрақ медицинаға қатысты ма екенін анықтаңыз. "
-        "Медициналық сұрақтар: симптомдар, аурулар, денсаулық, емдеу, диагноз. "
-        "Тек 'ИӘ' немесе 'ЖОҚ' деп жауап беріңіз."
-    )
 
+def llm_is_medical_question(question: str) -> bool:
+    """gpt-4o-mini арқылы тексеру (қате болса – рұқсат етеміз)"""
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
+        answer = llm_gateway.complete(
+            [
+                {"role": "system", "content": MEDICAL_GATE_PROMPT},
                 {"role": "user", "content": question},
             ],
-            max_tokens=5,
+            model="gpt-4o-mini",
             temperature=0,
-        )
-        answer = response.choices[0].message.content.strip().upper()
+            max_tokens=5,
+        ).strip().upper()
         return answer == "ИӘ"
     except Exception:
         return True
 
 
+DANGER_KEYWORDS = [
+    "кеуде", "тыныс", "тұншығу", "есінен тану",
+    "қан кет", "жоғары температура", "қатты ауырсыну",
+    "инсульт", "жүрек ұстамасы",
+]
+
+EMERGENCY_MATCHER = KeywordMatcher(DANGER_KEYWORDS)
+
+
 def detect_emergency(question: str) -> bool:
     """Қауіпті симптомдарды анықтау"""
-    danger_keywords = [
-        "кеуде", "тыныс", "тұншығу", "есінен тану",
-        "қан кет", "жоғары температура", "қатты ауырсыну",
-        "инсульт", "жүрек ұстамасы",
-    ]
-    q = question.lower()
-    return any(word in q for word in danger_keywords)
+    return EMERGENCY_MATCHER.contains(question)
 
 
-def get_medical_answer(question: str) -> str:
-    """Медициналық сұраққа жауап беру"""
-    system_prompt = (
-        "Сіз медициналық көмекші ботсыз. "
-        "Бұл диагноз емес екенін әрқашан ескертіңіз. "
-        "Жауапты қысқа, нақты және мейірімді беріңіз. "
-        "Қадамдап кеңес беріңіз. "
-        "Қауіпті симптом болса – дәрігерге немесе жедел жәрдемге жүгінуді ұсыныңыз. "
-        "Жауапты қазақ тілінде беріңіз."
-    )
+MEDICAL_SYSTEM_PROMPT = (
+    "Сіз медициналық көмекші ботсыз. "
+    "Бұл диагноз емес екенін әрқашан ескертіңіз. "
+    "Жауапты қысқа, нақты және мейірімді беріңіз. "
+    "Қадамдап кеңес беріңіз. "
+    "Қауіпті симптом болса – дәрігерге немесе жедел жәрдемге жүгінуді ұсыныңыз. "
+    "Жауапты қазақ тілінде беріңіз."
+)
+
 
+def get_medical_answer(question: str, context=None) -> str:
+    """Медициналық сұраққа жауап беру"""
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": question},
-            ],
-            max_tokens=900,
-            temperature=0.6,
-        )
-        return response.choices[0].message.content
+        return answer_cache.complete("medical", "gpt-4o", MEDICAL_SYSTEM_PROMPT, question,
+                                     temperature=0.6, max_tokens=900, context=context)
     except Exception as e:
         return f"Қате орын алды: {str(e)}"
 
 
-# -------------------- DATABASE --------------------
-
-def save_question_answer(user_id, question, answer, category="medical"):
+def stream_medical_answer(question: str, context=None):
+    """Медициналық жауапты токендер келген сайын беру (stream)"""
     try:
-        supabase = get_supabase_client()
-        supabase.table("questions").insert({
-            "user_id": user_id,
-            "question": question,
-            "answer": answer,
-            "category": category,
-            "timestamp": datetime.now().isoformat(),
-        }).execute()
+        yield from answer_cache.stream("medical", "gpt-4o", MEDICAL_SYSTEM_PROMPT, question,
+                                       temperature=0.6, max_tokens=900, context=context)
     except Exception as e:
-        st.error(f"Сақтау қатесі: {str(e)}")
+        yield f"Қате орын алды: {str(e)}"
 
 
-# -------------------- UI PAGE --------------------
-
-def surak_page():
-    st.title("💬 Медициналық чат")
-    st.caption("Денсаулыққа қатысты сұрақ қойыңыз. Бұл медициналық диагноз емес ⚠️")
-
-    # Sidebar
-    with st.sidebar:
-        st.header("⚙️ Баптаулар")
-        if st.button("🗑️ Чатты тазалау"):
-            st.session_state.chat_history = []
-        st.markdown("---")
-        st.markdown("**Ескерту:** Бұл сервис дәрігерді алмастырмайды.")
+# -------------------- DATABASE --------------------
 
-    # Disclaimer
-    if "accepted_disclaimer" not in st.session_state:
-        st.session_state.accepted_disclaimer = False
+def save_question_answer(user_id, question, answer, category="medical"):
+    """Фондық кезек арқылы сақтау (уақыт белгісі кезекке қойған сәтте)"""
+    enqueue("questions", {
+        "user_id": user_id,
+        "question": question,
+        "answer": answer,
+        "category": category,
+        "timestamp": datetime.now().isoformat(),
+    })
 
-    if not st.session_state.accepted_disclaimer:
-        st.warning("Бұл сервис медициналық диагноз қоймайды. Қауіпті жағдайда жедел жәрдем шақырыңыз 🚑")
-        if st.button("✔️ Мен түсіндім"):
-            st.session_state.accepted_disclaimer = True
-        return
 
-    # Chat history
-    if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
+# -------------------- UI PAGE --------------------
 
-    for msg in st.session_state.chat_history:
-        with st.chat_message(msg["role"]):
-            st.write(msg["content"])
+@st.fragment
+def medical_chat():
+    """Тарих + енгізу: хабарлама жібергенде тек осы бөлік қайта орындалады"""
+    chat_view.render_history("medical", st.session_state.chat_history)
 
     # Chat input
     user_question = st.chat_input("Сұрағыңызды жазыңыз...")
 
     if user_question:
-        st.session_state.chat_history.append({"role": "user", "content": user_question})
+        st.session_state.chat_history.append("user", user_question)
 
         with st.chat_message("user"):
             st.write(user_question)
@@ -140,24 +132,62 @@ def surak_page():
         with st.spinner("🔍 Сұрақ тексерілуде..."):
             if not is_medical_question(user_question):
                 warning_text = "⚠️ Тек медициналық сұрақтар қойыңыз (симптомдар, аурулар, емдеу)."
-                st.session_state.chat_history.append({"role": "assistant", "content": warning_text})
+                st.session_state.chat_history.reject_last(warning_text)
                 with st.chat_message("assistant"):
                     st.warning(warning_text)
                 return
 
+        # Алдыңғы айналымдар (токен бюджеті шегінде, ескілері қысқаша мазмұнға жиналған)
+        history = st.session_state.chat_history
+        context = chat_context.build_context("medical", history[:-1], offset=history.dropped)
+
         # AI answer
-        with st.spinner("🧠 AI жауап дайындауда..."):
-            answer = get_medical_answer(user_question)
+        if LLM_STREAMING:
+            with st.chat_message("assistant"):
+                answer = st.write_stream(stream_medical_answer(user_question, context))
+                st.info("⚕️ Бұл ақпарат жалпы сипатта. Міндетті түрде дәрігерге көрініңіз.")
+        else:
+            with st.spinner("🧠 AI жауап дайындауда..."):
+                answer = get_medical_answer(user_question, context)
 
-        st.session_state.chat_history.append({"role": "assistant", "content": answer})
+            with st.chat_message("assistant"):
+                st.write(answer)
+                st.info("⚕️ Бұл ақпарат жалпы сипатта. Міндетті түрде дәрігерге көрініңіз.")
 
-        with st.chat_message("assistant"):
-            st.write(answer)
-            st.info("⚕️ Бұл ақпарат жалпы сипатта. Міндетті түрде дәрігерге көрініңіз.")
+        st.session_state.chat_history.append("assistant", answer)
 
         if "user_id" in st.session_state:
             save_question_answer(st.session_state.user_id, user_question, answer, "medical")
 
+
+def surak_page():
+    st.title("💬 Медициналық чат")
+    st.caption("Денсаулыққа қатысты сұрақ қойыңыз. Бұл медициналық диагноз емес ⚠️")
+
+    # Sidebar
+    with st.sidebar:
+        st.header("⚙️ Баптаулар")
+        if st.button("🗑️ Чатты тазалау"):
+            session_history("chat_history", "medical").clear()
+            chat_context.reset_context("medical")
+        st.markdown("---")
+        st.markdown("**Ескерту:** Бұл сервис дәрігерді алмастырмайды.")
+
+    # Disclaimer
+    if "accepted_disclaimer" not in st.session_state:
+        st.session_state.accepted_disclaimer = False
+
+    if not st.session_state.accepted_disclaimer:
+        st.warning("Бұл сервис медициналық диагноз қоймайды. Қауіпті жағдайда жедел жәрдем шақырыңыз 🚑")
+        if st.button("✔️ Мен түсіндім"):
+            st.session_state.accepted_disclaimer = True
+        return
+
+    # Chat history
+    session_history("chat_history", "medical")
+
+    medical_chat()
+
     with st.expander("ℹ️ Маңызды ақпарат"):
         st.markdown(
             """
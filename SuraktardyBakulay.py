@@ -1,39 +1,168 @@
 import streamlit as st
 from config import get_supabase_client
+from data_cache import cached
+from export import export_controls
+from bulk_ops import soft_delete, archive, undo, make_undo, undo_seconds_left, maybe_purge
 import pandas as pd
-from datetime import datetime
+from datetime import date
 from AdminPanelLoginSystem import check_admin
 import plotly.express as px
 
-def get_all_questions_with_users():
+PAGE_SIZES = (25, 50, 100)
+EXPORT_PAGE = 200
+SUMMARY_TTL = 60
+MONTHS_BACK = 24
+CATEGORIES = ['medical', 'medication', 'psychology']
+CATEGORY_LABELS = {'medical': '⚕️ Медициналық', 'medication': '💊 Дәрі-дәрмек', 'psychology': '🧠 Психология'}
+
+# -------------------- DATABASE --------------------
+
+def filter_params(filters):
+    """Сүзгі кортежін RPC параметрлеріне айналдыру"""
+    categories, username, month, query, include_archived = filters
+    return {
+        "p_categories": list(categories) if categories else None,
+        "p_username": username or None,
+        "p_month": month.isoformat() if month else None,
+        "p_query": query or None,
+        "p_include_archived": include_archived,
+    }
+
+def get_questions_page(filters, cursor=None, limit=PAGE_SIZES[0]):
+    """Модерация кестесінің бір беті (жауапсыз, username/email серверде қосылған)"""
     try:
         supabase = get_supabase_client()
-        questions = supabase.table("questions").select("*").order("timestamp", desc=True).execute().data
-        users_response = supabase.table("users").select("id, username, email").execute()
-        users = {u['id']: u for u in users_response.data}
-        for q in questions:
-            user_id = q.get('user_id')
-            q['username'] = users.get(user_id, {}).get('username', 'Unknown')
-            q['user_email'] = users.get(user_id, {}).get('email', 'Unknown')
-        return questions
+        before_ts, before_id = cursor if cursor else (None, None)
+        params = filter_params(filters)
+        params.update({"p_before_ts": before_ts, "p_before_id": before_id, "p_limit": limit})
+        return supabase.rpc("moderation_questions_page", params).execute().data or []
     except Exception as e:
         st.error(f"Қате: {str(e)}")
         return []
 
-def format_timestamp(timestamp_str):
-    try:
-        dt = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-        return dt
-    except:
-        return timestamp_str
+@cached("moderation.summary", SUMMARY_TTL, tags=("questions",), default=list)
+def get_summary(filters):
+    """Сүзгіленген жиын бойынша санат / пайдаланушы / ай жиынтықтары"""
+    supabase = get_supabase_client()
+    return supabase.rpc("moderation_summary", filter_params(filters)).execute().data or []
 
-def delete_question(question_id):
-    try:
-        supabase = get_supabase_client()
-        supabase.table("questions").delete().eq("id", question_id).execute()
-        return True
-    except:
-        return False
+def get_question_detail(question_id):
+    """Таңдалған сұрақтың толық мәтіні мен жауабы"""
+    supabase = get_supabase_client()
+    response = supabase.table("questions").select("id, question, answer").eq("id", question_id).limit(1).execute()
+    return response.data[0] if response.data else None
+
+def get_answers(question_ids):
+    """Бірнеше сұрақтың жауаптары (экспорт үшін)"""
+    if not question_ids:
+        return {}
+    supabase = get_supabase_client()
+    response = supabase.table("questions").select("id, answer").in_("id", question_ids).execute()
+    return {row['id']: row['answer'] for row in response.data}
+
+def matching_ids(filters, progress=None):
+    """Сүзгіге сәйкес барлық id (модерация беттері арқылы, EXPORT_PAGE-тен)"""
+    ids = []
+    cursor = None
+    while True:
+        batch = get_questions_page(filters, cursor, EXPORT_PAGE)
+        ids.extend(r['id'] for r in batch)
+        if progress:
+            progress(len(ids))
+        if len(batch) < EXPORT_PAGE:
+            return ids
+        cursor = (batch[-1]['timestamp'], batch[-1]['id'])
+
+def iter_export_chunks(filters, limit=None):
+    """Экспорт бөліктері: модерация беті + сол беттің жауаптары"""
+    cursor = None
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = EXPORT_PAGE if remaining is None else min(EXPORT_PAGE, remaining)
+        batch = get_questions_page(filters, cursor, size)
+        if not batch:
+            return
+        answers = get_answers([r['id'] for r in batch])
+        for r in batch:
+            r['answer'] = answers.get(r['id'], '')
+        yield batch
+        if len(batch) < size:
+            return
+        cursor = (batch[-1]['timestamp'], batch[-1]['id'])
+        if remaining is not None:
+            remaining -= len(batch)
+
+def month_options():
+    """Соңғы MONTHS_BACK айдың бірінші күндері"""
+    today = date.today()
+    months = []
+    year, month = today.year, today.month
+    for _ in range(MONTHS_BACK):
+        months.append(date(year, month, 1))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return months
+
+def reset_pagination(filters, page_size):
+    """Сүзгі не бет өлшемі өзгерсе, бірінші бетке қайту"""
+    state = (filters, page_size)
+    if st.session_state.get('moderation_state') != state:
+        st.session_state.moderation_state = state
+        st.session_state.moderation_cursors = [None]
+        st.session_state.moderation_page = 0
+        st.session_state.pop('moderation_rows', None)
+        st.session_state.pop('moderation_table', None)
+
+def load_page_rows(filters, page_size):
+    """Ағымдағы бет сессияда сақталады: топтық әрекеттен кейін қайта жүктелмейді"""
+    page = st.session_state.moderation_page
+    key = (page, st.session_state.moderation_cursors[page])
+    cached_rows = st.session_state.get('moderation_rows')
+    if cached_rows is None or cached_rows[0] != key:
+        rows = get_questions_page(filters, key[1], page_size + 1)
+        cached_rows = (key, rows[:page_size], len(rows) > page_size)
+        st.session_state.moderation_rows = cached_rows
+    return cached_rows[1], cached_rows[2]
+
+def drop_rows_in_place(ids):
+    """Әрекет жасалған жолдарды ағымдағы беттен алып тастау"""
+    key, rows, has_more = st.session_state.moderation_rows
+    ids = set(ids)
+    st.session_state.moderation_rows = (key, [r for r in rows if r['id'] not in ids], has_more)
+    st.session_state.pop('moderation_table', None)
+
+def run_bulk(action, ids, include_archived=False):
+    """Бөліктермен орындау, прогресс көрсету және қайтару жазбасын сақтау"""
+    bar = st.progress(0.0, text=f"0 / {len(ids)}")
+    operation = soft_delete if action == "delete" else archive
+    # Қайтару терезесі бірінші бөліктен бұрын басталады: purge одан ерте өшірмейді
+    record = make_undo(action, ids)
+    done = operation(ids, progress=lambda n, total: bar.progress(n / total, text=f"{n} / {total}"))
+    bar.empty()
+    st.session_state.moderation_undo = record
+    if action == "archive" and include_archived:
+        # Архивтелгендер көрініп тұр: жолдар орнында қалады, белгісі жаңарады
+        st.session_state.pop('moderation_rows', None)
+    else:
+        drop_rows_in_place(ids)
+    return done
+
+def undo_banner():
+    record = st.session_state.get('moderation_undo')
+    seconds = undo_seconds_left(record)
+    if not seconds:
+        st.session_state.pop('moderation_undo', None)
+        return
+    verb = "жойылды" if record['action'] == "delete" else "архивтелді"
+    col_text, col_button = st.columns([4, 1])
+    col_text.info(f"{len(record['ids'])} сұрақ {verb}. Қайтаруға {seconds // 60}:{seconds % 60:02d} қалды.")
+    if col_button.button("↩️ Қайтару", use_container_width=True):
+        bar = st.progress(0.0)
+        undo(record, progress=lambda n, total: bar.progress(n / total))
+        st.session_state.pop('moderation_undo', None)
+        st.session_state.pop('moderation_rows', None)
+        st.rerun()
+
+# -------------------- UI PAGE --------------------
 
 def suraktardy_bakulay_page():
     if not check_admin():
@@ -44,105 +173,177 @@ def suraktardy_bakulay_page():
     st.title("🔍 Сұрақтарды бақылау")
     st.write("Барлық пайдаланушы сұрақтарын зерттеу және талдау")
 
-    questions = get_all_questions_with_users()
-    if not questions:
-        st.info("Әлі сұрақтар жоқ")
+    # Sidebar фильтрлер (барлығы серверде қолданылады)
+    st.sidebar.header("Фильтрлер")
+    category_filter = st.sidebar.multiselect("Санат", options=CATEGORIES, default=CATEGORIES)
+    username_filter = st.sidebar.text_input("Пайдаланушы", placeholder="Аты немесе оның басы...").strip()
+    month_filter = st.sidebar.selectbox(
+        "Ай", options=[None] + month_options(),
+        format_func=lambda m: "Барлығы" if m is None else m.strftime('%Y-%m'),
+    )
+    search_query = st.sidebar.text_input("Іздеу:", placeholder="Сұрақ не жауап мәтінінен іздеу...").strip()
+    include_archived = st.sidebar.checkbox("Архивтелгендерді көрсету", value=False)
+    page_size = st.sidebar.selectbox("Беттегі жолдар", PAGE_SIZES)
+    if st.sidebar.button("🔄 Жаңарту"):
+        st.session_state.pop('moderation_rows', None)
+
+    # Қайтару терезесі өткен жұмсақ өшірілген жолдарды анда-санда тазалау
+    maybe_purge()
+
+    if not category_filter:
+        st.info("Кемінде бір санатты таңдаңыз")
         return
 
-    # Деректерді DataFrame-ге ауыстыру
-    df = pd.DataFrame(questions)
-    df['timestamp_dt'] = df['timestamp'].apply(format_timestamp)
-    df['month'] = df['timestamp_dt'].apply(lambda x: x.strftime('%Y-%m') if isinstance(x, datetime) else '')
+    categories = None if set(category_filter) == set(CATEGORIES) else tuple(sorted(category_filter))
+    filters = (categories, username_filter, month_filter, search_query, include_archived)
+    reset_pagination(filters, page_size)
 
-    # Sidebar фильтрлер
-    st.sidebar.header("Фильтрлер")
-    categories = ['medical','medication','psychology']
-    category_filter = st.sidebar.multiselect("Санат", options=categories, default=categories)
-    users = df['username'].unique().tolist()
-    user_filter = st.sidebar.multiselect("Пайдаланушы", options=users, default=users)
-    months = df['month'].unique().tolist()
-    month_filter = st.sidebar.multiselect("Ай", options=months, default=months)
-    search_query = st.sidebar.text_input("Іздеу:", placeholder="Сұрақ мәтінінен іздеу...")
-
-    filtered_df = df[
-        (df['category'].isin(category_filter)) &
-        (df['username'].isin(user_filter)) &
-        (df['month'].isin(month_filter))
-    ]
-    if search_query:
-        filtered_df = filtered_df[filtered_df['question'].str.contains(search_query, case=False, na=False)]
-
-    st.write(f"Көрсетілді: **{len(filtered_df)}** нәтиже")
+    summary = pd.DataFrame(get_summary(filters), columns=['kind', 'label', 'total'])
+    by_category = summary[summary['kind'] == 'category'].set_index('label')['total']
+    total = int(by_category.sum())
+
+    st.write(f"Көрсетілді: **{total}** нәтиже")
+    undo_banner()
 
     # Статистика блоктары
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Барлығы", len(filtered_df))
-    col2.metric("Медициналық", len(filtered_df[filtered_df['category']=='medical']))
-    col3.metric("Дәрі-дәрмек", len(filtered_df[filtered_df['category']=='medication']))
-    col4.metric("Психология", len(filtered_df[filtered_df['category']=='psychology']))
+    col1.metric("Барлығы", total)
+    col2.metric("Медициналық", int(by_category.get('medical', 0)))
+    col3.metric("Дәрі-дәрмек", int(by_category.get('medication', 0)))
+    col4.metric("Психология", int(by_category.get('psychology', 0)))
     st.divider()
 
+    if not total:
+        st.info("Әлі сұрақтар жоқ")
+        return
+
     # Категория бойынша график
     st.subheader("📊 Сұрақтар саны категория бойынша")
-    cat_count = filtered_df['category'].value_counts().reset_index()
-    cat_count.columns = ['Category','Count']
+    cat_count = by_category.reset_index()
+    cat_count.columns = ['Category', 'Count']
     fig = px.bar(cat_count, x='Category', y='Count', text='Count', color='Category', color_discrete_sequence=px.colors.qualitative.Set2)
     st.plotly_chart(fig, use_container_width=True)
 
     # Пайдаланушы белсенділігі
     st.subheader("👤 Ең белсенді пайдаланушылар")
-    user_count = filtered_df['username'].value_counts().reset_index()
-    user_count.columns = ['User','Count']
-    fig2 = px.bar(user_count.head(10), x='User', y='Count', text='Count', color='User', color_discrete_sequence=px.colors.qualitative.Pastel)
+    user_count = summary[summary['kind'] == 'user'].sort_values('total', ascending=False)[['label', 'total']]
+    user_count.columns = ['User', 'Count']
+    fig2 = px.bar(user_count, x='User', y='Count', text='Count', color='User', color_discrete_sequence=px.colors.qualitative.Pastel)
     st.plotly_chart(fig2, use_container_width=True)
 
     # Айлық динамика
     st.subheader("📈 Айлық тренд")
-    month_count = filtered_df.groupby('month').size().reset_index(name='Count')
+    month_count = summary[summary['kind'] == 'month'].sort_values('label')[['label', 'total']]
+    month_count.columns = ['month', 'Count']
     fig3 = px.line(month_count, x='month', y='Count', markers=True)
     st.plotly_chart(fig3, use_container_width=True)
 
-    # Сұрақтарды көрсету
+    # Сұрақтар кестесі: тек ағымдағы бет жүктеледі, кесте виртуалданған
     st.subheader("💬 Сұрақтар мен жауаптар")
-    for i, row in filtered_df.iterrows():
-        with st.expander(f"#{row['id']} - {row['username']} - {row['question'][:80]}..."):
+    page = st.session_state.moderation_page
+    rows, has_more = load_page_rows(filters, page_size)
+
+    if not rows:
+        st.info("Нәтиже табылмады")
+        return
+
+    page_df = pd.DataFrame(rows)
+    page_df['timestamp'] = pd.to_datetime(page_df['timestamp'], utc=True, errors='coerce')
+    page_df['category'] = page_df['category'].map(CATEGORY_LABELS).fillna('❓ Белгісіз')
+    page_df['archived'] = page_df['archived_at'].notna()
+    display_cols = ['id', 'username', 'email', 'category', 'question', 'timestamp', 'archived']
+    event = st.dataframe(
+        page_df[display_cols],
+        use_container_width=True,
+        hide_index=True,
+        height=min(35 * (len(page_df) + 1) + 3, 500),
+        on_select="rerun",
+        selection_mode="multi-row",
+        key="moderation_table",
+        column_config={
+            "timestamp": st.column_config.DatetimeColumn("Уақыт", format="DD.MM.YYYY HH:mm"),
+            "question": st.column_config.TextColumn("Сұрақ", width="large"),
+            "archived": st.column_config.CheckboxColumn("📦"),
+        },
+    )
+
+    # Беттер арасында жылжу
+    col_prev, col_info, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if page > 0 and st.button("⬅️ Алдыңғы", use_container_width=True):
+            st.session_state.moderation_page -= 1
+            st.rerun()
+    with col_info:
+        st.caption(f"Бет {page + 1} · {len(rows)} жол")
+    with col_next:
+        if has_more and st.button("Келесі ➡️", use_container_width=True):
+            last = rows[-1]
+            cursors = st.session_state.moderation_cursors
+            del cursors[page + 1:]
+            cursors.append((last['timestamp'], last['id']))
+            st.session_state.moderation_page += 1
+            st.rerun()
+
+    # Топтық әрекеттер: таңдалған жолдар немесе сүзгіге сәйкес барлығы
+    selected = event.selection.rows if event else []
+    selected_ids = [int(page_df.iloc[i]['id']) for i in selected]
+    with st.container(border=True):
+        apply_all = st.checkbox(f"Сүзгіге сәйкес барлық {total} жолға қолдану")
+        target_count = total if apply_all else len(selected_ids)
+        col_delete, col_archive = st.columns(2)
+        action = None
+        if col_delete.button(f"🗑️ Жою ({target_count})", disabled=not target_count, use_container_width=True):
+            action = "delete"
+        if col_archive.button(f"📦 Архивтеу ({target_count})", disabled=not target_count, use_container_width=True):
+            action = "archive"
+        if action:
+            try:
+                if apply_all:
+                    with st.spinner("Сәйкес жолдар жиналуда..."):
+                        target_ids = matching_ids(filters)
+                    st.session_state.pop('moderation_rows', None)
+                else:
+                    target_ids = selected_ids
+                done = run_bulk(action, target_ids, include_archived)
+                st.success(f"Дайын: {done} жол")
+                st.rerun()
+            except Exception as e:
+                st.error(f"Топтық әрекет қатесі: {str(e)}")
+
+    # Таңдалған жолдың толық мәліметі (біреуі таңдалса)
+    if len(selected) == 1:
+        row = page_df.iloc[selected[0]]
+        with st.container(border=True):
             col1, col2, col3 = st.columns(3)
             with col1:
                 st.write(f"👤 **Пайдаланушы:** {row['username']}")
-                st.write(f"📧 **Email:** {row['user_email']}")
+                st.write(f"📧 **Email:** {row['email'] or 'Unknown'}")
             with col2:
-                category_emoji = {'medical':'⚕️ Медициналық','medication':'💊 Дәрі-дәрмек','psychology':'🧠 Психология'}
-                st.write(f"**Санат:** {category_emoji.get(row['category'],'❓ Белгісіз')}")
+                st.write(f"**Санат:** {row['category']}")
                 st.write(f"🆔 **ID:** {row['id']}")
             with col3:
-                st.write(f"🕐 **Уақыт:** {row['timestamp_dt'].strftime('%d.%m.%Y %H:%M') if isinstance(row['timestamp_dt'],datetime) else row['timestamp_dt']}")
-            
-            st.markdown("**📝 Сұрақ:**")
-            st.info(row['question'])
-            st.markdown("**💬 Жауап:**")
-            st.success(row['answer'])
-
-            col1, col2 = st.columns([1,5])
-            with col1:
-                if st.button("🗑️ Жою", key=f"delete_{row['id']}"):
-                    if delete_question(row['id']):
-                        st.success("Сұрақ жойылды!")
-                        st.rerun()
-                    else:
-                        st.error("Жою қатесі!")
-
-    # CSV экспорт
+                st.write(f"🕐 **Уақыт:** {row['timestamp'].strftime('%d.%m.%Y %H:%M') if pd.notna(row['timestamp']) else '—'}")
+
+            try:
+                detail = get_question_detail(int(row['id']))
+            except Exception as e:
+                detail = None
+                st.error(f"Қате: {str(e)}")
+            if detail:
+                st.markdown("**📝 Сұрақ:**")
+                st.info(detail['question'])
+                st.markdown("**💬 Жауап:**")
+                st.success(detail['answer'])
+
+    elif not selected:
+        st.caption("Толық мәтінді көру үшін кестеден жолды таңдаңыз")
+
+    # Экспорт: сүзгіленген жиын беттеп оқылып, уақытша файлға жазылады
     st.divider()
-    if st.button("📥 Барлық деректерді жүктеу CSV"):
-        st.download_button(
-            "CSV жүктеу",
-            filtered_df.to_csv(index=False),
-            f"all_questions_{datetime.now().strftime('%Y%m%d')}.csv",
-            "text/csv"
+    with st.expander("📥 Барлық деректерді жүктеу"):
+        export_controls(
+            "moderation_export", "all_questions",
+            lambda start, end, limit: iter_export_chunks(filters, limit),
+            total=total,
+            date_range=False,
         )
-
-    # Кестелік көрініс
-    with st.expander("📊 Кестелік көрініс"):
-        if not filtered_df.empty:
-            display_cols = ['id','username','user_email','category','question','answer','timestamp']
-            st.dataframe(filtered_df[display_cols], use_container_width=True, hide_index=True)
@@ -0,0 +1,180 @@
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# 🧮 Аналитиканың бағаналық кадры (клиенттік қосалқы жол)
+# -----------------------------
+# Негізгі жол — Postgres RPC/daily_stats. Олар әлі орнатылмаған базада
+# (database_setup.sql қайта іске қосылмаған) Analitika шикі бағандарды бір рет
+# жүктеп, осы кадрды құрады: уақыт белгілері numpy/pandas арқылы
+# бір рет талданады, барлық метрикалар numpy векторларынан есептеледі
+# (bincount / searchsorted), жол бойынша цикл жоқ.
+
+_NS_PER_DAY = 86_400 * 10**9
+_NS_PER_HOUR = 3_600 * 10**9
+_EPOCH = date(1970, 1, 1)
+
+
+def _parse_utc(values):
+    """ISO жолдары -> (int64 наносекундтар UTC, жарамды жолдар маскасы)
+
+    PostgREST timestamptz мәндерін UTC-де (+00:00) қайтарады: ондай кезде
+    жұрнақ алынып, numpy-дің C талдаушысы қолданылады (pandas ISO8601-ден ~4 есе жылдам).
+    Басқа ығысулар не бос/қате мәндер болса — pandas арқылы.
+    """
+    values = list(values)
+    try:
+        stripped = [v[:-6] if v.endswith("+00:00") else v[:-1] if v.endswith("Z") else None for v in values]
+        if None not in stripped:
+            ns = np.array(stripped, dtype="datetime64[ns]").view("int64")
+            return ns, np.ones(len(ns), dtype=bool)
+    except (AttributeError, TypeError, ValueError):
+        pass
+    parsed = pd.to_datetime(pd.Series(values, dtype="object"), utc=True, format="ISO8601", errors="coerce")
+    parsed = parsed.dt.as_unit("ns")
+    return parsed.array.asi8, parsed.notna().to_numpy()
+
+
+def _to_ns(moment) -> int:
+    if isinstance(moment, datetime):
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return pd.Timestamp(moment).value
+    if isinstance(moment, date):
+        return (moment - _EPOCH).days * _NS_PER_DAY
+    return int(moment)
+
+
+def _day_to_date(day_number) -> date:
+    return _EPOCH + timedelta(days=int(day_number))
+
+
+class QuestionFrame:
+    """Сұрақтар: уақыт бойынша сұрыпталған ns, күн/сағат, санат және пайдаланушы кодтары"""
+
+    def __init__(self, ns, categories, users):
+        order = np.argsort(ns, kind="stable")
+        self.ns = ns[order]
+        self.day = (self.ns // _NS_PER_DAY).astype(np.int32)
+        self.hour = ((self.ns // _NS_PER_HOUR) % 24).astype(np.int8)
+        self.category = pd.Categorical(np.asarray(categories, dtype=object)[order])
+        self.user_codes, self.user_names = pd.factorize(np.asarray(users, dtype=object)[order])
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Supabase жолдары (немесе бөліктер тізбегі) -> кадр; бағандар бір рет жиналады"""
+        if rows and isinstance(rows[0], list):
+            rows = [row for chunk in rows for row in chunk]
+        ns, valid = _parse_utc([row.get("timestamp") for row in rows])
+        # get_questions_by_category() RPC жолы сияқты: санаты жоқ жолдар «Белгісіз»
+        # (әйтпесе pd.Categorical оларды NaN етіп, value_counts() тастап кетеді)
+        categories = np.array([row.get("category") or "Белгісіз" for row in rows], dtype=object)
+        # analytics_top_users() сияқты: username жоқ болса user_id, ол да жоқ болса «Белгісіз»
+        users = np.array([
+            row.get("username") or (str(row["user_id"]) if row.get("user_id") is not None else "Белгісіз")
+            for row in rows
+        ], dtype=object)
+        return cls(ns[valid], categories[valid], users[valid])
+
+    def __len__(self):
+        return len(self.ns)
+
+    # -------------------- МЕТРИКАЛАР --------------------
+
+    def count_between(self, start=None, end=None) -> int:
+        lo = 0 if start is None else np.searchsorted(self.ns, _to_ns(start), side="left")
+        hi = len(self.ns) if end is None else np.searchsorted(self.ns, _to_ns(end), side="left")
+        return int(max(hi - lo, 0))
+
+    def daily_counts(self, start_date, end_date) -> dict:
+        """Аралықтағы әр күн (бос күндер = 0), analytics_daily_questions() пішімінде"""
+        first = (start_date - _EPOCH).days
+        last = (end_date - _EPOCH).days
+        lo = np.searchsorted(self.day, first, side="left")
+        hi = np.searchsorted(self.day, last, side="right")
+        counts = np.bincount(self.day[lo:hi] - first, minlength=last - first + 1)
+        return {(start_date + timedelta(days=i)).isoformat(): int(c) for i, c in enumerate(counts)}
+
+    def hourly(self) -> dict:
+        counts = np.bincount(self.hour, minlength=24)
+        return {hour: int(counts[hour]) for hour in range(24)}
+
+    def category_counts(self) -> dict:
+        counts = self.category.value_counts()
+        return {cat: int(n) for cat, n in counts.sort_values(ascending=False).items() if n > 0}
+
+    def top_users(self, limit=10) -> list:
+        counts = np.bincount(self.user_codes, minlength=len(self.user_names))
+        order = np.argsort(-counts, kind="stable")[:max(limit, 0)]
+        return [(self.user_names[i], int(counts[i])) for i in order if counts[i] > 0]
+
+    def active_users(self, since) -> int:
+        lo = np.searchsorted(self.ns, _to_ns(since), side="left")
+        return int(np.unique(self.user_codes[lo:]).size)
+
+    def per_day(self):
+        """(күн нөмірлері, сандар) тек сұрағы бар күндер үшін"""
+        return np.unique(self.day, return_counts=True)
+
+
+class UserFrame:
+    """Пайдаланушылар: тіркелу уақыты бойынша сұрыпталған ns"""
+
+    def __init__(self, ns):
+        self.ns = np.sort(ns)
+        self.day = (self.ns // _NS_PER_DAY).astype(np.int32)
+
+    @classmethod
+    def from_rows(cls, rows):
+        if rows and isinstance(rows[0], list):
+            rows = [row for chunk in rows for row in chunk]
+        ns, valid = _parse_utc([row.get("created_at") for row in rows])
+        return cls(ns[valid])
+
+    def __len__(self):
+        return len(self.ns)
+
+    def count_between(self, start=None, end=None) -> int:
+        lo = 0 if start is None else np.searchsorted(self.ns, _to_ns(start), side="left")
+        hi = len(self.ns) if end is None else np.searchsorted(self.ns, _to_ns(end), side="left")
+        return int(max(hi - lo, 0))
+
+    def growth(self, start_date, end_date):
+        """(күндік жаңалар, аралық ішіндегі кумулятив), analytics_user_growth() пішімінде"""
+        first = (start_date - _EPOCH).days
+        last = (end_date - _EPOCH).days
+        lo = np.searchsorted(self.day, first, side="left")
+        hi = np.searchsorted(self.day, last, side="right")
+        counts = np.bincount(self.day[lo:hi] - first, minlength=last - first + 1)
+        cumulative = np.cumsum(counts)
+        days = [(start_date + timedelta(days=i)).isoformat() for i in range(len(counts))]
+        return (dict(zip(days, counts.tolist())), dict(zip(days, cumulative.tolist())))
+
+
+def overview(questions: QuestionFrame, users: UserFrame, now=None) -> dict:
+    """statistics_overview view-інің сұрақ/пайдаланушы бағандары"""
+    now = now or datetime.now(timezone.utc)
+    today = now.date()
+    day_numbers, day_counts = questions.per_day()
+    busiest = None
+    if len(day_counts):
+        # Ең көп сұрақ; тең болса ең соңғы күн (view-дегі ORDER BY 2 DESC, 1 DESC)
+        best = len(day_counts) - 1 - int(np.argmax(day_counts[::-1]))
+        busiest = (_day_to_date(day_numbers[best]).isoformat(), int(day_counts[best]))
+    return {
+        "total_users": len(users),
+        "total_questions": len(questions),
+        "questions_today": questions.count_between(today),
+        "new_users_today": users.count_between(today),
+        "new_users_7d": users.count_between(now - timedelta(days=7)),
+        "questions_7d": questions.count_between(now - timedelta(days=7)),
+        "questions_30d": questions.count_between(now - timedelta(days=30)),
+        "active_users_7d": questions.active_users(now - timedelta(days=7)),
+        "active_users_30d": questions.active_users(now - timedelta(days=30)),
+        "active_days": int(len(day_numbers)),
+        "first_question_at": pd.Timestamp(int(questions.ns[0]), tz="UTC").isoformat() if len(questions) else None,
+        "busiest_day": busiest[0] if busiest else None,
+        "busiest_day_count": busiest[1] if busiest else 0,
+    }
@@ -0,0 +1,425 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+import llm_gateway
+from config import (
+    ANSWER_CACHE_ENABLED, ANSWER_CACHE_PATH, ANSWER_CACHE_TTL_HOURS, ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_CATEGORIES, ANSWER_CACHE_SEMANTIC, ANSWER_CACHE_SIMILARITY, ANSWER_CACHE_EMBED_MODEL,
+    ANSWER_CACHE_CONTEXT,
+)
+
+# numpy тек семантикалық деңгейге керек: әдепкіде чат беттері оны жүктемейді
+np = None
+if ANSWER_CACHE_SEMANTIC:
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+
+# -----------------------------
+# 💡 Жауаптар кэші (қайталанатын медициналық / дәрі сұрақтары)
+# -----------------------------
+# Кілт = (аймақ, қалыпқа келтірілген сұрақ). Аймақ — жүйелік промпт, модель,
+# temperature және max_tokens хэші: промпт өзгерсе, ескі жауаптар қолданылмайды.
+# Сақтау орны — жергілікті SQLite (TTL + ең ұзақ қолданылмаған жазбаны шығару).
+# ANSWER_CACHE_SEMANTIC=1 болса, дәл сәйкестік табылмағанда embedding косинус
+# ұқсастығы ANSWER_CACHE_SIMILARITY-ден жоғары жауап алынады.
+# Тек ANSWER_CACHE_CATEGORIES санаттары кэштеледі (психология әдепкіде жоқ — жеке әңгіме).
+#
+# Көп айналымды чат (chat_context): бірінші сұрақтан кейін әр шақыруда контекст
+# бар. ANSWER_CACHE_CONTEXT саясаты:
+#   * standalone (әдепкі) — алдыңғы айналымға сілтемесі жоқ сұрақ («Анемия
+#     белгілері») кэштен тек сұрақ бойынша ізделеді. Табылмаса, модель контекстпен
+#     жауап береді, бірақ ол жауап сақталмайды: ол әңгімеге тәуелді болуы мүмкін.
+#     Кэш тек контекстсіз (чаттың бірінші) сұрақтарымен толтырылады.
+#   * off — контекст болса кэш мүлде айналып өтіледі.
+# Жалғасты сұрақ (есімдік, «ал ... ше?», «тағы», тек «неге?») әрқашан модельге барады.
+# Ескерту: standalone кэштен алынған жауап бұрын айтылған жеке мәліметті (жүктілік,
+# жас) ескермейді — жүйелік промпт бәрібір жалпы ақпарат береді; қатаң керек болса off.
+
+LATENCY_WINDOW = 500
+
+_lock = threading.Lock()
+_conn = None
+_vectors = {}      # scope -> (keys, матрица) — semantic деңгейге арналған жад индексі
+_latencies = []    # іздеу уақыты (мс)
+_stats = {
+    "lookups": 0,
+    "exact_hits": 0,
+    "semantic_hits": 0,
+    "misses": 0,
+    "bypassed": 0,
+    "follow_ups": 0,
+    "context_lookups": 0,
+    "context_hits": 0,
+    "stored": 0,
+    "evicted": 0,
+    "saved_tokens": 0,
+    "saved_ms": 0.0,
+    "errors": 0,
+    "last_error": "",
+}
+
+
+def normalize_question(text: str) -> str:
+    """Регистр, тыныс белгілері және бос орындарсыз түрі"""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    text = re.sub(r"[\W_]+", " ", text)
+    return " ".join(text.split())
+
+
+def make_scope(model, system_prompt, temperature, max_tokens) -> str:
+    raw = f"{model}\x00{temperature}\x00{max_tokens}\x00{system_prompt}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def is_cacheable(category) -> bool:
+    return ANSWER_CACHE_ENABLED and category in ANSWER_CACHE_CATEGORIES
+
+
+# Алдыңғы айналымға сілтейтін сөздер (есімдіктер, «ал/ше», «тағы», «also»)
+FOLLOW_UP_WORDS = frozenset((
+    # қазақша
+    "ол", "оны", "оның", "оған", "одан", "онда", "бұл", "бұны", "мұны", "мұның", "осы", "осыны",
+    "соны", "сонда", "ал", "ше", "тағы", "жоғарыдағы", "айтқан", "айтқаныңыз",
+    # русский
+    "это", "этот", "эта", "эти", "этого", "этим", "его", "ее", "их", "ему", "ей", "он", "она",
+    "они", "оно", "тот", "та", "те", "тогда", "а", "еще", "тоже", "также", "там", "вышеуказанный",
+    # english
+    "it", "its", "this", "that", "these", "those", "they", "them", "their", "he", "she", "him",
+    "her", "also", "too", "else", "instead", "then", "same", "above",
+))
+# Тек осы сөздерден тұратын сұрақ («Неге?», «Қанша?», «Why?») өз алдына мағынасыз
+BARE_WORDS = frozenset((
+    "неге", "неліктен", "қанша", "қашан", "қалай", "иә", "жоқ", "рахмет",
+    "почему", "зачем", "сколько", "когда", "как", "да", "нет", "спасибо",
+    "why", "how", "when", "yes", "no", "ok", "thanks", "long", "much", "many",
+))
+
+
+def is_standalone(question) -> bool:
+    """Сұрақ алдыңғы айналымдарсыз түсінікті ме (кэштен тек сұрақ бойынша іздеуге болады ма)"""
+    tokens = normalize_question(question).replace("ё", "е").split()
+    if not tokens or any(token in FOLLOW_UP_WORDS for token in tokens):
+        return False
+    return not all(token in BARE_WORDS for token in tokens)
+
+
+def _policy(category, question, context) -> str:
+    """cache — іздеу + сақтау; lookup — тек іздеу (контекст бар); bypass — кэшсіз"""
+    if not is_cacheable(category):
+        return "bypass"
+    if not context:
+        return "cache"
+    if ANSWER_CACHE_CONTEXT == "standalone" and is_standalone(question):
+        return "lookup"
+    with _lock:
+        _stats["follow_ups"] += 1
+    return "bypass"
+
+
+# -------------------- SQLITE --------------------
+
+def _connection():
+    """Процесс бойынша бір қосылыс (құлып ішінде шақырылады)"""
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(ANSWER_CACHE_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(ANSWER_CACHE_PATH, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                scope TEXT NOT NULL,
+                qkey TEXT NOT NULL,
+                category TEXT NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                embedding BLOB,
+                tokens INTEGER NOT NULL DEFAULT 0,
+                latency_ms REAL NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (scope, qkey)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_last_used ON answers (last_used)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_created_at ON answers (created_at)")
+        _conn = conn
+    return _conn
+
+
+def _cutoff():
+    return time.time() - ANSWER_CACHE_TTL_HOURS * 3600
+
+
+def _evict(conn):
+    """Мерзімі өткендерді, кейін шектен асқан ең ескі қолданылғандарды өшіру"""
+    removed = conn.execute("DELETE FROM answers WHERE created_at < ?", (_cutoff(),)).rowcount
+    overflow = conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0] - ANSWER_CACHE_MAX_ENTRIES
+    if overflow > 0:
+        removed += conn.execute(
+            "DELETE FROM answers WHERE rowid IN (SELECT rowid FROM answers ORDER BY last_used LIMIT ?)",
+            (overflow,),
+        ).rowcount
+    if removed:
+        _stats["evicted"] += removed
+        _vectors.clear()
+
+
+def _touch(conn, scope, qkey):
+    conn.execute(
+        "UPDATE answers SET last_used = ?, hits = hits + 1 WHERE scope = ? AND qkey = ?",
+        (time.time(), scope, qkey),
+    )
+    conn.commit()
+
+
+# -------------------- SEMANTIC --------------------
+
+def _semantic_enabled() -> bool:
+    return ANSWER_CACHE_SEMANTIC and np is not None
+
+
+def _embed(text):
+    vector = np.asarray(llm_gateway.embed(text, ANSWER_CACHE_EMBED_MODEL), dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _scope_index(conn, scope):
+    """Аймақтың embedding матрицасы (бірінші іздеуде SQLite-тен жүктеледі)"""
+    index = _vectors.get(scope)
+    if index is None:
+        rows = conn.execute(
+            "SELECT qkey, embedding FROM answers WHERE scope = ? AND embedding IS NOT NULL AND created_at >= ?",
+            (scope, _cutoff()),
+        ).fetchall()
+        keys = [row[0] for row in rows]
+        matrix = np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows]) if rows else None
+        index = (keys, matrix)
+        _vectors[scope] = index
+    return index
+
+
+def _append_vector(scope, qkey, vector):
+    """Жүктелген индекске жаңа жолды қосу (қайта оқымай)"""
+    index = _vectors.get(scope)
+    if index is None or vector is None:
+        return
+    keys, matrix = index
+    if matrix is not None and matrix.shape[1] != vector.shape[0]:
+        _vectors.pop(scope, None)
+        return
+    row = vector.astype(np.float32)[None, :]
+    _vectors[scope] = (keys + [qkey], row if matrix is None else np.vstack([matrix, row]))
+
+
+def _semantic_lookup(conn, scope, vector):
+    keys, matrix = _scope_index(conn, scope)
+    if matrix is None or matrix.shape[1] != vector.shape[0]:
+        return None
+    scores = matrix @ vector
+    best = int(np.argmax(scores))
+    if scores[best] < ANSWER_CACHE_SIMILARITY:
+        return None
+    return keys[best]
+
+
+# -------------------- ІЗДЕУ / САҚТАУ --------------------
+
+def _record_latency(started):
+    _latencies.append((time.perf_counter() - started) * 1000)
+    if len(_latencies) > LATENCY_WINDOW:
+        del _latencies[:len(_latencies) - LATENCY_WINDOW]
+
+
+def lookup(scope, question):
+    """(жауап немесе None, embedding немесе None) — embedding сақтау кезінде қайта қолданылады"""
+    started = time.perf_counter()
+    qkey = normalize_question(question)
+    vector = None
+    try:
+        with _lock:
+            _stats["lookups"] += 1
+            conn = _connection()
+            row = conn.execute(
+                "SELECT answer, tokens, latency_ms FROM answers WHERE scope = ? AND qkey = ? AND created_at >= ?",
+                (scope, qkey, _cutoff()),
+            ).fetchone()
+            if row is not None:
+                _stats["exact_hits"] += 1
+                _stats["saved_tokens"] += row[1]
+                _stats["saved_ms"] += row[2]
+                _touch(conn, scope, qkey)
+                _record_latency(started)
+                return row[0], None
+
+        if _semantic_enabled():
+            # Embedding сұранысы құлыптан тыс: басқа сессиялар күтпейді
+            vector = _embed(qkey)
+            with _lock:
+                conn = _connection()
+                match = _semantic_lookup(conn, scope, vector)
+                if match is not None:
+                    row = conn.execute(
+                        "SELECT answer, tokens, latency_ms FROM answers WHERE scope = ? AND qkey = ?",
+                        (scope, match),
+                    ).fetchone()
+                    if row is not None:
+                        _stats["semantic_hits"] += 1
+                        _stats["saved_tokens"] += row[1]
+                        _stats["saved_ms"] += row[2]
+                        _touch(conn, scope, match)
+                        _record_latency(started)
+                        return row[0], vector
+    except Exception as e:
+        # Кэш ақаулығы жауап беруді тоқтатпауы керек
+        with _lock:
+            _stats["errors"] += 1
+            _stats["last_error"] = str(e)
+
+    with _lock:
+        _stats["misses"] += 1
+        _record_latency(started)
+    return None, vector
+
+
+def store(scope, category, question, answer, tokens=0, latency_ms=0.0, vector=None):
+    if not answer:
+        return
+    now = time.time()
+    blob = vector.astype(np.float32).tobytes() if vector is not None else None
+    try:
+        with _lock:
+            conn = _connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO answers "
+                "(scope, qkey, category, question, answer, embedding, tokens, latency_ms, created_at, last_used, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (scope, normalize_question(question), category, question, answer, blob,
+                 int(tokens or 0), float(latency_ms), now, now),
+            )
+            _stats["stored"] += 1
+            _append_vector(scope, normalize_question(question), vector)
+            _evict(conn)
+            conn.commit()
+    except Exception as e:
+        with _lock:
+            _stats["errors"] += 1
+            _stats["last_error"] = str(e)
+
+
+# -------------------- LLM ОРАУЫШТАРЫ --------------------
+
+def _lookup(scope, question, policy):
+    answer, vector = lookup(scope, question)
+    if policy == "lookup":
+        with _lock:
+            _stats["context_lookups"] += 1
+            if answer is not None:
+                _stats["context_hits"] += 1
+    return answer, vector
+
+
+def _messages(system_prompt, question, context=None):
+    return [{"role": "system", "content": system_prompt}, *(context or ()), {"role": "user", "content": question}]
+
+
+def complete(category, model, system_prompt, question, temperature, max_tokens, context=None) -> str:
+    """llm_gateway.complete + кэш. API қатесі шақырушыға жеткізіледі (кэштелмейді).
+
+    context — алдыңғы айналымдар (chat_context); кэш саясаты _policy()-де (жоғарыдағы түсінікті қараңыз).
+    """
+    policy = _policy(category, question, context)
+    if policy == "bypass":
+        with _lock:
+            _stats["bypassed"] += 1
+        return llm_gateway.complete(_messages(system_prompt, question, context), model, temperature, max_tokens)
+
+    scope = make_scope(model, system_prompt, temperature, max_tokens)
+    answer, vector = _lookup(scope, question, policy)
+    if answer is not None:
+        return answer
+    if policy == "lookup":
+        return llm_gateway.complete(_messages(system_prompt, question, context), model, temperature, max_tokens)
+
+    started = time.perf_counter()
+    usage = {}
+    answer = llm_gateway.complete(_messages(system_prompt, question), model, temperature, max_tokens, usage=usage)
+    # Қосалқы (Hugging Face) жауап бұл аймақтың моделіне тиесілі емес — сақталмайды
+    if usage.get("backend") == "openai":
+        store(scope, category, question, answer, usage["total_tokens"], (time.perf_counter() - started) * 1000, vector)
+    return answer
+
+
+def stream(category, model, system_prompt, question, temperature, max_tokens, context=None):
+    """Токендер ағыны + кэш: сәйкестік болса, дайын жауап бірден беріледі.
+
+    Ағын толық аяқталғанда ғана сақталады (үзілген жауап кэшке түспейді).
+    """
+    policy = _policy(category, question, context)
+    if policy == "bypass":
+        with _lock:
+            _stats["bypassed"] += 1
+        yield from llm_gateway.stream(_messages(system_prompt, question, context), model, temperature, max_tokens)
+        return
+
+    scope = make_scope(model, system_prompt, temperature, max_tokens)
+    answer, vector = _lookup(scope, question, policy)
+    if answer is not None:
+        yield answer
+        return
+    if policy == "lookup":
+        yield from llm_gateway.stream(_messages(system_prompt, question, context), model, temperature, max_tokens)
+        return
+
+    started = time.perf_counter()
+    parts = []
+    usage = {}
+    for part in llm_gateway.stream(_messages(system_prompt, question), model, temperature, max_tokens, usage=usage):
+        parts.append(part)
+        yield part
+    if usage.get("backend") == "openai":
+        store(scope, category, question, "".join(parts), usage["total_tokens"],
+              (time.perf_counter() - started) * 1000, vector)
+
+
+# -------------------- СТАТИСТИКА --------------------
+
+def clear_answers():
+    with _lock:
+        conn = _connection()
+        conn.execute("DELETE FROM answers")
+        conn.commit()
+        _vectors.clear()
+
+
+def answer_cache_stats() -> dict:
+    with _lock:
+        stats = dict(_stats)
+        latencies = sorted(_latencies)
+        try:
+            stats["entries"] = _connection().execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        except Exception:
+            stats["entries"] = None
+
+    hits = stats["exact_hits"] + stats["semantic_hits"]
+    answered = hits + stats["misses"]
+    stats["hit_ratio"] = round(hits / answered, 3) if answered else 0.0
+    # Кэштелетін санаттардағы барлық сұрақтардың (жалғасты сұрақтарды қоса) кэштен жауап алған үлесі
+    requests = answered + stats["follow_ups"]
+    stats["served_ratio"] = round(hits / requests, 3) if requests else 0.0
+    stats["context_policy"] = ANSWER_CACHE_CONTEXT
+    stats["saved_ms"] = round(stats["saved_ms"])
+    stats["lookup_p50_ms"] = round(latencies[len(latencies) // 2], 2) if latencies else None
+    stats["lookup_p95_ms"] = round(latencies[int(len(latencies) * 0.95) - 1], 2) if latencies else None
+    stats["semantic"] = _semantic_enabled()
+    stats["categories"] = sorted(ANSWER_CACHE_CATEGORIES)
+    return stats
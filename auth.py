@@ -0,0 +1,270 @@
+import hashlib
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from postgrest.exceptions import APIError
+
+import passwords
+from config import (
+    get_supabase_client,
+    LOGIN_MAX_FAILURES, LOGIN_IP_MAX_FAILURES, LOGIN_WINDOW_SECONDS, LOGIN_NEGATIVE_TTL,
+)
+
+# -----------------------------
+# 🔐 Кіру / тіркелу (Supabase RPC)
+# -----------------------------
+# login_lookup: логин (username/email) бойынша id, username және құпия сөз хэші;
+# хэш Python-да тексеріледі (passwords: scrypt, тұзбен), сосын login_success
+# бір сұраныста last_login-ді жаңартады және қажет болса хэшті ауыстырады
+# (бұрынғы SHA-256 немесе әлсіз параметрлер — пайдаланушыға байқалмайды).
+# register_user: INSERT ... ON CONFLICT DO NOTHING — UNIQUE шектеулеріне сүйенеді,
+# бос нәтиже = username/email бос емес (алдын ала тексеру мен жарыс жоқ).
+# RPC әлі жасалмаған базада (database_setup.sql қайта іске қосылмаған) бұрынғы
+# кесте сұраныстарына оралады.
+#
+# Қорғаныс (процесс бойынша ортақ):
+#   * теріс кэш: жақында қате болған (логин, құпия сөз) жұбы LOGIN_NEGATIVE_TTL
+#     бойы базаға да, scrypt-ке де қайта жіберілмейді;
+#   * шектеуіш: LOGIN_WINDOW_SECONDS ішінде бір логинге LOGIN_MAX_FAILURES, бір IP-ге
+#     LOGIN_IP_MAX_FAILURES сәтсіз әрекеттен кейін кіру уақытша бұғатталады.
+
+MISSING_SCHEMA_CODES = {"PGRST202", "PGRST205", "42P01", "42883"}
+MAX_TRACKED_KEYS = 10000
+
+_lock = threading.Lock()
+_failures = {}     # "login:<логин>" / "ip:<адрес>" -> deque[уақыт]
+_negative = {}     # логин -> {дайджест: мерзімі}
+_dummy_hash = []   # жоқ логин үшін тексерілетін хэш (ағымдағы параметрлермен, бір рет)
+_stats = {
+    "logins": 0, "failures": 0, "negative_hits": 0, "blocked": 0,
+    "registrations": 0, "rehashed": 0, "fallbacks": 0,
+}
+
+
+def _timing_hash():
+    if not _dummy_hash:
+        encoded = passwords.hash_password(passwords.PREFIX)
+        with _lock:
+            if not _dummy_hash:
+                _dummy_hash.append(encoded)
+    return _dummy_hash[0]
+
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
+
+
+def _is_missing_rpc(error) -> bool:
+    return isinstance(error, APIError) and getattr(error, "code", None) in MISSING_SCHEMA_CODES
+
+
+# -------------------- ШЕКТЕУІШ --------------------
+
+def _keys(login, ip):
+    keys = [(f"login:{login.strip().lower()}", LOGIN_MAX_FAILURES)]
+    if ip:
+        keys.append((f"ip:{ip}", LOGIN_IP_MAX_FAILURES))
+    return keys
+
+
+def _recent(key, now):
+    """Терезеден ескі жазбаларды тастап, key-дің сәтсіздіктері (құлып ішінде)"""
+    attempts = _failures.get(key)
+    if attempts is None:
+        return None
+    while attempts and attempts[0] <= now - LOGIN_WINDOW_SECONDS:
+        attempts.popleft()
+    if not attempts:
+        del _failures[key]
+        return None
+    return attempts
+
+
+def retry_after(login, ip=None) -> int:
+    """Бұғатталған болса, қанша секундтан кейін қайта әрекет етуге болады (әйтпесе 0)"""
+    now = time.monotonic()
+    wait = 0.0
+    with _lock:
+        for key, limit in _keys(login, ip):
+            attempts = _recent(key, now)
+            if attempts is not None and len(attempts) >= limit:
+                wait = max(wait, attempts[len(attempts) - limit] + LOGIN_WINDOW_SECONDS - now)
+        if wait > 0:
+            _stats["blocked"] += 1
+    return int(wait) + 1 if wait > 0 else 0
+
+
+def _record_failure(login, ip):
+    now = time.monotonic()
+    with _lock:
+        if len(_failures) >= MAX_TRACKED_KEYS:
+            for key in list(_failures):
+                _recent(key, now)
+        for key, limit in _keys(login, ip):
+            if key in _failures or len(_failures) < MAX_TRACKED_KEYS:
+                _failures.setdefault(key, deque(maxlen=max(limit, 1))).append(now)
+        _stats["failures"] += 1
+
+
+def _clear_failures(login):
+    with _lock:
+        _failures.pop(f"login:{login.strip().lower()}", None)
+
+
+# -------------------- ТЕРІС КЭШ --------------------
+
+def _digest(password):
+    # Жадта құпия сөздің өзі емес, қысқартылған дайджесті ғана (TTL бойы) сақталады
+    return hashlib.sha256(password.encode()).hexdigest()[:16]
+
+
+def _negative_hit(login, password) -> bool:
+    now = time.monotonic()
+    with _lock:
+        entries = _negative.get(login)
+        if not entries:
+            return False
+        expires_at = entries.get(_digest(password))
+        if expires_at is None:
+            return False
+        if expires_at <= now:
+            del entries[_digest(password)]
+            return False
+        _stats["negative_hits"] += 1
+        return True
+
+
+def _remember_negative(login, password):
+    now = time.monotonic()
+    with _lock:
+        if len(_negative) >= MAX_TRACKED_KEYS:
+            for key in [key for key, entries in _negative.items() if max(entries.values()) <= now]:
+                del _negative[key]
+            if len(_negative) >= MAX_TRACKED_KEYS:
+                return
+        _negative.setdefault(login, {})[_digest(password)] = now + LOGIN_NEGATIVE_TTL
+
+
+def forget_negative(*logins):
+    """Жаңа тіркелгеннен кейін бұрынғы «жоқ» жауаптары кіруге кедергі болмауы үшін"""
+    with _lock:
+        for login in logins:
+            _negative.pop(login, None)
+
+
+# -------------------- RPC --------------------
+
+def _lookup(login):
+    """Белсенді пайдаланушы {"id", "username", "password"} немесе None"""
+    supabase = get_supabase_client()
+    try:
+        response = supabase.rpc("login_lookup", {"p_login": login}).execute()
+        return response.data[0] if response.data else None
+    except APIError as e:
+        if not _is_missing_rpc(e):
+            raise
+    _count("fallbacks")
+    response = (
+        supabase.table("users")
+        .select("id, username, password")
+        .or_(f"username.eq.{login},email.eq.{login}")
+        .eq("is_active", True)
+        .limit(1)
+        .execute()
+    )
+    return response.data[0] if response.data else None
+
+
+def _login_success(user_id, new_password_hash=None):
+    """last_login жаңарту (+ қайта хэштелген құпия сөз) бір сұраныста"""
+    supabase = get_supabase_client()
+    try:
+        supabase.rpc("login_success", {"p_user_id": user_id, "p_password": new_password_hash}).execute()
+        return
+    except APIError as e:
+        if not _is_missing_rpc(e):
+            raise
+    _count("fallbacks")
+    values = {"last_login": datetime.now(timezone.utc).isoformat()}
+    if new_password_hash:
+        values["password"] = new_password_hash
+    supabase.table("users").update(values).eq("id", user_id).execute()
+
+
+def authenticate(login, password, ip=None):
+    """(user, retry_after): user = {"id", "username"} немесе None; бұғатталса retry_after > 0"""
+    wait = retry_after(login, ip)
+    if wait:
+        return None, wait
+    if _negative_hit(login, password):
+        _record_failure(login, ip)
+        return None, 0
+    row = _lookup(login)
+    # Пайдаланушы жоқ болса да хэш тексеріледі: жауап уақыты логиннің бар-жоғын ашпайды
+    valid = passwords.verify_password(password, row["password"] if row else _timing_hash())
+    if row is None or not valid:
+        _remember_negative(login, password)
+        _record_failure(login, ip)
+        return None, 0
+    new_hash = passwords.hash_password(password) if passwords.needs_rehash(row["password"]) else None
+    if new_hash:
+        _count("rehashed")
+    _login_success(row["id"], new_hash)
+    _clear_failures(login)
+    _count("logins")
+    return {"id": row["id"], "username": row["username"]}, 0
+
+
+def register(username, email, password):
+    """Жаңа пайдаланушы {"id", "username"}; username/email бос болмаса None"""
+    password_hash = passwords.hash_password(password)
+    supabase = get_supabase_client()
+    try:
+        response = supabase.rpc("register_user", {
+            "p_username": username,
+            "p_email": email,
+            "p_password": password_hash,
+        }).execute()
+        user = response.data[0] if response.data else None
+    except APIError as e:
+        if not _is_missing_rpc(e):
+            raise
+        _count("fallbacks")
+        user = _register_legacy(supabase, username, email, password_hash)
+    if user is not None:
+        forget_negative(username, email)
+        _count("registrations")
+    return user
+
+
+def _register_legacy(supabase, username, email, password_hash):
+    try:
+        response = supabase.table("users").insert({
+            "username": username,
+            "email": email,
+            "password": password_hash,
+        }).execute()
+    except APIError as e:
+        # 23505 = unique_violation: UNIQUE шектеуі екі жарысушының біреуін тоқтатады
+        if getattr(e, "code", None) == "23505":
+            return None
+        raise
+    row = response.data[0] if response.data else {}
+    return {"id": row.get("id"), "username": row.get("username", username)}
+
+
+def auth_stats() -> dict:
+    now = time.monotonic()
+    with _lock:
+        stats = dict(_stats)
+        stats["tracked_keys"] = len(_failures)
+        stats["blocked_keys"] = sum(
+            1 for key, attempts in _failures.items()
+            if len([t for t in attempts if t > now - LOGIN_WINDOW_SECONDS])
+            >= (LOGIN_IP_MAX_FAILURES if key.startswith("ip:") else LOGIN_MAX_FAILURES)
+        )
+        stats["negative_entries"] = sum(len(entries) for entries in _negative.values())
+    return stats
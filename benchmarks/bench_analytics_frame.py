@@ -0,0 +1,107 @@
+"""Аналитика: жол бойынша fromisoformat пен бағаналық кадрды салыстыру.
+
+    python benchmarks/bench_analytics_frame.py              # 1 000 000 синтетикалық сұрақ
+    python benchmarks/bench_analytics_frame.py --rows 200000
+
+«Бұрынғы» тәсіл Analitika-ның ескі кодын қайталайды: әр метрика уақыт жолдарын
+қайтадан datetime.fromisoformat(...replace('Z', '+00:00')) арқылы талдайды.
+"""
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics_frame import QuestionFrame, UserFrame, overview  # noqa: E402
+
+CATEGORIES = ("medical", "medication", "psychology")
+
+
+def synthetic_rows(count, users=5000, days=365, seed=11):
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    questions = []
+    for _ in range(count):
+        ts = now - timedelta(seconds=rng.randrange(days * 86400))
+        user = rng.randrange(users)
+        questions.append({
+            "timestamp": ts.isoformat().replace("+00:00", "Z"),
+            "category": rng.choice(CATEGORIES),
+            "username": f"user{user}",
+            "user_id": user,
+        })
+    registered = [{"created_at": (now - timedelta(seconds=rng.randrange(days * 86400))).isoformat()}
+                  for _ in range(users)]
+    return questions, registered
+
+
+def parse(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def legacy(questions, users, now):
+    """Әр метрика үшін жеке цикл және жеке талдау (бұрынғы Analitika)"""
+    start_date = (now - timedelta(days=30)).date()
+    daily = defaultdict(int)
+    for q in questions:
+        day = parse(q["timestamp"]).date()
+        if day >= start_date:
+            daily[day.isoformat()] += 1
+
+    growth = defaultdict(int)
+    for u in users:
+        growth[parse(u["created_at"]).date().isoformat()] += 1
+
+    hourly = Counter(parse(q["timestamp"]).hour for q in questions)
+
+    week_ago = now - timedelta(days=7)
+    active = {q["username"] for q in questions if parse(q["timestamp"]) >= week_ago}
+
+    last_7_days = len([q for q in questions if parse(q["timestamp"]) >= week_ago])
+    last_30_days = len([q for q in questions if parse(q["timestamp"]) >= now - timedelta(days=30)])
+    new_users_7d = len([u for u in users if parse(u["created_at"]) >= week_ago])
+    return len(daily), len(growth), len(hourly), len(active), last_7_days, last_30_days, new_users_7d
+
+
+def build(questions, users):
+    """Бір рет талдау (Analitika-да TTL бойы кэште тұрады)"""
+    return QuestionFrame.from_rows(questions), UserFrame.from_rows(users)
+
+
+def metrics(frame, user_frame, now):
+    """Барлық метрика дайын кадрдан"""
+    daily = frame.daily_counts((now - timedelta(days=30)).date(), now.date())
+    growth = user_frame.growth((now - timedelta(days=365)).date(), now.date())
+    hourly = frame.hourly()
+    stats = overview(frame, user_frame, now)
+    return (len(daily), len(growth[0]), len(hourly), stats["active_users_7d"],
+            stats["questions_7d"], stats["questions_30d"], stats["new_users_7d"])
+
+
+def timed(name, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    print(f"{name:<12} {time.perf_counter() - start:8.2f} с")
+    return result
+
+
+def main():
+    count = 1_000_000
+    if "--rows" in sys.argv:
+        count = int(sys.argv[sys.argv.index("--rows") + 1])
+
+    print(f"{count} сұрақ генерациялануда...")
+    questions, users = synthetic_rows(count)
+    now = datetime.now(timezone.utc)
+
+    old = timed("бұрынғы", legacy, questions, users, now)
+    frame, user_frame = timed("кадр құру", build, questions, users)
+    new = timed("метрикалар", metrics, frame, user_frame, now)
+    print(f"7/30 күн: {old[4]}/{old[5]} vs {new[4]}/{new[5]} · белсенді (7к): {old[3]} vs {new[3]}")
+
+
+if __name__ == "__main__":
+    main()
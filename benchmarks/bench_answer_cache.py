@@ -0,0 +1,94 @@
+"""Жауаптар кэшінің көп айналымды чаттағы hit rate-і (ANSWER_CACHE_CONTEXT саясаттары).
+
+    python benchmarks/bench_answer_cache.py
+    python benchmarks/bench_answer_cache.py --sessions 2000 --follow-up 0.6
+
+Синтетикалық сессиялар: бірінші сұрақ жиі қойылатын сұрақтардан (Zipf бөлінісі),
+келесі 0-4 айналым не жалғасты сұрақ («Ал балаға ше?», «Неге?»), не жаңа
+тақырыптағы өз алдына сұрақ. Модель шақыруы жалған (llm_gateway.complete
+ауыстырылады), сондықтан тек кэш шешімдері өлшенеді: қанша сұрақ кэштен алынды,
+бірінші және кейінгі айналымдар бөлек. Бір айналымды бенчмарк барлық сұрақты
+контекстсіз жібереді және чаттағы нақты hit rate-ті асыра көрсетеді.
+"""
+import os
+import random
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ["ANSWER_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "answer_cache.sqlite3")
+
+import answer_cache  # noqa: E402
+import llm_gateway  # noqa: E402
+
+POPULAR = [
+    "Парацетамол не үшін қолданылады?", "Тұмау кезінде не ішу керек?", "Қан қысымы көтерілсе не істеу керек?",
+    "Анемия белгілері", "Ибупрофенді қанша рет ішуге болады?", "Гастрит кезінде қандай диета керек?",
+    "Баламның қызуы бар", "Аллергия белгілері қандай?", "Как лечить кашель у ребенка?",
+    "Можно ли пить парацетамол с алкоголем?", "Признаки инсульта", "Что помогает от изжоги?",
+    "Can I take ibuprofen with alcohol?", "What are the symptoms of diabetes?", "How to treat a sore throat?",
+    "Витамин D қанша ішу керек?", "Ұйқысыздықтан қалай құтылуға болады?", "Covid белгілері",
+    "Мигрень ұстаса не істеймін?", "Омепразолды қашан ішкен дұрыс?",
+]
+FOLLOW_UPS = [
+    "Ал балаға ше?", "Оны қанша күн ішемін?", "Неге?", "Бұл қауіпті ме?", "Тағы не істеуге болады?",
+    "А детям можно?", "Сколько дней его пить?", "Is it safe during pregnancy?", "How long?",
+    "Оның жанама әсері бар ма?", "А если не поможет?", "What else can I do?",
+]
+
+
+def _arg(name, default, cast=int):
+    return cast(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
+
+def sessions(count, follow_up, seed=7):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(POPULAR))]
+    for _ in range(count):
+        turns = [rng.choices(POPULAR, weights)[0]]
+        for _ in range(rng.randint(0, 4)):
+            turns.append(rng.choice(FOLLOW_UPS) if rng.random() < follow_up else rng.choices(POPULAR, weights)[0])
+        yield turns
+
+
+def run(policy, count, follow_up):
+    answer_cache.clear_answers()
+    answer_cache.ANSWER_CACHE_CONTEXT = policy
+    calls = {"n": 0}
+
+    def fake_complete(messages, model, temperature, max_tokens, usage=None):
+        calls["n"] += 1
+        if usage is not None:
+            usage.update(backend="openai", total_tokens=600)
+        return f"жауап: {messages[-1]['content']}"
+
+    llm_gateway.complete = fake_complete
+    totals = {"first": [0, 0], "later": [0, 0]}   # [сұрақтар, кэштен]
+    for turns in sessions(count, follow_up):
+        context = []
+        for index, question in enumerate(turns):
+            before = calls["n"]
+            answer = answer_cache.complete("medical", "gpt-4o", "system", question, 0.6, 900, context=context)
+            bucket = totals["first" if index == 0 else "later"]
+            bucket[0] += 1
+            bucket[1] += calls["n"] == before
+            context = context + [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+    asked = totals["first"][0] + totals["later"][0]
+    served = totals["first"][1] + totals["later"][1]
+    print(f"  {policy:<11} бірінші айналым {totals['first'][1] / totals['first'][0]:6.1%}   "
+          f"кейінгі {totals['later'][1] / max(totals['later'][0], 1):6.1%}   "
+          f"барлығы {served / asked:6.1%}   модель шақыруы {calls['n']}/{asked}")
+
+
+def main():
+    count = _arg("--sessions", 1000)
+    follow_up = _arg("--follow-up", 0.5, float)
+    print(f"{count} сессия, кейінгі айналымның {follow_up:.0%}-ы жалғасты сұрақ, "
+          f"{len(POPULAR)} жиі сұрақ (Zipf)")
+    for policy in ("off", "standalone"):
+        run(policy, count, follow_up)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Бір сессияның чат тарихы жады: шексіз dict тізімі және ChatHistory сақина буфері.
+
+    python benchmarks/bench_chat_history.py
+    python benchmarks/bench_chat_history.py --turns 500 --answer-chars 2000
+
+Әр айналым = сұрақ + жауап. tracemalloc бойынша тарихтың алатын жады және
+бір append-тің орташа уақыты (мәтінді жасауды қоса) шығарылады (терезе: CHAT_HISTORY_WINDOW).
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from chat_history import ChatHistory  # noqa: E402
+from config import CHAT_HISTORY_WINDOW  # noqa: E402
+
+
+def conversation(turns, answer_chars):
+    for i in range(turns):
+        yield "user", f"Сұрақ {i}: басым ауырып, қызуым көтерілді, не істеуім керек?"
+        yield "assistant", (f"Жауап {i}. " + "Дәрігерге көрініңіз, суды көп ішіңіз. " * answer_chars)[:answer_chars]
+
+
+def measure(label, make, append, turns, answer_chars):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    history = make()
+    start = time.perf_counter()
+    # Мәтіндер осы жерде жасалады: тарих ұстап қалғандары ғана жадта қалады
+    for role, content in conversation(turns, answer_chars):
+        append(history, role, content)
+    elapsed = time.perf_counter() - start
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"  {label:<28} {used / 1024:9.1f} КБ   {elapsed / (2 * turns) * 1e6:6.2f} мкс/append   хабарлама: {len(history)}")
+    return history
+
+
+def main():
+    turns = int(sys.argv[sys.argv.index("--turns") + 1]) if "--turns" in sys.argv else 300
+    answer_chars = int(sys.argv[sys.argv.index("--answer-chars") + 1]) if "--answer-chars" in sys.argv else 1500
+    print(f"{turns} айналым, жауап ~{answer_chars} таңба, терезе {CHAT_HISTORY_WINDOW}")
+    measure("list[dict] (бұрынғы)", list,
+            lambda history, role, content: history.append({"role": role, "content": content}),
+            turns, answer_chars)
+    history = measure("ChatHistory", lambda: ChatHistory("medical"),
+                      lambda history, role, content: history.append(role, content),
+                      turns, answer_chars)
+    print(f"  ChatHistory.nbytes(): {history.nbytes() / 1024:.1f} КБ, терезеден шыққан: {history.dropped}")
+
+
+if __name__ == "__main__":
+    main()
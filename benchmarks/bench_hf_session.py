@@ -0,0 +1,102 @@
+"""Hugging Face шақыруының қосымша шығыны: әр жолы жаңа клиент пен requests.post
+және ортақ keep-alive Session.
+
+    python benchmarks/bench_hf_session.py
+    python benchmarks/bench_hf_session.py --calls 500 --latency 0.002
+
+hf_mock_server-ге (жергілікті, TLS-сіз) ағынсыз және ағынды шақырулар жіберіледі.
+Бір шақырудың орташа уақыты және сервер қабылдаған TCP қосылыстар саны шығарылады.
+--latency әр жаңа қосылысқа кідіріс қосады (нақты DNS+TCP+TLS орнына еліктеу).
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests  # noqa: E402
+
+import huggingface_chat  # noqa: E402
+from hf_mock_server import RECORDINGS, start_server  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "Парацетамол не үшін қолданылады?"}]
+
+
+class LegacyChat(huggingface_chat.HuggingFaceChat):
+    """Бұрынғы мінез: әр шақыруға жаңа объект және Session-сіз requests.post"""
+
+    def _complete(self, prompt, parameters):
+        url, headers = self._endpoint()
+        resp = requests.post(url, headers=headers, json={"inputs": prompt, "parameters": parameters}, timeout=120)
+        resp.raise_for_status()
+        data = resp.json()
+        return data[0]["generated_text"] if isinstance(data, list) else data.get("generated_text", "")
+
+    def _stream(self, prompt, parameters):
+        url, headers = self._endpoint()
+        payload = {"inputs": prompt, "parameters": parameters, "stream": True}
+        with requests.post(url, headers=headers, json=payload, stream=True, timeout=120) as resp:
+            parser = huggingface_chat.StreamParser()
+            for chunk in resp.iter_content(chunk_size=None):
+                for text in parser.feed(chunk):
+                    yield {"delta": text}
+
+
+def patch_connect_latency(latency):
+    """Әр жаңа TCP қосылысқа кідіріс (DNS + TLS handshake еліктеуі)"""
+    if not latency:
+        return
+    import urllib3.util.connection
+    original = urllib3.util.connection.create_connection
+
+    def slow_connect(*args, **kwargs):
+        time.sleep(latency)
+        return original(*args, **kwargs)
+
+    urllib3.util.connection.create_connection = slow_connect
+
+
+def run(label, server, make_chat, calls, stream):
+    model = "tgi-sse" if stream else "plain-json"
+    expected = RECORDINGS[model]["text"]
+    before = server.connections
+    start = time.perf_counter()
+    for _ in range(calls):
+        chat = make_chat(model)
+        chat.client = None
+        result = chat.generate(MESSAGES, stream=stream)
+        if stream:
+            text = "".join(part["delta"] for part in result)
+        else:
+            text = result if isinstance(result, str) else result["choices"][0]["message"]["content"]
+        assert text == expected, text
+    per_call = (time.perf_counter() - start) / calls * 1000
+    print(f"  {label:<34} {per_call:7.2f} мс/шақыру   TCP қосылыс: {server.connections - before}")
+
+
+def main():
+    calls = int(sys.argv[sys.argv.index("--calls") + 1]) if "--calls" in sys.argv else 300
+    latency = float(sys.argv[sys.argv.index("--latency") + 1]) if "--latency" in sys.argv else 0.0
+    patch_connect_latency(latency)
+
+    server, base_url = start_server()
+    huggingface_chat.HF_API_BASE = base_url
+    print(f"{calls} шақыру, қосылыс кідірісі {latency * 1000:.0f} мс ({base_url})")
+    try:
+        for stream in (False, True):
+            kind = "ағынды" if stream else "ағынсыз"
+            run(f"бұрынғы ({kind})", server,
+                lambda model: LegacyChat(api_key="bench", model=model), calls, stream)
+            shared = {}
+            run(f"ортақ Session ({kind})", server,
+                lambda model: shared.setdefault(model, huggingface_chat.HuggingFaceChat(api_key="bench", model=model)),
+                calls, stream)
+    finally:
+        huggingface_chat.close_session()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
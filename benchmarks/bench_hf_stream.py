@@ -0,0 +1,116 @@
+"""HF ағынын талдау: жазылған ағындарды қайталау + ескі/жаңа талдаушы жылдамдығы.
+
+    python benchmarks/bench_hf_stream.py
+    python benchmarks/bench_hf_stream.py --tokens 20000
+
+1) hf_mock_server жазбаларын нақты HTTP арқылы HuggingFaceChat.generate(stream=True)
+   беріп, мәтін, finish_reason және usage күтілгенмен салыстырылады (қате болса, шығу коды 1).
+2) Ұзын SSE ағыны мен бөліктерге бөлінген JSON денені процесс ішінде талдау:
+   бұрынғы «буферді қайта json.loads» циклі мен StreamParser уақыты және мәтіннің дұрыстығы.
+"""
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hf_mock_server import RECORDINGS, start_server, _tgi_events, _one_event_per_chunk  # noqa: E402
+
+
+def legacy_parse(chunks):
+    """huggingface_chat-тің бұрынғы циклі (өзгеріссіз көшірме)"""
+    buffer = ""
+    for chunk in chunks:
+        part = chunk.decode(errors="ignore")
+        buffer += part
+        try:
+            data = json.loads(buffer)
+            text = ""
+            if isinstance(data, list) and data:
+                text = data[0].get("generated_text", "")
+            elif isinstance(data, dict):
+                text = data.get("generated_text", "")
+            if text:
+                yield text
+                buffer = ""
+        except Exception:
+            yield part
+
+
+def replay(base_url):
+    os.environ["HF_API_BASE"] = base_url
+    import huggingface_chat
+    huggingface_chat.HF_API_BASE = base_url
+
+    failures = 0
+    for name, recording in RECORDINGS.items():
+        chat = huggingface_chat.HuggingFaceChat(api_key="replay", model=name)
+        chat.client = None  # тек HTTP жолы
+        parts = list(chat.generate([{"role": "user", "content": "?"}], stream=True))
+        text = "".join(part["delta"] for part in parts)
+        final = parts[-1]
+        checks = {
+            "мәтін": text == recording["text"],
+            "finish_reason": final.get("finish_reason") == recording["finish_reason"],
+            "completion_tokens": final.get("usage", {}).get("completion_tokens") == recording["completion_tokens"],
+        }
+        if "total_tokens" in recording:
+            checks["total_tokens"] = final["usage"].get("total_tokens") == recording["total_tokens"]
+        ok = all(checks.values())
+        failures += not ok
+        bad = ", ".join(key for key, passed in checks.items() if not passed)
+        print(f"  {'OK ' if ok else 'FAIL'} {name:<22} {len(recording['chunks']):>4} бөлік{'' if ok else '  <- ' + bad}")
+        if not ok:
+            print(f"       алынды: {text!r}")
+    return failures
+
+
+def compare(title, chunks, text):
+    from huggingface_chat import StreamParser
+
+    start = time.perf_counter()
+    parser = StreamParser()
+    parsed = [delta for chunk in chunks for delta in parser.feed(chunk)] + parser.close()
+    new_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    legacy = list(legacy_parse(chunks))
+    old_time = time.perf_counter() - start
+
+    print(f"  {title}: {len(chunks)} бөлік, {sum(map(len, chunks)) / 1024:.0f} КБ")
+    print(f"    бұрынғы      {old_time:8.3f} с   мәтін дұрыс: {''.join(legacy) == text}")
+    print(f"    StreamParser {new_time:8.3f} с   мәтін дұрыс: {''.join(parsed) == text}")
+
+
+def throughput(tokens):
+    text = " ".join(f"сөз{i}" for i in range(tokens))
+    # TGI SSE: бір бөлік = бір оқиға
+    compare("SSE", _one_event_per_chunk(_tgi_events(text)), text)
+    # Ағынсыз JSON дене желіден 256 байттық бөліктермен келеді:
+    # бұрынғы цикл әр бөлікте бүкіл буферді қайта талдайды (квадраттық)
+    body = json.dumps([{"generated_text": text}], ensure_ascii=False).encode("utf-8")
+    compare("JSON дене", [body[i:i + 256] for i in range(0, len(body), 256)], text)
+
+
+def main():
+    tokens = 5000
+    if "--tokens" in sys.argv:
+        tokens = int(sys.argv[sys.argv.index("--tokens") + 1])
+
+    server, base_url = start_server()
+    print(f"Жазбаларды қайталау ({base_url}):")
+    try:
+        failures = replay(base_url)
+    finally:
+        server.shutdown()
+
+    print("Талдау жылдамдығы:")
+    throughput(tokens)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
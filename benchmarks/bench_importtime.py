@@ -0,0 +1,109 @@
+"""main.py суық іске қосылуы: кіру экранына дейінгі импорт уақыты мен жады.
+
+    python benchmarks/bench_importtime.py
+    python benchmarks/bench_importtime.py --runs 10 --top 15
+    python benchmarks/bench_importtime.py --pages
+
+Әр сценарий жаңа интерпретаторда `python -X importtime` арқылы импортталады:
+  * «кіру экраны» — тек `import main` (беттер тізілімі модульдерді әлі жүктемейді);
+  * «бұрынғы» — main + барлық бет модульдері (бұрынғы main.py осылай импорттайтын);
+  * --pages — main + бір бет (сол бетті бірінші ашқандағы қосымша шығын).
+Шығатыны: импорттың медианалық уақыты, процестің ең жоғары RSS-і, жүктелген
+ауыр кітапханалар және -X importtime бойынша ең қымбат жоғарғы деңгейлі импорттар.
+Фондық ағындар (жазу кезегі, мотивациялар пулы) өлшеу кезінде іске қосылмайды.
+"""
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGE_MODULES = [
+    "Surak", "DariDarmek", "Psixologia", "Motivation",
+    "Datasurak", "Analitika", "SuraktardyBakulay", "Bagalay",
+]
+HEAVY = ["pandas", "numpy", "plotly", "openai", "pyarrow", "tiktoken", "huggingface_hub"]
+
+# Бала процесте орындалатын код: импорт уақыты, RSS және жүктелген ауыр модульдер
+CHILD = """
+import json, resource, sys, time
+started = time.perf_counter()
+import motivation_pool, persistence_queue
+motivation_pool.start = persistence_queue.start = lambda *args: None
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": elapsed,
+    "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "heavy": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _top_level(stderr):
+    """-X importtime шығысынан жоғарғы деңгейлі импорттар (шегініссіз жолдар): аты -> cumulative мс"""
+    return {
+        match.group(4): int(match.group(2)) / 1000
+        for match in LINE.finditer(stderr) if len(match.group(3)) == 1
+    }
+
+
+def _startup_modules():
+    """Интерпретатор өзі жүктейтін модульдер (site, encodings...) — тізімнен алынып тасталады"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "pass"],
+                            capture_output=True, text=True, timeout=60)
+    return set(_top_level(result.stderr))
+
+
+def run_once(modules, startup):
+    code = CHILD.format(modules=modules, heavy=HEAVY)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, timeout=300,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "қате")
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+    measured["top"] = {name: ms for name, ms in _top_level(result.stderr).items() if name not in startup}
+    return measured
+
+
+def profile(label, modules, runs, top_n, startup):
+    samples = [run_once(modules, startup) for _ in range(runs)]
+    seconds = statistics.median(sample["seconds"] for sample in samples)
+    rss_mb = statistics.median(sample["rss_kb"] for sample in samples) / 1024
+    last = samples[-1]
+    print(f"{label}")
+    print(f"  импорт {seconds * 1000:8.1f} мс (медиана, {runs} рет)   RSS {rss_mb:6.1f} МБ")
+    print(f"  ауыр кітапханалар: {', '.join(last['heavy']) or 'жоқ'}")
+    for name, ms in sorted(last["top"].items(), key=lambda item: -item[1])[:top_n]:
+        print(f"    {ms:8.1f} мс  {name}")
+    return seconds, rss_mb
+
+
+def main():
+    runs = int(sys.argv[sys.argv.index("--runs") + 1]) if "--runs" in sys.argv else 5
+    top_n = int(sys.argv[sys.argv.index("--top") + 1]) if "--top" in sys.argv else 8
+
+    startup = _startup_modules()
+
+    login = profile("Кіру экраны (import main)", ["main"], runs, top_n, startup)
+    eager = profile("Бұрынғы: main + барлық беттер", ["main"] + PAGE_MODULES, runs, top_n, startup)
+    print(f"\nКіру экранына дейін: {eager[0] * 1000:.0f} -> {login[0] * 1000:.0f} мс, "
+          f"RSS {eager[1]:.0f} -> {login[1]:.0f} МБ")
+
+    if "--pages" in sys.argv:
+        print("\nБетті бірінші ашудың қосымша шығыны:")
+        for page in PAGE_MODULES:
+            seconds, rss_mb = profile(f"main + {page}", ["main", page], runs, 0, startup)
+            print(f"  -> {(seconds - login[0]) * 1000:+.0f} мс, {rss_mb - login[1]:+.0f} МБ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Кілт сөз іздеу: `any(word in q ...)` пен Aho–Corasick автоматын салыстыру.
+
+    python benchmarks/bench_keyword_matcher.py
+
+Кілт сөздер саны өскенде қарапайым тәсіл сызықты баяулайды, ал автоматтың
+құны тек хабарлама ұзындығына тәуелді.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_matcher import KeywordMatcher  # noqa: E402
+
+ALPHABET = "абвгдежзийклмнопрстуфхцчшыэюяәғқңөұүһі"
+SIZES = (10, 100, 1000, 5000)
+MESSAGES = 300
+
+
+def random_word(rng, low=4, high=10):
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(low, high)))
+
+
+def make_message(rng, words=60):
+    return " ".join(random_word(rng, 2, 9) for _ in range(words))
+
+
+def throughput(func, messages):
+    start = time.perf_counter()
+    for message in messages:
+        func(message)
+    elapsed = time.perf_counter() - start
+    chars = sum(len(message) for message in messages)
+    return len(messages) / elapsed, chars / elapsed / 1024
+
+
+def main():
+    rng = random.Random(7)
+    messages = [make_message(rng) for _ in range(MESSAGES)]
+    avg_len = sum(len(m) for m in messages) // len(messages)
+    print(f"{MESSAGES} хабарлама, орташа ұзындығы {avg_len} таңба\n")
+    print(f"{'кілттер':>8} | {'any(in) хаб/с':>14} | {'автомат хаб/с':>14} | {'автомат КБ/с':>12} | құру, мс")
+    for size in SIZES:
+        keywords = [random_word(rng) for _ in range(size)]
+        lowered = [k.lower() for k in keywords]
+
+        start = time.perf_counter()
+        matcher = KeywordMatcher(keywords)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        naive_rate, _ = throughput(lambda q: any(word in q.lower() for word in lowered), messages)
+        auto_rate, auto_kb = throughput(matcher.find_all, messages)
+        print(f"{size:>8} | {naive_rate:>14.0f} | {auto_rate:>14.0f} | {auto_kb:>12.0f} | {build_ms:.1f}")
+
+
+if __name__ == "__main__":
+    main()
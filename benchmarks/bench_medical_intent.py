@@ -0,0 +1,63 @@
+"""Медициналық ниет: жергілікті классификатор мен LLM gate салыстыру.
+
+    python benchmarks/bench_medical_intent.py          # тек жергілікті модель
+    python benchmarks/bench_medical_intent.py --llm    # + gpt-4o-mini gate (OPENAI_API_KEY керек)
+
+eval — оқу жиынымен бір стильде жазылған; tuning — бір сөзді ауру атаулары,
+дәрілер, симптом ғана және kk/ru/en тұжырымдары (лексикон соның қателерімен
+бапталған, көрсеткіштері оптимистік); heldout — баптауға қолданылмаған жиын,
+шынайы бағалау тек осы.
+Маңызды көрсеткіш — gate recall: медициналық сұрақтың жергілікті бас тартылмаған үлесі.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import MEDICAL_INTENT_LOW, MEDICAL_INTENT_HIGH  # noqa: E402
+from medical_intent import get_classifier, load_dataset, gate_report, recall  # noqa: E402
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+def run(name, predict, rows, repeat=1):
+    latencies = []
+    correct = 0
+    for row in rows:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            prediction = predict(row["text"])
+            latencies.append((time.perf_counter() - start) * 1000)
+        correct += prediction == bool(row["label"])
+    print(f"{name:<22} дәлдік={correct / len(rows):.3f}  "
+          f"p50={percentile(latencies, 0.5):.4f}мс  p99={percentile(latencies, 0.99):.4f}мс")
+
+
+def main():
+    classifier = get_classifier()
+    if classifier is None:
+        sys.exit("Модель жоқ: алдымен `python medical_intent.py train` іске қосыңыз")
+
+    for split in ("eval", "tuning", "heldout"):
+        rows = load_dataset(split)
+        print(f"\n{split} жиыны: {len(rows)} сұрақ, медициналық recall {recall(classifier, rows):.3f}")
+        run("жергілікті (0.5)", lambda text: classifier.predict_proba(text) >= 0.5, rows, repeat=200)
+
+        report = gate_report(rows, MEDICAL_INTENT_LOW, MEDICAL_INTENT_HIGH)
+        print(f"gate [{MEDICAL_INTENT_LOW}, {MEDICAL_INTENT_HIGH}]: қабылдау {report['accepted']}, "
+              f"бас тарту {report['rejected']}, LLM-ге {report['deferred']}/{len(rows)}, "
+              f"gate recall {report['gate_recall']:.3f}, қате қабылдау {len(report['false_accepts'])}")
+
+        if "--llm" in sys.argv:
+            from Surak import is_medical_question, llm_is_medical_question
+
+            run("LLM gate (бұрынғы)", llm_is_medical_question, rows)
+            run("гибрид (жаңа)", is_medical_question, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Құпия сөз хэшінің құны: scrypt N калибрлеуі және кіру пулының өткізу қабілеті.
+
+    python benchmarks/bench_passwords.py
+    python benchmarks/bench_passwords.py --target-ms 250 --logins 64 --concurrency 16
+
+Шығатыны:
+  * N = 2^14 ... PASSWORD_MAX_MEMORY_MB шегіне дейін: бір хэштің медианалық уақыты және жадысы;
+  * PASSWORD_HASH_MS (немесе --target-ms) бюджетіне калибрленген N;
+  * бұрынғы тұзсыз SHA-256 мен scrypt-тің бір тексеру құны (шабуылдаушы үшін де солай);
+  * --concurrency бір мезгілдегі кіру: 1 ағын және PASSWORD_WORKERS ағын пулымен
+    секундына тексеру саны, p50/p95 кідіріс;
+  * .env үшін ұсынылатын PASSWORD_SCRYPT_N.
+"""
+import hashlib
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import passwords  # noqa: E402
+from config import (  # noqa: E402
+    PASSWORD_HASH_MS, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P, PASSWORD_MAX_MEMORY_MB, PASSWORD_WORKERS,
+)
+
+
+def _arg(name, default, cast=int):
+    return cast(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
+
+def encode(password, n, r, p):
+    salt = os.urandom(passwords.SALT_BYTES)
+    digest = passwords._scrypt(password, salt, n, r, p)
+    return f"{passwords.PREFIX}${n}${r}${p}${passwords._b64(salt)}${passwords._b64(digest)}"
+
+
+def calibration_table(r, p, max_memory_mb):
+    print(f"scrypt r={r}, p={p}, жады шегі {max_memory_mb} МБ")
+    n = passwords.MIN_N
+    while 128 * r * n <= max_memory_mb * 1024 * 1024:
+        ms = passwords.measure(n, r, p)
+        print(f"  N=2^{n.bit_length() - 1:<3} {128 * r * n / (1024 * 1024):6.1f} МБ   {ms:8.1f} мс")
+        n *= 2
+
+
+def legacy_vs_scrypt(n, r, p, repeat=2000):
+    started = time.perf_counter()
+    for i in range(repeat):
+        hashlib.sha256(f"password-{i}".encode()).hexdigest()
+    legacy_ms = (time.perf_counter() - started) / repeat * 1000
+    scrypt_ms = passwords.measure(n, r, p)
+    print(f"\nБір тексеру: SHA-256 {legacy_ms * 1000:.2f} мкс, scrypt {scrypt_ms:.1f} мс "
+          f"(~{scrypt_ms / legacy_ms:,.0f} есе қымбат; бір ядроға секундына {1000 / scrypt_ms:.1f} болжам)")
+
+
+def throughput(n, r, p, logins, concurrency):
+    encoded = encode("correct horse", n, r, p)
+    print(f"\n{logins} кіру, бір мезгілде {concurrency} (nproc={os.cpu_count()}):")
+    for workers in sorted({1, max(PASSWORD_WORKERS, 1)}):
+        pool = ThreadPoolExecutor(max_workers=workers)
+        latencies = []
+
+        def login(_):
+            started = time.perf_counter()
+            # Сессия ағыны пулға тапсырып күтеді (passwords.verify_password сияқты)
+            assert pool.submit(passwords._verify, "correct horse", encoded).result()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as sessions:
+            started = time.perf_counter()
+            list(sessions.map(login, range(logins)))
+            elapsed = time.perf_counter() - started
+        pool.shutdown()
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"  {workers:>2} ағын: {logins / elapsed:6.1f} тексеру/с   "
+              f"p50 {statistics.median(latencies):7.1f} мс   p95 {p95:7.1f} мс   "
+              f"жады ≤ {workers * 128 * r * n / (1024 * 1024):.0f} МБ")
+
+
+def main():
+    target_ms = _arg("--target-ms", PASSWORD_HASH_MS)
+    r = _arg("--r", PASSWORD_SCRYPT_R)
+    p = _arg("--p", PASSWORD_SCRYPT_P)
+    max_memory_mb = _arg("--max-memory-mb", PASSWORD_MAX_MEMORY_MB)
+
+    calibration_table(r, p, max_memory_mb)
+    result = passwords.calibrate(target_ms, r, p, max_memory_mb)
+    n = result["n"]
+    print(f"\n{target_ms} мс бюджетіне: N=2^{n.bit_length() - 1} ({n}), {result['ms']} мс")
+
+    legacy_vs_scrypt(n, r, p)
+    throughput(n, r, p, _arg("--logins", 32), _arg("--concurrency", 8))
+    print(f"\n.env үшін: PASSWORD_SCRYPT_N={n}")
+
+
+if __name__ == "__main__":
+    main()
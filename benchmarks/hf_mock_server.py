@@ -0,0 +1,165 @@
+"""Hugging Face Inference API-дің жергілікті орынбасары: жазылған ағындарды қайталайды.
+
+    python benchmarks/hf_mock_server.py --port 8089
+    HF_API_BASE=http://127.0.0.1:8089 HF_MODEL=tgi-sse streamlit run main.py
+
+POST /models/<жазба аты> сұранысына сол жазбаның бөліктері (chunk) дәл сол
+шекаралармен қайтарылады: UTF-8 әрпінің ортасы, жолдың ортасы, бір бөліктегі
+бірнеше оқиға, CRLF, keep-alive түсініктемелері. Жазбалар мен күтілетін
+нәтижелер RECORDINGS ішінде; bench_hf_stream.py оларды салыстырады.
+"""
+import json
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = "Парацетамол қызуды түсіреді және ауырсынуды басады. Дәрігермен кеңесіңіз 💊"
+
+
+def _tokens(text):
+    """Мәтінді «токендерге» бөлу (сөз + бос орын)"""
+    words = text.split(" ")
+    return [word + (" " if i < len(words) - 1 else "") for i, word in enumerate(words)]
+
+
+def _tgi_events(text, crlf=False):
+    newline = "\r\n" if crlf else "\n"
+    tokens = _tokens(text)
+    events = []
+    for i, token in enumerate(tokens):
+        last = i == len(tokens) - 1
+        event = {
+            "index": i,
+            "token": {"id": i, "text": token, "logprob": -0.1, "special": False},
+            "generated_text": text if last else None,
+            "details": {"finish_reason": "eos_token", "generated_tokens": len(tokens) + 1} if last else None,
+        }
+        events.append(f"data:{json.dumps(event, ensure_ascii=False)}{newline}{newline}")
+    # Арнайы токен (</s>) мәтінге қосылмауы тиіс
+    special = {"token": {"id": 2, "text": "</s>", "special": True}, "generated_text": None, "details": None}
+    events.insert(len(events) - 1, f"data:{json.dumps(special)}{newline}{newline}")
+    return "".join(events).encode("utf-8")
+
+
+def _openai_events(text):
+    events = [": keep-alive\n\n"]
+    for token in _tokens(text):
+        chunk = {"object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {"content": token}}]}
+        events.append(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+    final = {
+        "object": "chat.completion.chunk",
+        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 21, "completion_tokens": len(_tokens(text)), "total_tokens": 21 + len(_tokens(text))},
+    }
+    events.append(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n")
+    return "".join(events).encode("utf-8")
+
+
+def _ndjson(text):
+    lines = [json.dumps({"token": {"text": token, "special": False}}, ensure_ascii=False) for token in _tokens(text)]
+    lines.append(json.dumps({"token": {"text": "", "special": True},
+                             "details": {"finish_reason": "length", "generated_tokens": len(lines)}}))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _split_every(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def _one_event_per_chunk(data, separator=b"\n\n"):
+    parts = data.split(separator)
+    return [part + separator for part in parts[:-1]] + ([parts[-1]] if parts[-1] else [])
+
+
+# жазба аты -> бөліктер, күтілетін мәтін, finish_reason, usage
+RECORDINGS = {
+    "tgi-sse": {
+        "chunks": _one_event_per_chunk(_tgi_events(ANSWER)),
+        "text": ANSWER, "finish_reason": "eos_token", "completion_tokens": len(_tokens(ANSWER)) + 1,
+    },
+    "tgi-sse-split-utf8": {
+        # 7 байттық бөліктер: кирилл әріптері (2 байт) мен эмодзи (4 байт) бөлініп келеді
+        "chunks": _split_every(_tgi_events(ANSWER), 7),
+        "text": ANSWER, "finish_reason": "eos_token", "completion_tokens": len(_tokens(ANSWER)) + 1,
+    },
+    "tgi-sse-crlf-batched": {
+        # Бір бөлікте бірнеше оқиға + CRLF
+        "chunks": _split_every(_tgi_events(ANSWER, crlf=True), 600),
+        "text": ANSWER, "finish_reason": "eos_token", "completion_tokens": len(_tokens(ANSWER)) + 1,
+    },
+    "openai-sse": {
+        "chunks": _split_every(_openai_events(ANSWER), 33),
+        "text": ANSWER, "finish_reason": "stop", "completion_tokens": len(_tokens(ANSWER)), "total_tokens": 21 + len(_tokens(ANSWER)),
+    },
+    "ndjson": {
+        "chunks": _split_every(_ndjson(ANSWER), 50),
+        "text": ANSWER, "finish_reason": "length", "completion_tokens": len(_tokens(ANSWER)),
+    },
+    "plain-json": {
+        # Ағын қолдамайтын модель: бір JSON дене, соңында жаңа жол жоқ
+        "chunks": _split_every(json.dumps([{"generated_text": ANSWER}], ensure_ascii=False).encode("utf-8"), 16),
+        "text": ANSWER, "finish_reason": "stop", "completion_tokens": 1,
+        "content_type": "application/json",
+    },
+}
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1: клиент keep-alive қосылысты қайта қолдана алады
+    protocol_version = "HTTP/1.1"
+    chunk_delay = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        # Кішкентай бөліктер Nagle алгоритмінде кідірмесін (нақты серверлердегідей)
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.stats_lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        name = self.path.rsplit("/", 1)[-1]
+        recording = RECORDINGS.get(name)
+        if recording is None:
+            self.send_response(410)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", recording.get("content_type", "text/event-stream; charset=utf-8"))
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for chunk in recording["chunks"]:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.flush()
+            if self.chunk_delay:
+                time.sleep(self.chunk_delay)
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def start_server(port=0, chunk_delay=0.0):
+    """Фондық ағында сервер; (server, base_url) қайтарады"""
+    handler = type("Handler", (ReplayHandler,), {"chunk_delay": chunk_delay})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.connections = 0  # қабылданған TCP қосылыстар саны
+    server.stats_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[sys.argv.index("--port") + 1]) if "--port" in sys.argv else 8089
+    server, base_url = start_server(port, chunk_delay=0.02)
+    print(f"HF_API_BASE={base_url}  жазбалар: {', '.join(RECORDINGS)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,130 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+from postgrest import ReturnMethod
+
+from config import get_supabase_client, BULK_CHUNK_SIZE, UNDO_WINDOW_MINUTES
+from data_cache import invalidate
+
+# -----------------------------
+# 🧹 Сұрақтарға топтық операциялар
+# -----------------------------
+# Өшіру жұмсақ: deleted_at белгіленеді, UNDO_WINDOW_MINUTES ішінде қайтаруға болады,
+# кейін purge_deleted_questions() біржола өшіреді. Әр сұраныс BULK_CHUNK_SIZE
+# id-ден аспайды (in_ сүзгісі), сондықтан URL мен транзакция шектеулі.
+#
+# Қайтару жазбасы (make_undo) операциядан бұрын жасалады, ал purge терезеге
+# PURGE_GRACE_MINUTES қосады: қайтару батырмасы көрініп тұрған жол (және
+# қолданба мен база сағаттарының аздаған айырмасы) ешқашан біржола өшірілмейді.
+
+PURGE_GRACE_MINUTES = 1
+
+_purge_lock = threading.Lock()
+_last_purge = float("-inf")   # monotonic() кез келген мәннен кіші: бірінші purge өткізілмейді
+
+
+def _now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def chunked(ids, size=BULK_CHUNK_SIZE):
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+def _bulk_update(ids, values, progress=None, user_id=None, only_null=None):
+    """ids бөліктермен жаңарту; progress(done, total) әр бөліктен кейін шақырылады.
+
+    Нақты өзгерген жолдар санын қайтарады.
+    """
+    ids = list(ids)
+    if not ids:
+        return 0
+    supabase = get_supabase_client()
+    updated = 0
+    done = 0
+    try:
+        for chunk in chunked(ids):
+            query = supabase.table("questions").update(values, count="exact", returning=ReturnMethod.minimal)
+            query = query.in_("id", chunk)
+            if user_id is not None:
+                query = query.eq("user_id", user_id)
+            if only_null:
+                query = query.is_(only_null, "null")
+            response = query.execute()
+            updated += response.count or 0
+            done += len(chunk)
+            if progress:
+                progress(done, len(ids))
+    finally:
+        # Жартылай орындалса да, кэштегі санаулар ескірді
+        invalidate("questions")
+    return updated
+
+
+def soft_delete(ids, progress=None, user_id=None):
+    return _bulk_update(ids, {"deleted_at": _now_iso()}, progress, user_id, only_null="deleted_at")
+
+
+def restore(ids, progress=None, user_id=None):
+    return _bulk_update(ids, {"deleted_at": None}, progress, user_id)
+
+
+def archive(ids, progress=None):
+    return _bulk_update(ids, {"archived_at": _now_iso()}, progress, only_null="archived_at")
+
+
+def unarchive(ids, progress=None):
+    return _bulk_update(ids, {"archived_at": None}, progress)
+
+
+def user_question_ids(user_id):
+    """Пайдаланушының өшірілмеген сұрақ id-лері (id бойынша keyset, бөліктермен)"""
+    supabase = get_supabase_client()
+    ids = []
+    last_id = 0
+    while True:
+        rows = (supabase.table("questions").select("id")
+                .eq("user_id", user_id).is_("deleted_at", "null").gt("id", last_id)
+                .order("id").limit(BULK_CHUNK_SIZE).execute().data)
+        ids.extend(row["id"] for row in rows)
+        if len(rows) < BULK_CHUNK_SIZE:
+            return ids
+        last_id = rows[-1]["id"]
+
+
+# -------------------- ҚАЙТАРУ --------------------
+
+def make_undo(action, ids):
+    """Сессияда сақталатын қайтару жазбасы (операция басталмай тұрып жасалады)"""
+    return {"action": action, "ids": list(ids), "at": time.time()}
+
+
+def undo_seconds_left(record) -> int:
+    if not record:
+        return 0
+    return max(0, int(record["at"] + UNDO_WINDOW_MINUTES * 60 - time.time()))
+
+
+def undo(record, progress=None, user_id=None):
+    if record["action"] == "archive":
+        return unarchive(record["ids"], progress)
+    return restore(record["ids"], progress, user_id)
+
+
+def maybe_purge():
+    """Қайтару терезесі өткен жолдарды өшіру (процесс бойынша терезеге бір рет)"""
+    global _last_purge
+    now = time.monotonic()
+    with _purge_lock:
+        if now - _last_purge < UNDO_WINDOW_MINUTES * 60:
+            return 0
+        _last_purge = now
+    try:
+        response = get_supabase_client().rpc(
+            "purge_deleted_questions", {"p_older_than_minutes": UNDO_WINDOW_MINUTES + PURGE_GRACE_MINUTES}
+        ).execute()
+        return response.data or 0
+    except Exception:
+        return 0
@@ -0,0 +1,146 @@
+from functools import lru_cache
+
+import streamlit as st
+
+import llm_gateway
+from config import CHAT_CONTEXT_TOKENS, CHAT_SUMMARY_TOKENS
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# -----------------------------
+# 🧵 Көп айналымды чат контексті
+# -----------------------------
+# Модельге [жүйелік промпт, ағымдағы сұрақ] ғана емес, соңғы айналымдар
+# CHAT_CONTEXT_TOKENS шегінде жіберіледі. Шектен асқан ескі айналымдар
+# gpt-4o-mini арқылы қысқа «жинақталған мазмұнға» біріктіріледі; ол сессияда
+# сақталады және келесі жолы тек жаңа шыққан айналымдармен толықтырылады.
+# Жинақтау гистерезиспен жүреді: шек асқанда тарих бюджеттің жартысына дейін
+# қысқарады, сондықтан mini шақыруы әр айналымда емес, бірнеше айналымда бір рет.
+
+SUMMARY_MODEL = "gpt-4o-mini"
+MESSAGE_OVERHEAD = 4  # рөл және бөлгіш токендері (шамамен)
+
+SUMMARY_PROMPT = (
+    "Сіз әңгімені қысқартушысыз. Алдыңғы қысқаша мазмұнды және жаңа хабарламаларды "
+    "біріктіріп, бір қысқа мазмұн жазыңыз: пайдаланушының негізгі сұрақтары, айтқан "
+    "симптомдары/дәрілері/жағдайы және берілген негізгі кеңестер. Жаңа ақпарат қоспаңыз. "
+    "Қазақ тілінде, 5-8 сөйлемнен аспасын."
+)
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """Токендер саны: tiktoken болса дәл, әйтпесе шамамен (кирилл үшін ~3 таңба = 1 токен)"""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text or ""))
+    return (len(text or "") + 2) // 3
+
+
+def _included(message) -> bool:
+    """Модельге жіберілетін хабарлама ма (gate ескертулері мен бос жолдар емес)"""
+    return (message.get("role") in ("user", "assistant") and bool(message.get("content"))
+            and message.get("in_context", True))
+
+
+def _message_tokens(message) -> int:
+    if not _included(message):
+        return 0
+    return count_tokens(message.get("content") or "") + MESSAGE_OVERHEAD
+
+
+def _summarize(previous, turns) -> str:
+    transcript = "\n".join(
+        f"{'Пайдаланушы' if m['role'] == 'user' else 'Көмекші'}: {m['content']}" for m in turns
+    )
+    request = (f"Алдыңғы мазмұн:\n{previous}\n\n" if previous else "") + f"Жаңа хабарламалар:\n{transcript}"
+    return llm_gateway.complete(
+        [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": request},
+        ],
+        model=SUMMARY_MODEL,
+        temperature=0.2,
+        max_tokens=CHAT_SUMMARY_TOKENS,
+    ).strip()
+
+
+def reset_context(key):
+    st.session_state.pop(f"{key}_context", None)
+
+
+def build_context(key, history, budget=CHAT_CONTEXT_TOKENS, offset=0):
+    """Ағымдағы сұрақтан бұрынғы хабарламалар -> модельге жіберілетін контекст.
+
+    history — сессиядағы тарих (ағымдағы сұрақсыз). Нәтиже: [қысқаша мазмұн (system),
+    соңғы айналымдар...]. Жинақтау күйі st.session_state[f"{key}_context"]-те.
+    offset — history[0]-ден бұрын сақина буферден шығып кеткен хабарламалар саны
+    (ChatHistory.dropped): covered бүкіл әңгіме бойынша абсолют индекс болып қалады.
+    Сондықтан тарих сүзілмейді: контекстке кірмейтін хабарламалар (in_context=False,
+    бос мазмұн) орнында қалып, тек 0 токен алады және модельге жіберілмейді.
+    """
+    history = list(history)
+    state = st.session_state.get(f"{key}_context")
+    if state is None or state["covered"] > offset + len(history):
+        # Жаңа чат немесе тарих тазаланған
+        state = {"summary": "", "covered": 0}
+
+    # Жинақталмай терезеден шыққан хабарламалар контекстке енді кірмейді
+    start = max(state["covered"] - offset, 0)
+    sizes = [_message_tokens(m) for m in history[start:]]
+    summary_tokens = count_tokens(state["summary"]) + MESSAGE_OVERHEAD if state["summary"] else 0
+
+    if summary_tokens + sum(sizes) > budget:
+        # Бюджеттің жартысы қалғанша ескі хабарламаларды жинақтауға жібереміз
+        keep = budget // 2 - min(summary_tokens, CHAT_SUMMARY_TOKENS)
+        kept = 0
+        cut = len(sizes)
+        while cut > 0 and kept + sizes[cut - 1] <= keep:
+            cut -= 1
+            kept += sizes[cut]
+        # Айналым жұбын бұзбау үшін қалатын бөлік пайдаланушы хабарламасынан басталсын
+        while cut < len(sizes) and history[start + cut]["role"] != "user":
+            cut += 1
+        folded = [m for m in history[start:start + cut] if _included(m)]
+        if folded:
+            try:
+                state = {"summary": _summarize(state["summary"], folded), "covered": offset + start + cut}
+            except Exception:
+                # Жинақтау сәтсіз: ескі хабарламалар бұл жолы жай тасталады, келесі жолы қайта әрекет
+                pass
+        elif cut:
+            state = {"summary": state["summary"], "covered": offset + start + cut}
+        start += cut
+
+    st.session_state[f"{key}_context"] = state
+
+    recent = history[start:]
+    # Жинақтау сәтсіз болса да бюджеттен аспау: ең жаңаларын қалдырамыз
+    used = count_tokens(state["summary"]) + MESSAGE_OVERHEAD if state["summary"] else 0
+    fitted = []
+    for message in reversed(recent):
+        if not _included(message):
+            continue
+        used += _message_tokens(message)
+        if used > budget:
+            break
+        fitted.append({"role": message["role"], "content": message["content"]})
+    fitted.reverse()
+
+    context = []
+    if state["summary"]:
+        context.append({"role": "system", "content": f"Әңгіменің алдыңғы бөлігінің қысқаша мазмұны:\n{state['summary']}"})
+    return context + fitted
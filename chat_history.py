@@ -0,0 +1,194 @@
+import sys
+import threading
+import weakref
+from collections import deque
+from datetime import datetime
+
+import streamlit as st
+
+from config import CHAT_HISTORY_WINDOW, get_supabase_client
+from persistence_queue import flush
+
+# -----------------------------
+# 🗂️ Чат тарихы: шектеулі сақина буфер
+# -----------------------------
+# Сессияда тек соңғы CHAT_HISTORY_WINDOW хабарлама сақталады (__slots__ жазбалары,
+# dict-сіз). Терезеден шыққан айналымдар жадтан жай тасталады: олар
+# persistence_queue арқылы questions кестесіне әлдеқашан жазылған. Пайдаланушы
+# «ертеректегі хабарламаларды» сұрағанда ғана сол жолдар Supabase-тен
+# timestamp бойынша беттеп жүктеледі (тек көрсету үшін, модель контекстіне кірмейді).
+# Процестегі барлық тарихтар әлсіз сілтемемен тіркеледі: history_stats() жады есебін береді.
+
+_lock = threading.Lock()
+_histories = weakref.WeakSet()
+
+
+class Message:
+    """Бір хабарлама. chat_context үшін dict сияқты оқылады: m["role"], m.get("content").
+
+    in_context=False — тек көрсетіледі, модель контекстіне кірмейді (gate ескертулері).
+    """
+
+    __slots__ = ("role", "content", "created", "in_context")
+
+    def __init__(self, role, content, created=None, in_context=True):
+        self.role = role
+        self.content = content
+        self.created = created or datetime.now().isoformat()
+        self.in_context = in_context
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self) + sys.getsizeof(self.content) + sys.getsizeof(self.created)
+
+
+class ChatHistory:
+    """Соңғы window хабарлама + сұрау бойынша жүктелген ертеректегі айналымдар"""
+
+    __slots__ = ("category", "window", "dropped", "_messages", "_earlier", "_more", "__weakref__")
+
+    def __init__(self, category, messages=(), window=CHAT_HISTORY_WINDOW):
+        self.category = category
+        self.window = max(window, 2)
+        self.dropped = 0        # терезеден шыққан хабарламалар (chat_context ығысуы)
+        self._messages = deque()
+        self._earlier = []      # Supabase-тен қайта жүктелгендер (ескісі басында)
+        self._more = False      # базада тағы ертеректегі айналымдар болуы мүмкін
+        for message in messages:
+            self.append(message["role"], message["content"])
+        with _lock:
+            _histories.add(self)
+
+    def append(self, role, content, in_context=True):
+        self._messages.append(Message(role, content, in_context=in_context))
+        if len(self._messages) > self.window:
+            # Бүтін айналыммен шығарамыз: терезе әрқашан пайдаланушы хабарламасынан басталады
+            while len(self._messages) > 1 and (
+                len(self._messages) > self.window or self._messages[0].role != "user"
+            ):
+                self._messages.popleft()
+                self.dropped += 1
+            self._more = True
+
+    def reject_last(self, warning):
+        """Соңғы сұрақ тексеруден өтпеді: ол да, ескерту де контекстке жіберілмейді"""
+        if self._messages and self._messages[-1].role == "user":
+            self._messages[-1].in_context = False
+        self.append("assistant", warning, in_context=False)
+
+    def clear(self):
+        self._messages.clear()
+        self._earlier.clear()
+        self.dropped = 0
+        self._more = False
+
+    def __len__(self):
+        return len(self._messages)
+
+    def __iter__(self):
+        return iter(self._messages)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self._messages)[index]
+        return self._messages[index]
+
+    def __bool__(self):
+        return bool(self._messages or self._earlier)
+
+    @property
+    def has_earlier(self) -> bool:
+        return self._more
+
+    def visible(self):
+        """Көрсетуге: қайта жүктелген ертеректегілер + жадтағы терезе"""
+        return self._earlier + list(self._messages)
+
+    def load_earlier(self, user_id, count) -> int:
+        """Терезеден бұрынғы count-қа жуық хабарламаны questions кестесінен жүктеу"""
+        if not (self._more and user_id):
+            self._more = False
+            return 0
+        oldest = self._earlier[0] if self._earlier else (self._messages[0] if self._messages else None)
+        if oldest is None:
+            self._more = False
+            return 0
+        pairs = max(count // 2, 1)
+        rows = _fetch_before(user_id, self.category, oldest.created, pairs)
+        if len(rows) < pairs:
+            self._more = False
+        loaded = []
+        for row in reversed(rows):
+            loaded.append(Message("user", row["question"], row["timestamp"]))
+            loaded.append(Message("assistant", row.get("answer") or "", row["timestamp"]))
+        self._earlier[:0] = loaded
+        return len(loaded)
+
+    def nbytes(self) -> int:
+        # Көшірме: басқа сессияның ағыны буферді осы кезде өзгертуі мүмкін (history_stats)
+        messages = sum(message.nbytes() for message in tuple(self._messages))
+        earlier = sum(message.nbytes() for message in tuple(self._earlier))
+        return sys.getsizeof(self) + sys.getsizeof(self._messages) + sys.getsizeof(self._earlier) + messages + earlier
+
+
+def _fetch_before(user_id, category, before, limit):
+    """Пайдаланушының осы санаттағы before-ден ертерек сақталған айналымдары (жаңасы басында)"""
+    # Терезеден шыққан, бірақ әлі кезекте тұрған жолдар да табылуы үшін
+    flush(timeout=2.0)
+    try:
+        response = (
+            get_supabase_client().table("questions")
+            .select("question, answer, timestamp")
+            .eq("user_id", user_id).eq("category", category).is_("deleted_at", "null")
+            .lt("timestamp", before)
+            .order("timestamp", desc=True).limit(limit)
+            .execute()
+        )
+        return response.data or []
+    except Exception as e:
+        st.error(f"Ертеректегі хабарламаларды жүктеу қатесі: {str(e)}")
+        return []
+
+
+# -------------------- СЕССИЯ --------------------
+
+def session_history(key, category) -> ChatHistory:
+    """st.session_state[key] ішіндегі тарих (бұрынғы list-тер бірінші оқылғанда көшіріледі)"""
+    history = st.session_state.get(key)
+    if not isinstance(history, ChatHistory):
+        history = ChatHistory(category, history or ())
+        st.session_state[key] = history
+    return history
+
+
+def session_memory() -> dict:
+    """Ағымдағы сессиядағы чат тарихтарының жады (байт)"""
+    return {
+        key: value.nbytes() for key, value in st.session_state.items()
+        if isinstance(value, ChatHistory)
+    }
+
+
+def history_stats() -> dict:
+    """Процестегі барлық сессиялардың чат тарихтары бойынша жады есебі"""
+    with _lock:
+        histories = list(_histories)
+    sizes = [history.nbytes() for history in histories]
+    return {
+        "histories": len(histories),
+        "messages": sum(len(history) for history in histories),
+        "rehydrated": sum(len(history._earlier) for history in histories),
+        "dropped": sum(history.dropped for history in histories),
+        "bytes": sum(sizes),
+        "max_bytes": max(sizes, default=0),
+        "avg_bytes": round(sum(sizes) / len(sizes)) if sizes else 0,
+        "window": CHAT_HISTORY_WINDOW,
+    }
@@ -0,0 +1,36 @@
+import streamlit as st
+
+from config import CHAT_RENDER_MESSAGES
+
+# -----------------------------
+# 🗨️ Чат бөлігін көрсету
+# -----------------------------
+# Чат беттерінің сөйлесу бөлігі st.fragment ішінде орындалады: жаңа хабарлама
+# тек сол бөлікті қайта іске қосады, main.py, бүйір панель мен CSS қайта құрылмайды.
+# Тарихтың соңғы CHAT_RENDER_MESSAGES хабарламасы ғана салынады, сондықтан бір
+# хабарламаның сервердегі құны әңгіменің ұзындығына тәуелді емес; ертеректегілер
+# батырма арқылы бөлік-бөлігімен ашылады. Сессия жадынан шыққан айналымдар
+# (chat_history.ChatHistory) сол кезде questions кестесінен қайта жүктеледі.
+
+
+def render_history(key, history, limit=CHAT_RENDER_MESSAGES):
+    """Соңғы хабарламаларды st.chat_message ретінде салу"""
+    state_key = f"{key}_render_limit"
+    messages = history.visible()
+    if len(messages) <= limit and not history.has_earlier:
+        # Тарих тазаланды немесе әлі қысқа: терезе әдепкі өлшемге оралады
+        st.session_state.pop(state_key, None)
+    shown = st.session_state.get(state_key, limit)
+
+    hidden = len(messages) - shown
+    label = "⬆️ Ертеректегі хабарламалар" + (f" ({hidden})" if hidden > 0 else "")
+    if (hidden > 0 or history.has_earlier) and st.button(label, key=f"{key}_show_earlier"):
+        shown += limit
+        st.session_state[state_key] = shown
+        if shown > len(messages):
+            history.load_earlier(st.session_state.get("user_id"), shown - len(messages))
+            messages = history.visible()
+
+    for msg in messages[max(len(messages) - shown, 0):]:
+        with st.chat_message(msg["role"]):
+            st.write(msg["content"])
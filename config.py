@@ -1,5 +1,7 @@
 import os
-from supabase import create_client, Client
+import threading
+import time
+from supabase import create_client, Client, ClientOptions
 from dotenv import load_dotenv
 
 # .env файлын жүктеу
@@ -9,21 +11,251 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
+# Supabase HTTP пул баптаулары
+SUPABASE_POOL_SIZE = int(os.getenv("SUPABASE_POOL_SIZE", "20"))
+SUPABASE_KEEPALIVE = int(os.getenv("SUPABASE_KEEPALIVE", "10"))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30"))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "10"))
+SUPABASE_HEALTH_INTERVAL = float(os.getenv("SUPABASE_HEALTH_INTERVAL", "60"))
+
+# Сұрақ-жауаптарды фондық жазу кезегі
+PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", "50"))
+PERSIST_FLUSH_INTERVAL = float(os.getenv("PERSIST_FLUSH_INTERVAL", "2"))
+PERSIST_MAX_RETRIES = int(os.getenv("PERSIST_MAX_RETRIES", "5"))
+PERSIST_BACKOFF = float(os.getenv("PERSIST_BACKOFF", "0.5"))
+PERSIST_SHUTDOWN_TIMEOUT = float(os.getenv("PERSIST_SHUTDOWN_TIMEOUT", "5"))
+PERSIST_JOURNAL_PATH = os.getenv(
+    "PERSIST_JOURNAL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "pending_writes.jsonl"),
+)
+# Журнал арқылы қанша рет қайталанған соң жол dead-letter файлына кетеді
+PERSIST_MAX_REPLAYS = int(os.getenv("PERSIST_MAX_REPLAYS", "5"))
+PERSIST_DEAD_LETTER_PATH = os.getenv(
+    "PERSIST_DEAD_LETTER_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "dead_letter_writes.jsonl"),
+)
+
+# Топтық модерация: бір сұраныстағы id саны және жұмсақ өшіруді қайтару терезесі
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "200"))
+UNDO_WINDOW_MINUTES = int(os.getenv("UNDO_WINDOW_MINUTES", "10"))
+
+# Экспорт: Supabase-тен бір сұраныста оқылатын жол саны
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+# Жауаптар кэші (қайталанатын медициналық / дәрі сұрақтары)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+ANSWER_CACHE_PATH = os.getenv(
+    "ANSWER_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "answer_cache.sqlite3"),
+)
+ANSWER_CACHE_TTL_HOURS = float(os.getenv("ANSWER_CACHE_TTL_HOURS", "168"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+# Психология әдепкіде кэштелмейді: әңгімелер жеке
+ANSWER_CACHE_CATEGORIES = {
+    c.strip() for c in os.getenv("ANSWER_CACHE_CATEGORIES", "medical,medication").split(",") if c.strip()
+}
+ANSWER_CACHE_SEMANTIC = os.getenv("ANSWER_CACHE_SEMANTIC", "0") == "1"
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+ANSWER_CACHE_EMBED_MODEL = os.getenv("ANSWER_CACHE_EMBED_MODEL", "text-embedding-3-small")
+# Көп айналымды чатта: standalone — алдыңғы айналымдарға сілтемесіз сұрақ кэштен
+# ізделеді (тек сұрақ бойынша); off — контекст болса кэш мүлде айналып өтіледі
+ANSWER_CACHE_CONTEXT = os.getenv("ANSWER_CACHE_CONTEXT", "standalone")
+
+# Мотивациялар пулы: тақырып бойынша күніне алдын ала дайындалатын мәтіндер
+MOTIVATION_POOL_SIZE = int(os.getenv("MOTIVATION_POOL_SIZE", "12"))
+MOTIVATION_POOL_PATH = os.getenv(
+    "MOTIVATION_POOL_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "motivation_pool.json"),
+)
+MOTIVATION_RETRY_SECONDS = float(os.getenv("MOTIVATION_RETRY_SECONDS", "300"))
+
 # OpenAI API конфигурациясы
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Чат жауаптарын токен бойынша көрсету (0 = толық жауапты спиннермен күту)
+LLM_STREAMING = os.getenv("LLM_STREAMING", "1") == "1"
+# Чат контексті: алдыңғы айналымдарға берілетін токен бюджеті және қысқаша мазмұн ұзындығы
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "3000"))
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "300"))
+# Сессия жадында сақталатын соңғы хабарламалар (ескілері questions кестесінен қайта жүктеледі)
+CHAT_HISTORY_WINDOW = int(os.getenv("CHAT_HISTORY_WINDOW", "40"))
+# Чат бетінде бірден салынатын соңғы хабарламалар (ертеректегілері батырмамен ашылады)
+CHAT_RENDER_MESSAGES = int(os.getenv("CHAT_RENDER_MESSAGES", "30"))
+# Жергілікті медициналық классификатор шектері: HIGH-тан жоғары — бірден өтеді; LOW-дан төмен
+# болса да тек медициналық емес тақырып сөзі бар сұрақ бірден бас тартылады, қалғанын LLM тексереді
+MEDICAL_INTENT_LOW = float(os.getenv("MEDICAL_INTENT_LOW", "0.2"))
+MEDICAL_INTENT_HIGH = float(os.getenv("MEDICAL_INTENT_HIGH", "0.8"))
 
 # Hugging Face конфигурациясы
 HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
 
+# LLM шлюзі: ортақ клиент, дедлайндар, қайталаулар және параллельдік шегі
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "90"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF = float(os.getenv("LLM_BACKOFF", "0.5"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+# OpenAI қолжетімсіз болса, HUGGINGFACE_API_KEY арқылы жауап беру
+LLM_HF_FALLBACK = os.getenv("LLM_HF_FALLBACK", "1") == "1"
+
+# Кіру қорғанысы: терезе ішіндегі сәтсіз әрекеттер шегі және теріс кэш мерзімі (сек)
+LOGIN_MAX_FAILURES = int(os.getenv("LOGIN_MAX_FAILURES", "5"))
+LOGIN_IP_MAX_FAILURES = int(os.getenv("LOGIN_IP_MAX_FAILURES", "20"))
+LOGIN_WINDOW_SECONDS = float(os.getenv("LOGIN_WINDOW_SECONDS", "300"))
+LOGIN_NEGATIVE_TTL = float(os.getenv("LOGIN_NEGATIVE_TTL", "30"))
+# Қолданба алдындағы X-Forwarded-For қосатын сенімді прокси саны (0 = тақырыпқа сенбеу)
+LOGIN_TRUSTED_PROXIES = int(os.getenv("LOGIN_TRUSTED_PROXIES", "1"))
+
+# Құпия сөз хэші (scrypt): бір хэштің уақыт бюджеті (мс), N (0 = іске қосылғанда калибрлеу)
+PASSWORD_HASH_MS = float(os.getenv("PASSWORD_HASH_MS", "200"))
+PASSWORD_SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", "0"))
+PASSWORD_SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+PASSWORD_SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+PASSWORD_MAX_MEMORY_MB = int(os.getenv("PASSWORD_MAX_MEMORY_MB", "64"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "4"))
+
 # Админ тіркелгі мәліметтері
 ADMIN_USERNAME = "1"
 ADMIN_PASSWORD = "1"
 
+# -----------------------------
+# 🔌 Supabase клиенттер реестрі
+# -----------------------------
+# Процесс бойынша бір клиент: Streamlit сессиялары мен rerun-дар
+# бір HTTP пулды (keep-alive қосылыстар) бөліседі.
+_client_lock = threading.Lock()
+_client = None
+_http = None
+_last_health_check = 0.0
+_pool_stats = {"created": 0, "requests": 0, "health_checks": 0, "health_failures": 0}
+
+
+def _build_http_client():
+    """Keep-alive пулы бар httpx клиенті (Supabase нұсқасы қолдаса)"""
+    try:
+        import httpx
+    except ImportError:
+        return None
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=SUPABASE_POOL_SIZE,
+            max_keepalive_connections=SUPABASE_KEEPALIVE,
+            keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+        ),
+        timeout=SUPABASE_TIMEOUT,
+        http2=False,
+    )
+
+
+def _create_pooled_client():
+    http = _build_http_client()
+    try:
+        options = ClientOptions(httpx_client=http, postgrest_client_timeout=SUPABASE_TIMEOUT)
+    except TypeError:
+        # Ескі supabase-py: сыртқы httpx клиентін қабылдамайды, ішкі пул қолданылады
+        if http is not None:
+            http.close()
+        http = None
+        options = ClientOptions(postgrest_client_timeout=SUPABASE_TIMEOUT)
+    client = create_client(SUPABASE_URL, SUPABASE_KEY, options=options)
+    return client, http
+
+
+def _session_http(client):
+    """Клиент нақты қолданатын httpx сессиясы"""
+    if _http is not None:
+        return _http
+    try:
+        return client.postgrest.session
+    except Exception:
+        return None
+
+
+def _is_healthy(client) -> bool:
+    """Пулдағы қосылыстың тірі екенін арзан HEAD сұранысымен тексеру"""
+    http = _session_http(client)
+    if http is None:
+        return True
+    try:
+        http.head(
+            f"{SUPABASE_URL}/rest/v1/",
+            headers={"apikey": SUPABASE_KEY},
+            timeout=min(SUPABASE_TIMEOUT, 5.0),
+        )
+        return True
+    except Exception:
+        return False
+
+
+def reset_supabase_client():
+    """Ортақ клиентті жабу (келесі шақыруда жаңасы жасалады)"""
+    global _client, _http
+    with _client_lock:
+        if _http is not None:
+            try:
+                _http.close()
+            except Exception:
+                pass
+        _client = None
+        _http = None
+
+
 # Supabase клиенті
 def get_supabase_client() -> Client:
+    global _client, _http, _last_health_check
     if not SUPABASE_URL or not SUPABASE_KEY:
         raise ValueError("❌ SUPABASE_URL немесе SUPABASE_KEY .env ішінен жүктелмеді!")
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
+    with _client_lock:
+        _pool_stats["requests"] += 1
+        client = _client
+        now = time.monotonic()
+        needs_check = client is not None and now - _last_health_check >= SUPABASE_HEALTH_INTERVAL
+        if needs_check:
+            _last_health_check = now
+            _pool_stats["health_checks"] += 1
+
+    # Тексеру құлыптан тыс: басқа сессиялар HEAD сұранысын күтпейді
+    if needs_check and not _is_healthy(client):
+        with _client_lock:
+            _pool_stats["health_failures"] += 1
+            if _client is client:
+                if _http is not None:
+                    try:
+                        _http.close()
+                    except Exception:
+                        pass
+                _client = None
+                _http = None
+
+    with _client_lock:
+        if _client is None:
+            _client, _http = _create_pooled_client()
+            _pool_stats["created"] += 1
+            _last_health_check = time.monotonic()
+        return _client
+
+
+def get_supabase_pool_stats() -> dict:
+    """Пул статистикасы: ашық/бос қосылыстар және қайта пайдалану үлесі"""
+    with _client_lock:
+        stats = dict(_pool_stats)
+        client = _client
+
+    requests_total = stats["requests"]
+    stats["reuse_ratio"] = round(1 - stats["created"] / requests_total, 4) if requests_total else 0.0
+    stats["pool_size"] = SUPABASE_POOL_SIZE
+    stats["open_connections"] = None
+    stats["idle_connections"] = None
+
+    http = _session_http(client) if client is not None else None
+    try:
+        connections = http._transport._pool.connections
+        stats["open_connections"] = sum(1 for c in connections if not c.is_closed())
+        stats["idle_connections"] = sum(1 for c in connections if c.is_idle())
+    except Exception:
+        pass
+    return stats
 
 # Google Form сілтемесі
 FEEDBACK_FORM_URL = "https://docs.google.com/forms/d/e/1FAIpQLSd57kyirolWpwdFfHjNgsCm2DYLe_eDFITi3yo8PpbVFRoOCg/viewform?usp=publish-editor"
@@ -0,0 +1,129 @@
+import threading
+import time
+from functools import wraps
+
+# -----------------------------
+# 🗃️ TTL кэш (процесс бойынша ортақ)
+# -----------------------------
+# Кілт = (жүктеуші аты, аргументтер), сондықтан күндер аралығы да кілтке кіреді.
+# Тегтер жазу жолдарынан нақты инвалидация жасауға мүмкіндік береді:
+#   invalidate("questions") -> сұрақтарға тәуелді барлық жүктеушілер тазаланады.
+
+MAX_ENTRIES = 512
+
+_lock = threading.Lock()
+_entries = {}      # key -> (expires_at, value)
+_tag_keys = {}     # tag -> {key, ...}
+_stats = {}        # name -> {"hits", "misses", "errors", "invalidations", "ttl", "last_error"}
+_generation = 0    # инвалидация сайын өседі: жүктеу кезінде өзгерсе, ескі нәтиже сақталмайды
+
+
+def _name_stats(name, ttl):
+    stats = _stats.get(name)
+    if stats is None:
+        stats = {"hits": 0, "misses": 0, "errors": 0, "invalidations": 0, "ttl": ttl, "last_error": ""}
+        _stats[name] = stats
+    return stats
+
+
+def _prune(now):
+    """Мерзімі өткен жазбаларды, қажет болса ең ескілерін өшіру (құлып ішінде)"""
+    removed = [key for key, (expires_at, _) in _entries.items() if expires_at <= now]
+    if len(_entries) - len(removed) >= MAX_ENTRIES:
+        alive = sorted((k for k in _entries if _entries[k][0] > now), key=lambda k: _entries[k][0])
+        removed.extend(alive[:len(alive) - MAX_ENTRIES + 1])
+    for key in removed:
+        del _entries[key]
+    for keys in _tag_keys.values():
+        keys.difference_update(removed)
+
+
+def cached(name, ttl, tags=(), default=None):
+    """Жүктеушіні TTL кэшпен орау.
+
+    Қате болса нәтиже кэштелмейді: default() қайтарылады, қате статистикаға жазылады.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (name, args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            with _lock:
+                stats = _name_stats(name, ttl)
+                entry = _entries.get(key)
+                if entry is not None and entry[0] > now:
+                    stats["hits"] += 1
+                    return entry[1]
+                stats["misses"] += 1
+                generation = _generation
+
+            try:
+                value = func(*args, **kwargs)
+            except Exception as e:
+                with _lock:
+                    stats["errors"] += 1
+                    stats["last_error"] = str(e)
+                if default is None:
+                    raise
+                return default()
+
+            with _lock:
+                if generation != _generation:
+                    return value
+                if len(_entries) >= MAX_ENTRIES:
+                    _prune(now)
+                _entries[key] = (now + ttl, value)
+                for tag in (name,) + tuple(tags):
+                    _tag_keys.setdefault(tag, set()).add(key)
+            return value
+
+        wrapper.cache_name = name
+        return wrapper
+    return decorator
+
+
+def invalidate(*tags):
+    """Берілген тегтерге (немесе жүктеуші аттарына) байланысты жазбаларды өшіру"""
+    global _generation
+    with _lock:
+        _generation += 1
+        for tag in tags:
+            for key in _tag_keys.pop(tag, set()):
+                if _entries.pop(key, None) is not None:
+                    _name_stats(key[0], None)["invalidations"] += 1
+
+
+def clear_cache():
+    """Барлық кэшті тазалау (мысалы, «Деректерді жаңарту» батырмасы)"""
+    global _generation
+    with _lock:
+        _generation += 1
+        for key in _entries:
+            _name_stats(key[0], None)["invalidations"] += 1
+        _entries.clear()
+        _tag_keys.clear()
+
+
+def cache_stats():
+    """Әр жүктеуші бойынша hit/miss есептегіштері"""
+    now = time.monotonic()
+    with _lock:
+        live = {}
+        for key, (expires_at, _) in _entries.items():
+            if expires_at > now:
+                live[key[0]] = live.get(key[0], 0) + 1
+        rows = []
+        for name, stats in sorted(_stats.items()):
+            lookups = stats["hits"] + stats["misses"]
+            rows.append({
+                "name": name,
+                "ttl": stats["ttl"],
+                "hits": stats["hits"],
+                "misses": stats["misses"],
+                "hit_ratio": round(stats["hits"] / lookups, 3) if lookups else 0.0,
+                "entries": live.get(name, 0),
+                "invalidations": stats["invalidations"],
+                "errors": stats["errors"],
+                "last_error": stats["last_error"],
+            })
+        return rows
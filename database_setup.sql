@@ -31,13 +31,17 @@ CREATE TABLE IF NOT EXISTS public.questions (
     category TEXT NOT NULL CHECK (category IN ('medical', 'medication', 'psychology', 'other')),
     "timestamp" TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     is_answered BOOLEAN NOT NULL DEFAULT TRUE,
-    answer_quality INTEGER CHECK (answer_quality BETWEEN 1 AND 5)
+    answer_quality INTEGER CHECK (answer_quality BETWEEN 1 AND 5),
+    deleted_at TIMESTAMPTZ,  -- жұмсақ өшіру: қайтару терезесінен кейін purge_deleted_questions() өшіреді
+    archived_at TIMESTAMPTZ  -- модерациядан өткен, тізімнен жасырылған
 );
 
 ALTER TABLE public.questions
     ADD COLUMN IF NOT EXISTS username TEXT,
     ADD COLUMN IF NOT EXISTS is_answered BOOLEAN NOT NULL DEFAULT TRUE,
-    ADD COLUMN IF NOT EXISTS answer_quality INTEGER;
+    ADD COLUMN IF NOT EXISTS answer_quality INTEGER,
+    ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS archived_at TIMESTAMPTZ;
 
 -- category/answer_quality check-тері жоқ болса қосамыз
 DO $$
@@ -112,6 +116,20 @@ CREATE INDEX IF NOT EXISTS idx_questions_username ON public.questions(username);
 CREATE INDEX IF NOT EXISTS idx_questions_category ON public.questions(category);
 CREATE INDEX IF NOT EXISTS idx_questions_timestamp ON public.questions("timestamp" DESC);
 CREATE INDEX IF NOT EXISTS idx_questions_user_time ON public.questions(user_id, "timestamp" DESC);
+CREATE INDEX IF NOT EXISTS idx_questions_deleted_at ON public.questions(deleted_at) WHERE deleted_at IS NOT NULL;
+
+-- Толық мәтінді іздеу: 'simple' конфигурациясы (қазақ тіліне стеммер жоқ),
+-- жұрнақтарды префикс сұранысы (ауыр:*) жабады; қате/ішкі сәйкестікке — триграмма.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE public.questions
+    ADD COLUMN IF NOT EXISTS search_tsv TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', COALESCE(question, '')), 'A') ||
+        setweight(to_tsvector('simple', COALESCE(answer, '')), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_questions_search_tsv ON public.questions USING GIN (search_tsv);
+CREATE INDEX IF NOT EXISTS idx_questions_question_trgm ON public.questions USING GIN (question gin_trgm_ops);
 
 CREATE INDEX IF NOT EXISTS idx_feedback_timestamp ON public.feedback("timestamp" DESC);
 CREATE INDEX IF NOT EXISTS idx_feedback_rating ON public.feedback(rating);
@@ -131,15 +149,597 @@ DROP POLICY IF EXISTS feedback_select_all ON public.feedback;
 DROP POLICY IF EXISTS feedback_insert_own ON public.feedback;
 
 -- =========================================================
--- 6) Аналитика view
+-- 6) DAILY_STATS: күн × санат × сағат жиынтығы
+-- =========================================================
+-- Сұрақ жолдарында category толтырылады; users/feedback жолдарында category = ''.
+-- Триггерлер statement деңгейінде: көп жолды INSERT/DELETE бір upsert-пен жаңарады.
+-- Жұмсақ өшірілген сұрақтар (deleted_at IS NOT NULL) жиынтыққа кірмейді.
+CREATE TABLE IF NOT EXISTS public.daily_stats (
+    day DATE NOT NULL,
+    category TEXT NOT NULL DEFAULT '',
+    hour SMALLINT NOT NULL CHECK (hour BETWEEN 0 AND 23),
+    questions INTEGER NOT NULL DEFAULT 0,
+    new_users INTEGER NOT NULL DEFAULT 0,
+    feedback_count INTEGER NOT NULL DEFAULT 0,
+    rating_sum INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, category, hour)
+);
+
+ALTER TABLE public.daily_stats DISABLE ROW LEVEL SECURITY;
+
+CREATE OR REPLACE FUNCTION public.daily_stats_questions_sync()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO public.daily_stats AS s (day, category, hour, questions)
+        SELECT (n."timestamp" AT TIME ZONE 'UTC')::date, n.category,
+               EXTRACT(HOUR FROM n."timestamp" AT TIME ZONE 'UTC')::smallint, COUNT(*)
+        FROM new_rows n
+        WHERE n.deleted_at IS NULL
+        GROUP BY 1, 2, 3
+        ON CONFLICT (day, category, hour)
+        DO UPDATE SET questions = s.questions + EXCLUDED.questions;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO public.daily_stats AS s (day, category, hour, questions)
+        SELECT (o."timestamp" AT TIME ZONE 'UTC')::date, o.category,
+               EXTRACT(HOUR FROM o."timestamp" AT TIME ZONE 'UTC')::smallint, -COUNT(*)
+        FROM old_rows o
+        WHERE o.deleted_at IS NULL
+        GROUP BY 1, 2, 3
+        ON CONFLICT (day, category, hour)
+        DO UPDATE SET questions = s.questions + EXCLUDED.questions;
+    ELSIF TG_OP = 'UPDATE' THEN
+        -- Жұмсақ өшіру/қайтару (және санат не уақыт өзгерісі): ескі тірі жолдар -1, жаңалары +1
+        INSERT INTO public.daily_stats AS s (day, category, hour, questions)
+        SELECT d.day, d.category, d.hour, SUM(d.delta)
+        FROM (
+            SELECT (o."timestamp" AT TIME ZONE 'UTC')::date AS day, o.category,
+                   EXTRACT(HOUR FROM o."timestamp" AT TIME ZONE 'UTC')::smallint AS hour, -1 AS delta
+            FROM old_rows o
+            WHERE o.deleted_at IS NULL
+            UNION ALL
+            SELECT (n."timestamp" AT TIME ZONE 'UTC')::date, n.category,
+                   EXTRACT(HOUR FROM n."timestamp" AT TIME ZONE 'UTC')::smallint, 1
+            FROM new_rows n
+            WHERE n.deleted_at IS NULL
+        ) AS d
+        GROUP BY 1, 2, 3
+        HAVING SUM(d.delta) <> 0
+        ON CONFLICT (day, category, hour)
+        DO UPDATE SET questions = s.questions + EXCLUDED.questions;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.daily_stats_users_sync()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO public.daily_stats AS s (day, category, hour, new_users)
+        SELECT (n.created_at AT TIME ZONE 'UTC')::date, '',
+               EXTRACT(HOUR FROM n.created_at AT TIME ZONE 'UTC')::smallint, COUNT(*)
+        FROM new_rows n
+        GROUP BY 1, 2, 3
+        ON CONFLICT (day, category, hour)
+        DO UPDATE SET new_users = s.new_users + EXCLUDED.new_users;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO public.daily_stats AS s (day, category, hour, new_users)
+        SELECT (o.created_at AT TIME ZONE 'UTC')::date, '',
+               EXTRACT(HOUR FROM o.created_at AT TIME ZONE 'UTC')::smallint, -COUNT(*)
+        FROM old_rows o
+        GROUP BY 1, 2, 3
+        ON CONFLICT (day, category, hour)
+        DO UPDATE SET new_users = s.new_users + EXCLUDED.new_users;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.daily_stats_feedback_sync()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO public.daily_stats AS s (day, category, hour, feedback_count, rating_sum)
+        SELECT (n."timestamp" AT TIME ZONE 'UTC')::date, '',
+               EXTRACT(HOUR FROM n."timestamp" AT TIME ZONE 'UTC')::smallint,
+               COUNT(*), COALESCE(SUM(n.rating), 0)
+        FROM new_rows n
+        GROUP BY 1, 2, 3
+        ON CONFLICT (day, category, hour)
+        DO UPDATE SET feedback_count = s.feedback_count + EXCLUDED.feedback_count,
+                      rating_sum = s.rating_sum + EXCLUDED.rating_sum;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO public.daily_stats AS s (day, category, hour, feedback_count, rating_sum)
+        SELECT (o."timestamp" AT TIME ZONE 'UTC')::date, '',
+               EXTRACT(HOUR FROM o."timestamp" AT TIME ZONE 'UTC')::smallint,
+               -COUNT(*), -COALESCE(SUM(o.rating), 0)
+        FROM old_rows o
+        GROUP BY 1, 2, 3
+        ON CONFLICT (day, category, hour)
+        DO UPDATE SET feedback_count = s.feedback_count + EXCLUDED.feedback_count,
+                      rating_sum = s.rating_sum + EXCLUDED.rating_sum;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- Transition table бар триггер тек бір оқиғаға ғана рұқсат етіледі
+DROP TRIGGER IF EXISTS trg_daily_stats_questions_ins ON public.questions;
+CREATE TRIGGER trg_daily_stats_questions_ins
+AFTER INSERT ON public.questions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION public.daily_stats_questions_sync();
+
+DROP TRIGGER IF EXISTS trg_daily_stats_questions_del ON public.questions;
+CREATE TRIGGER trg_daily_stats_questions_del
+AFTER DELETE ON public.questions
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION public.daily_stats_questions_sync();
+
+-- Бағандар тізімі бар триггерде transition table қолдануға болмайды: кез келген UPDATE
+DROP TRIGGER IF EXISTS trg_daily_stats_questions_upd ON public.questions;
+CREATE TRIGGER trg_daily_stats_questions_upd
+AFTER UPDATE ON public.questions
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION public.daily_stats_questions_sync();
+
+DROP TRIGGER IF EXISTS trg_daily_stats_users_ins ON public.users;
+CREATE TRIGGER trg_daily_stats_users_ins
+AFTER INSERT ON public.users
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION public.daily_stats_users_sync();
+
+DROP TRIGGER IF EXISTS trg_daily_stats_users_del ON public.users;
+CREATE TRIGGER trg_daily_stats_users_del
+AFTER DELETE ON public.users
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION public.daily_stats_users_sync();
+
+DROP TRIGGER IF EXISTS trg_daily_stats_feedback_ins ON public.feedback;
+CREATE TRIGGER trg_daily_stats_feedback_ins
+AFTER INSERT ON public.feedback
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION public.daily_stats_feedback_sync();
+
+DROP TRIGGER IF EXISTS trg_daily_stats_feedback_del ON public.feedback;
+CREATE TRIGGER trg_daily_stats_feedback_del
+AFTER DELETE ON public.feedback
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION public.daily_stats_feedback_sync();
+
+-- Бар деректерден толық қайта есептеу:
+--   SELECT public.backfill_daily_stats();
+-- Есептеу кезінде жазбалар бұғатталады (SHARE режимі), сондықтан жиынтық дәл болады.
+CREATE OR REPLACE FUNCTION public.backfill_daily_stats()
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_rows BIGINT;
+BEGIN
+    LOCK TABLE public.questions, public.users, public.feedback IN SHARE MODE;
+    DELETE FROM public.daily_stats;
+
+    INSERT INTO public.daily_stats (day, category, hour, questions, new_users, feedback_count, rating_sum)
+    SELECT day, category, hour, SUM(questions), SUM(new_users), SUM(feedback_count), SUM(rating_sum)
+    FROM (
+        SELECT ("timestamp" AT TIME ZONE 'UTC')::date AS day, category,
+               EXTRACT(HOUR FROM "timestamp" AT TIME ZONE 'UTC')::smallint AS hour,
+               1 AS questions, 0 AS new_users, 0 AS feedback_count, 0 AS rating_sum
+        FROM public.questions
+        WHERE deleted_at IS NULL
+        UNION ALL
+        SELECT (created_at AT TIME ZONE 'UTC')::date, '',
+               EXTRACT(HOUR FROM created_at AT TIME ZONE 'UTC')::smallint,
+               0, 1, 0, 0
+        FROM public.users
+        UNION ALL
+        SELECT ("timestamp" AT TIME ZONE 'UTC')::date, '',
+               EXTRACT(HOUR FROM "timestamp" AT TIME ZONE 'UTC')::smallint,
+               0, 0, 1, COALESCE(rating, 0)
+        FROM public.feedback
+    ) AS raw
+    GROUP BY day, category, hour;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$;
+
+-- Алғашқы орнатуда жиынтықты бір рет толтыру
+SELECT public.backfill_daily_stats()
+WHERE NOT EXISTS (SELECT 1 FROM public.daily_stats);
+
+-- =========================================================
+-- 7) Аналитика view
 -- =========================================================
+-- Жаңа бағандар тек соңына қосылады (CREATE OR REPLACE VIEW талабы).
+-- Сұрақтар бойынша санаулар daily_stats-тан оқылады: O(күндер), O(сұрақтар) емес.
 CREATE OR REPLACE VIEW public.statistics_overview AS
 SELECT
     (SELECT COUNT(*) FROM public.users) AS total_users,
-    (SELECT COUNT(*) FROM public.questions) AS total_questions,
+    (SELECT COALESCE(SUM(questions), 0) FROM public.daily_stats) AS total_questions,
     (SELECT COUNT(*) FROM public.feedback) AS total_feedback,
     (SELECT ROUND(AVG(rating)::numeric, 2) FROM public.feedback) AS avg_rating,
-    (SELECT COUNT(*) FROM public.questions WHERE DATE("timestamp") = CURRENT_DATE) AS questions_today,
-    (SELECT COUNT(*) FROM public.users WHERE DATE(created_at) = CURRENT_DATE) AS new_users_today;
+    (SELECT COALESCE(SUM(questions), 0) FROM public.daily_stats
+        WHERE day = (NOW() AT TIME ZONE 'UTC')::date) AS questions_today,
+    (SELECT COALESCE(SUM(new_users), 0) FROM public.daily_stats
+        WHERE day = (NOW() AT TIME ZONE 'UTC')::date) AS new_users_today,
+    (SELECT COUNT(*) FROM public.users WHERE created_at >= NOW() - INTERVAL '7 days') AS new_users_7d,
+    (SELECT COALESCE(SUM(questions), 0) FROM public.daily_stats
+        WHERE day + hour * INTERVAL '1 hour' >= (NOW() AT TIME ZONE 'UTC') - INTERVAL '7 days') AS questions_7d,
+    (SELECT COALESCE(SUM(questions), 0) FROM public.daily_stats
+        WHERE day + hour * INTERVAL '1 hour' >= (NOW() AT TIME ZONE 'UTC') - INTERVAL '30 days') AS questions_30d,
+    (SELECT COUNT(DISTINCT COALESCE(username, user_id::text)) FROM public.questions
+        WHERE "timestamp" >= NOW() - INTERVAL '7 days' AND deleted_at IS NULL) AS active_users_7d,
+    (SELECT COUNT(DISTINCT COALESCE(username, user_id::text)) FROM public.questions
+        WHERE "timestamp" >= NOW() - INTERVAL '30 days' AND deleted_at IS NULL) AS active_users_30d,
+    (SELECT COUNT(*) FROM (
+        SELECT day FROM public.daily_stats GROUP BY day HAVING SUM(questions) > 0
+    ) AS d) AS active_days,
+    (SELECT MIN("timestamp") FROM public.questions WHERE deleted_at IS NULL) AS first_question_at,
+    busiest.day AS busiest_day,
+    COALESCE(busiest.total, 0) AS busiest_day_count
+FROM (SELECT 1) AS one
+LEFT JOIN LATERAL (
+    SELECT day, SUM(questions) AS total
+    FROM public.daily_stats
+    GROUP BY day
+    HAVING SUM(questions) > 0
+    ORDER BY 2 DESC, 1 DESC
+    LIMIT 1
+) AS busiest ON TRUE;
+
+-- =========================================================
+-- 8) Аналитика RPC функциялары (Analitika.py)
+-- =========================================================
+-- Dashboard толық кестелерді жүктемейді: әр функция бірнеше жол қайтарады.
+
+-- Санаттар бойынша сұрақтар саны
+CREATE OR REPLACE FUNCTION public.analytics_category_counts()
+RETURNS TABLE (category TEXT, total BIGINT)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT s.category, SUM(s.questions)::BIGINT AS total
+    FROM public.daily_stats s
+    WHERE s.category <> ''
+    GROUP BY s.category
+    HAVING SUM(s.questions) > 0
+    ORDER BY total DESC;
+$$;
+
+-- Ең белсенді N пайдаланушы
+CREATE OR REPLACE FUNCTION public.analytics_top_users(p_limit INTEGER DEFAULT 10)
+RETURNS TABLE (username TEXT, total BIGINT)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT COALESCE(q.username, q.user_id::text, 'Белгісіз') AS username, COUNT(*) AS total
+    FROM public.questions q
+    WHERE q.deleted_at IS NULL
+    GROUP BY 1
+    ORDER BY total DESC
+    LIMIT GREATEST(p_limit, 0);
+$$;
+
+-- Тәулік сағаттары бойынша гистограмма (UTC, 24 жол, бос сағаттар = 0)
+CREATE OR REPLACE FUNCTION public.analytics_hourly_distribution()
+RETURNS TABLE (hour INTEGER, total BIGINT)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT h.hour, COALESCE(c.total, 0)::BIGINT AS total
+    FROM generate_series(0, 23) AS h(hour)
+    LEFT JOIN (
+        SELECT s.hour::INTEGER AS hour, SUM(s.questions) AS total
+        FROM public.daily_stats s
+        GROUP BY 1
+    ) AS c ON c.hour = h.hour
+    ORDER BY h.hour;
+$$;
+
+-- Соңғы p_days күндегі бірегей белсенді пайдаланушылар
+CREATE OR REPLACE FUNCTION public.analytics_active_users(p_days INTEGER DEFAULT 7)
+RETURNS BIGINT
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT COUNT(DISTINCT COALESCE(q.username, q.user_id::text))
+    FROM public.questions q
+    WHERE q."timestamp" >= NOW() - make_interval(days => p_days)
+      AND q.deleted_at IS NULL;
+$$;
+
+-- Күндер бойынша сұрақтар (аралықтағы әр күн, бос күндер = 0)
+CREATE OR REPLACE FUNCTION public.analytics_daily_questions(p_start DATE, p_end DATE)
+RETURNS TABLE (day DATE, total BIGINT)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT d::date AS day, COALESCE(SUM(s.questions), 0)::BIGINT AS total
+    FROM generate_series(p_start, p_end, INTERVAL '1 day') AS d
+    LEFT JOIN public.daily_stats s ON s.day = d::date
+    GROUP BY 1
+    ORDER BY 1;
+$$;
+
+-- Жаңа пайдаланушылар және аралық ішіндегі кумулятивті сан
+CREATE OR REPLACE FUNCTION public.analytics_user_growth(p_start DATE, p_end DATE)
+RETURNS TABLE (day DATE, new_users BIGINT, cumulative BIGINT)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT g.day, g.new_users, SUM(g.new_users) OVER (ORDER BY g.day)::BIGINT AS cumulative
+    FROM (
+        SELECT d::date AS day, COALESCE(SUM(s.new_users), 0)::BIGINT AS new_users
+        FROM generate_series(p_start, p_end, INTERVAL '1 day') AS d
+        LEFT JOIN public.daily_stats s ON s.day = d::date
+        GROUP BY 1
+    ) AS g
+    ORDER BY g.day;
+$$;
+
+-- =========================================================
+-- 9) Сұрақтар тарихы RPC функциялары (Datasurak.py)
+-- =========================================================
+-- Keyset пагинация (timestamp, id) бойынша: idx_questions_user_time индексімен
+-- OFFSET-сіз жүреді, жауап мәтіні қайтарылмайды (ашылғанда ғана жүктеледі).
+-- Іздеу енді search_questions() арқылы: бұрынғы p_search параметрі бар нұсқаны алып тастаймыз
+DROP FUNCTION IF EXISTS public.user_questions_page(INTEGER, TEXT, TEXT, TIMESTAMPTZ, INTEGER, INTEGER);
+
+CREATE OR REPLACE FUNCTION public.user_questions_page(
+    p_user_id INTEGER,
+    p_category TEXT DEFAULT NULL,
+    p_before_ts TIMESTAMPTZ DEFAULT NULL,
+    p_before_id INTEGER DEFAULT NULL,
+    p_limit INTEGER DEFAULT 20
+)
+RETURNS TABLE (id INTEGER, question TEXT, category TEXT, "timestamp" TIMESTAMPTZ)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT q.id, q.question, q.category, q."timestamp"
+    FROM public.questions q
+    WHERE q.user_id = p_user_id
+      AND q.deleted_at IS NULL
+      AND (p_category IS NULL OR q.category = p_category)
+      AND (p_before_ts IS NULL
+           OR (q."timestamp" <= p_before_ts
+               AND (q."timestamp", q.id) < (p_before_ts, COALESCE(p_before_id, 2147483647))))
+    ORDER BY q."timestamp" DESC, q.id DESC
+    LIMIT LEAST(GREATEST(p_limit, 1), 100);
+$$;
+
+-- Пайдаланушының санат бойынша сұрақ саны (метрикалар үшін)
+CREATE OR REPLACE FUNCTION public.user_question_counts(p_user_id INTEGER)
+RETURNS TABLE (category TEXT, total BIGINT)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT q.category, COUNT(*)::BIGINT AS total
+    FROM public.questions q
+    WHERE q.user_id = p_user_id
+      AND q.deleted_at IS NULL
+    GROUP BY q.category;
+$$;
+
+-- =========================================================
+-- 10) Толық мәтінді іздеу RPC (Datasurak.py, SuraktardyBakulay.py)
+-- =========================================================
+-- Еркін мәтін -> префикс tsquery: «ауыр бас» -> 'ауыр':* & 'бас':*
+CREATE OR REPLACE FUNCTION public.search_tsquery(p_query TEXT)
+RETURNS TSQUERY
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT to_tsquery('simple', string_agg(quote_literal(t) || ':*', ' & '))
+    FROM regexp_split_to_table(lower(COALESCE(p_query, '')), '[^[:alnum:]]+') AS t
+    WHERE t <> '';
+$$;
+
+-- Рейтингпен іздеу және ерекшеленген үзінді (**сөз**)
+CREATE OR REPLACE FUNCTION public.search_questions(
+    p_query TEXT,
+    p_user_id INTEGER DEFAULT NULL,
+    p_category TEXT DEFAULT NULL,
+    p_limit INTEGER DEFAULT 50
+)
+RETURNS TABLE (
+    id INTEGER, user_id INTEGER, username TEXT, question TEXT, category TEXT,
+    "timestamp" TIMESTAMPTZ, rank REAL, snippet TEXT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH query AS (
+        SELECT public.search_tsquery(p_query) AS tsq
+    ),
+    hits AS (
+        SELECT q.id, q.user_id, q.username, q.question, q.answer, q.category, q."timestamp",
+               (ts_rank(q.search_tsv, query.tsq) + word_similarity(p_query, q.question))::REAL AS rank,
+               query.tsq
+        FROM public.questions q, query
+        WHERE query.tsq IS NOT NULL
+          AND q.deleted_at IS NULL
+          AND (q.search_tsv @@ query.tsq OR p_query <% q.question)
+          AND (p_user_id IS NULL OR q.user_id = p_user_id)
+          AND (p_category IS NULL OR q.category = p_category)
+        ORDER BY rank DESC, q."timestamp" DESC
+        LIMIT LEAST(GREATEST(p_limit, 1), 200)
+    )
+    -- Үзінді тек LIMIT-тен кейінгі жолдар үшін есептеледі
+    SELECT h.id, h.user_id, h.username, h.question, h.category, h."timestamp", h.rank,
+           ts_headline('simple', h.question || ' … ' || h.answer, h.tsq,
+                       'StartSel=**, StopSel=**, MaxWords=30, MinWords=10, MaxFragments=2')
+    FROM hits h
+    ORDER BY h.rank DESC, h."timestamp" DESC;
+$$;
+
+-- =========================================================
+-- 11) Модерация RPC функциялары (SuraktardyBakulay.py)
+-- =========================================================
+-- Архив сүзгісі қосылғанда сигнатура өзгерді: ескі нұсқаларды алып тастаймыз
+DROP FUNCTION IF EXISTS public.moderation_questions_page(TEXT[], TEXT, DATE, TEXT, TIMESTAMPTZ, INTEGER, INTEGER);
+DROP FUNCTION IF EXISTS public.moderation_summary(TEXT[], TEXT, DATE, TEXT);
+DROP FUNCTION IF EXISTS public.moderation_filtered(TEXT[], TEXT, DATE, TEXT);
+
+-- Ортақ сүзгі: санаттар, пайдаланушы аты (префикс), ай (UTC), толық мәтін.
+-- Өшірілгендер әрқашан, архивтелгендер әдепкіде жасырылады.
+-- Қарапайым STABLE SQL функция болғандықтан, шақырушы сұранысқа кіріктіріледі.
+CREATE OR REPLACE FUNCTION public.moderation_filtered(
+    p_categories TEXT[] DEFAULT NULL,
+    p_username TEXT DEFAULT NULL,
+    p_month DATE DEFAULT NULL,
+    p_query TEXT DEFAULT NULL,
+    p_include_archived BOOLEAN DEFAULT FALSE
+)
+RETURNS SETOF public.questions
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT q.*
+    FROM public.questions q
+    WHERE q.deleted_at IS NULL
+      AND (p_include_archived OR q.archived_at IS NULL)
+      AND (p_categories IS NULL OR q.category = ANY (p_categories))
+      AND (p_username IS NULL OR p_username = '' OR q.username ILIKE p_username || '%')
+      AND (p_month IS NULL
+           OR (q."timestamp" >= (date_trunc('month', p_month::timestamp) AT TIME ZONE 'UTC')
+               AND q."timestamp" < ((date_trunc('month', p_month::timestamp) + INTERVAL '1 month') AT TIME ZONE 'UTC')))
+      AND (p_query IS NULL OR p_query = '' OR q.search_tsv @@ public.search_tsquery(p_query));
+$$;
+
+-- Бір бет (жауапсыз), username/email серверде қосылады; keyset курсоры = (timestamp, id)
+CREATE OR REPLACE FUNCTION public.moderation_questions_page(
+    p_categories TEXT[] DEFAULT NULL,
+    p_username TEXT DEFAULT NULL,
+    p_month DATE DEFAULT NULL,
+    p_query TEXT DEFAULT NULL,
+    p_include_archived BOOLEAN DEFAULT FALSE,
+    p_before_ts TIMESTAMPTZ DEFAULT NULL,
+    p_before_id INTEGER DEFAULT NULL,
+    p_limit INTEGER DEFAULT 50
+)
+RETURNS TABLE (
+    id INTEGER, user_id INTEGER, username TEXT, email TEXT,
+    category TEXT, question TEXT, "timestamp" TIMESTAMPTZ, archived_at TIMESTAMPTZ
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT q.id, q.user_id, COALESCE(q.username, u.username), u.email,
+           q.category, q.question, q."timestamp", q.archived_at
+    FROM public.moderation_filtered(p_categories, p_username, p_month, p_query, p_include_archived) q
+    LEFT JOIN public.users u ON u.id = q.user_id
+    WHERE p_before_ts IS NULL
+       OR (q."timestamp" <= p_before_ts
+           AND (q."timestamp", q.id) < (p_before_ts, COALESCE(p_before_id, 2147483647)))
+    ORDER BY q."timestamp" DESC, q.id DESC
+    LIMIT LEAST(GREATEST(p_limit, 1), 200);
+$$;
+
+-- Сүзгіленген жиын бойынша графиктер: санат, ең белсенді 10 пайдаланушы, ай
+CREATE OR REPLACE FUNCTION public.moderation_summary(
+    p_categories TEXT[] DEFAULT NULL,
+    p_username TEXT DEFAULT NULL,
+    p_month DATE DEFAULT NULL,
+    p_query TEXT DEFAULT NULL,
+    p_include_archived BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (kind TEXT, label TEXT, total BIGINT)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH f AS (
+        SELECT q.category,
+               COALESCE(q.username, q.user_id::text, '—') AS username,
+               to_char(q."timestamp" AT TIME ZONE 'UTC', 'YYYY-MM') AS month
+        FROM public.moderation_filtered(p_categories, p_username, p_month, p_query, p_include_archived) q
+    )
+    SELECT 'category', f.category, COUNT(*)::BIGINT FROM f GROUP BY f.category
+    UNION ALL
+    (SELECT 'user', f.username, COUNT(*)::BIGINT FROM f GROUP BY f.username ORDER BY 3 DESC LIMIT 10)
+    UNION ALL
+    SELECT 'month', f.month, COUNT(*)::BIGINT FROM f GROUP BY f.month;
+$$;
+
+-- =========================================================
+-- 12) Жұмсақ өшіруді тазалау
+-- =========================================================
+-- Қайтару терезесі өткен жұмсақ өшірілген сұрақтарды біржола өшіру.
+-- daily_stats өзгермейді: бұл жолдар жиынтықтан UPDATE кезінде шығарылған.
+CREATE OR REPLACE FUNCTION public.purge_deleted_questions(p_older_than_minutes INTEGER DEFAULT 10)
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_rows BIGINT;
+BEGIN
+    DELETE FROM public.questions
+    WHERE deleted_at IS NOT NULL
+      AND deleted_at < NOW() - make_interval(mins => p_older_than_minutes);
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$;
+
+-- =========================================================
+-- 13) Кіру / тіркелу RPC (auth.py)
+-- =========================================================
+-- Кіру екі кезеңді: құпия сөз тұзды scrypt-пен сақталады (passwords.py), оны SQL-де
+-- салыстыру мүмкін емес. login_lookup хэшті қайтарады, auth.py оны тексереді,
+-- сосын login_success last_login-ді жаңартады және қажет болса хэшті ауыстырады.
+DROP FUNCTION IF EXISTS public.login_user(TEXT, TEXT);
+
+-- Бос нәтиже = логин жоқ немесе тіркелгі белсенді емес.
+CREATE OR REPLACE FUNCTION public.login_lookup(p_login TEXT)
+RETURNS TABLE (id INTEGER, username TEXT, password TEXT)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT u.id, u.username, u.password
+    FROM public.users u
+    WHERE (u.username = p_login OR u.email = p_login)
+      AND u.is_active
+    LIMIT 1;
+$$;
+
+-- p_password NULL болса тек last_login жаңарады (хэш өзгеріссіз қалады).
+CREATE OR REPLACE FUNCTION public.login_success(p_user_id INTEGER, p_password TEXT DEFAULT NULL)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    UPDATE public.users
+    SET last_login = NOW(),
+        password = COALESCE(p_password, password)
+    WHERE id = p_user_id;
+$$;
+
+-- Тіркелу: алдын ала тексерусіз бір INSERT; username/email UNIQUE шектеулері
+-- жарысты шешеді. Бос нәтиже = username немесе email бұрын тіркелген.
+CREATE OR REPLACE FUNCTION public.register_user(p_username TEXT, p_email TEXT, p_password TEXT)
+RETURNS TABLE (id INTEGER, username TEXT)
+LANGUAGE sql
+AS $$
+    INSERT INTO public.users AS u (username, email, password)
+    VALUES (p_username, p_email, p_password)
+    ON CONFLICT DO NOTHING
+    RETURNING u.id, u.username;
+$$;
 
 COMMIT;
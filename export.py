@@ -0,0 +1,196 @@
+import csv
+import importlib.util
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+import streamlit as st
+
+from config import get_supabase_client, EXPORT_CHUNK_SIZE
+
+# -----------------------------
+# 📥 Ағынды экспорт (CSV / Parquet)
+# -----------------------------
+# Supabase-тен EXPORT_CHUNK_SIZE жолдан беттеп оқылады және уақытша файлға
+# бірден жазылады: жадта бір бөлік қана тұрады (DataFrame не CSV жолы жасалмайды).
+# Parquet үшін pyarrow керек; орнатылмаса, тек CSV ұсынылады.
+
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "aizhan_exports")
+EXPORT_MAX_AGE = 3600  # ескі уақытша файлдар осыдан кейін өшіріледі (сек)
+
+# pyarrow ауыр модуль: бетті ашқанда емес, Parquet файлы жазыла бастағанда импортталады
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+MIME_TYPES = {"CSV": "text/csv", "Parquet": "application/vnd.apache.parquet"}
+EXTENSIONS = {"CSV": ".csv", "Parquet": ".parquet"}
+
+
+def available_formats():
+    return ["CSV", "Parquet"] if PARQUET_AVAILABLE else ["CSV"]
+
+
+# -------------------- ОҚУ --------------------
+
+def iter_table_chunks(table, columns, time_column=None, start=None, end=None,
+                      limit=None, apply_filters=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Кестені id бойынша keyset беттермен оқу (OFFSET-сіз).
+
+    start/end — күндер (end қоса алынады), apply_filters(query) -> query қосымша сүзгілер үшін.
+    """
+    supabase = get_supabase_client()
+    last_id = None
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = chunk_size if remaining is None else min(chunk_size, remaining)
+        query = supabase.table(table).select(columns)
+        if time_column and start:
+            query = query.gte(time_column, start.isoformat())
+        if time_column and end:
+            query = query.lt(time_column, (end + timedelta(days=1)).isoformat())
+        if apply_filters:
+            query = apply_filters(query)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.order("id").limit(size).execute().data
+        if not rows:
+            return
+        yield rows
+        if len(rows) < size:
+            return
+        last_id = rows[-1]["id"]
+        if remaining is not None:
+            remaining -= len(rows)
+
+
+# -------------------- ЖАЗУ --------------------
+
+def _cleanup_old_exports():
+    if not os.path.isdir(EXPORT_DIR):
+        return
+    cutoff = time.time() - EXPORT_MAX_AGE
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def _parquet_schema(rows):
+    """Бірінші бөліктен схема; тек None болған бағандар мәтін деп алынады"""
+    import pyarrow as pa
+
+    inferred = pa.Table.from_pylist(rows).schema
+    return pa.schema([
+        pa.field(field.name, pa.string() if pa.types.is_null(field.type) else field.type)
+        for field in inferred
+    ])
+
+
+def write_export(chunks, fmt="CSV", progress=None):
+    """Бөліктерді уақытша файлға жазу; (жол, жолдар саны) қайтарады.
+
+    progress(rows_written) әр бөліктен кейін шақырылады.
+    """
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    _cleanup_old_exports()
+    fd, path = tempfile.mkstemp(suffix=EXTENSIONS[fmt], dir=EXPORT_DIR)
+    os.close(fd)
+
+    written = 0
+    try:
+        if fmt == "Parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            writer = None
+            schema = None
+            try:
+                for rows in chunks:
+                    if writer is None:
+                        schema = _parquet_schema(rows)
+                        writer = pq.ParquetWriter(path, schema)
+                    writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                    written += len(rows)
+                    if progress:
+                        progress(written)
+            finally:
+                if writer is not None:
+                    writer.close()
+        else:
+            # utf-8-sig: Excel қазақ/орыс әріптерін дұрыс ашуы үшін BOM
+            with open(path, "w", encoding="utf-8-sig", newline="") as f:
+                writer = None
+                for rows in chunks:
+                    if writer is None:
+                        writer = csv.DictWriter(f, fieldnames=list(rows[0]), extrasaction="ignore")
+                        writer.writeheader()
+                    writer.writerows(rows)
+                    written += len(rows)
+                    if progress:
+                        progress(written)
+    except Exception:
+        os.remove(path)
+        raise
+    return path, written
+
+
+# -------------------- UI --------------------
+
+def export_controls(key, file_stem, make_chunks, total=None, date_range=True):
+    """Формат, жол шегі және күндер аралығы + прогресс + жүктеу батырмасы.
+
+    make_chunks(start, end, limit) бөліктер итераторын қайтарады.
+    """
+    formats = available_formats()
+    fmt = st.selectbox("Формат", formats, key=f"{key}_format")
+    limit = st.number_input("Жол шегі (0 = барлығы)", min_value=0, value=0, step=1000, key=f"{key}_limit")
+    start = end = None
+    if date_range:
+        today = date.today()
+        picked = st.date_input("Күндер аралығы", value=(today - timedelta(days=30), today), key=f"{key}_dates")
+        if isinstance(picked, (tuple, list)):
+            start = picked[0] if picked else None
+            end = picked[1] if len(picked) > 1 else start
+        else:
+            start = end = picked
+
+    state_key = f"{key}_export"
+    if st.button("⚙️ Экспортты дайындау", key=f"{key}_prepare", use_container_width=True):
+        previous = st.session_state.pop(state_key, None)
+        if previous and os.path.exists(previous["path"]):
+            os.remove(previous["path"])
+
+        expected = limit or total
+        bar = st.progress(0.0, text="Жүктелуде...")
+
+        def report(rows):
+            fraction = min(rows / expected, 1.0) if expected else 0.0
+            bar.progress(fraction, text=f"{rows} жол жазылды")
+
+        try:
+            path, rows = write_export(make_chunks(start, end, limit or None), fmt, report)
+        except Exception as e:
+            bar.empty()
+            st.error(f"Экспорт қатесі: {str(e)}")
+            return
+        bar.empty()
+        st.session_state[state_key] = {"path": path, "rows": rows, "format": fmt}
+
+    prepared = st.session_state.get(state_key)
+    if prepared and os.path.exists(prepared["path"]):
+        if not prepared["rows"]:
+            st.warning("Деректер жоқ")
+            return
+        st.caption(f"{prepared['rows']} жол · {os.path.getsize(prepared['path']) / 1024:.0f} КБ")
+        with open(prepared["path"], "rb") as f:
+            st.download_button(
+                "📥 Жүктеу",
+                f,
+                f"{file_stem}_{time.strftime('%Y%m%d_%H%M')}{EXTENSIONS[prepared['format']]}",
+                MIME_TYPES[prepared["format"]],
+                key=f"{key}_download",
+                use_container_width=True,
+            )
@@ -1,5 +1,7 @@
 import os
 import json
+import codecs
+import threading
 from typing import List, Dict, Generator, Optional
 
 try:
@@ -14,6 +16,60 @@ HF_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
 # The user can change this via function parameter or env var.
 DEFAULT_MODEL = os.getenv("HF_MODEL", "mistralai/Mistral-Large-Instruct")
 
+# Inference API base; point it at a local TGI server (or the replay stand-in in
+# benchmarks/hf_mock_server.py) to serve models without the hosted API.
+DEFAULT_API_BASE = "https://api-inference.huggingface.co"
+HF_API_BASE = os.getenv("HF_API_BASE", DEFAULT_API_BASE).rstrip("/")
+
+# Connection pool shared by every HuggingFaceChat in the process
+HF_POOL_SIZE = int(os.getenv("HF_POOL_SIZE", "10"))
+HF_CONNECT_TIMEOUT = float(os.getenv("HF_CONNECT_TIMEOUT", "5"))
+HF_READ_TIMEOUT = float(os.getenv("HF_READ_TIMEOUT", "120"))
+
+_shared_lock = threading.Lock()
+_session = None
+_inference_clients = {}   # api_key -> InferenceClient
+_chats = {}               # (api_key, model) -> HuggingFaceChat
+
+
+def get_session():
+    """Process-wide keep-alive requests.Session (DNS/TCP/TLS paid once per pooled connection)."""
+    global _session
+    with _shared_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HF_POOL_SIZE, pool_maxsize=HF_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def close_session():
+    global _session
+    with _shared_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def get_inference_client(api_key: Optional[str]):
+    """Reuse one InferenceClient per API key (it keeps its own HTTP session)."""
+    if not (InferenceClient and api_key) or HF_API_BASE != DEFAULT_API_BASE:
+        return None
+    with _shared_lock:
+        client = _inference_clients.get(api_key)
+        if client is None:
+            try:
+                client = InferenceClient(token=api_key, timeout=HF_READ_TIMEOUT)
+            except Exception:
+                return None
+            _inference_clients[api_key] = client
+        return client
+
 
 def build_prompt(messages: List[Dict[str, str]], system_prompt: Optional[str] = None) -> str:
     """Flatten conversation history into a single prompt string for HF text-generation models.
@@ -32,16 +88,142 @@ def build_prompt(messages: List[Dict[str, str]], system_prompt: Optional[str] =
     return "\n".join(parts)
 
 
+class StreamParser:
+    """Incremental parser for HF streaming responses.
+
+    Understands the three shapes the Inference API / TGI / HF router emit:
+      * SSE (`data: {...}` lines, events separated by a blank line, `data: [DONE]`)
+      * NDJSON (one JSON object per line)
+      * a single non-streamed JSON body (`[{"generated_text": ...}]`)
+
+    feed(bytes) returns the text deltas completed by that chunk. Each byte is
+    decoded and scanned once; only the unfinished tail line is carried over,
+    so the work per chunk is proportional to the chunk, not to the response.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._tail = []            # pieces of the current unterminated line
+        self._event = []           # SSE data lines of the current event
+        self.done = False
+        self.text_emitted = False
+        self.finish_reason = None
+        self.usage = {}
+        self.tokens = 0
+        self.malformed = 0
+
+    def feed(self, chunk: bytes) -> List[str]:
+        text = self._decoder.decode(chunk)
+        if "\n" not in text:
+            if text:
+                self._tail.append(text)
+            return []
+        lines = text.split("\n")
+        if self._tail:
+            lines[0] = "".join(self._tail) + lines[0]
+            self._tail = []
+        last = lines.pop()
+        if last:
+            self._tail.append(last)
+        deltas = []
+        for line in lines:
+            self._line(line, deltas)
+        return deltas
+
+    def close(self) -> List[str]:
+        """Flush whatever is left once the connection ends."""
+        deltas = []
+        rest = "".join(self._tail) + self._decoder.decode(b"", final=True)
+        self._tail = []
+        if rest:
+            self._line(rest, deltas)
+        self._dispatch(deltas)
+        return deltas
+
+    def _line(self, line: str, deltas: List[str]):
+        if line.endswith("\r"):
+            line = line[:-1]
+        if not line:
+            self._dispatch(deltas)
+        elif line.startswith("data:"):
+            self._event.append(line[6:] if line.startswith("data: ") else line[5:])
+        elif line.startswith((":", "event:", "id:", "retry:")):
+            pass  # SSE comment / keep-alive / metadata
+        else:
+            # NDJSON line or a plain JSON body
+            self._dispatch(deltas)
+            self._payload(line, deltas)
+
+    def _dispatch(self, deltas: List[str]):
+        if self._event:
+            data = "\n".join(self._event)
+            self._event = []
+            self._payload(data, deltas)
+
+    def _payload(self, data: str, deltas: List[str]):
+        data = data.strip()
+        if not data:
+            return
+        if data == "[DONE]":
+            self.done = True
+            return
+        try:
+            obj = json.loads(data)
+        except ValueError:
+            self.malformed += 1
+            return
+        if isinstance(obj, list):
+            obj = obj[0] if obj and isinstance(obj[0], dict) else {}
+        if not isinstance(obj, dict):
+            return
+        if obj.get("error"):
+            raise RuntimeError(f"Hugging Face stream error: {obj['error']}")
+
+        token = obj.get("token")
+        choices = obj.get("choices")
+        if isinstance(token, dict):
+            # TGI: {"token": {"text", "special"}, "generated_text": null | full, "details": ...}
+            if not token.get("special") and token.get("text"):
+                self._emit(token["text"], deltas)
+            details = obj.get("details") or {}
+            if details:
+                self.finish_reason = details.get("finish_reason", self.finish_reason)
+                if details.get("generated_tokens") is not None:
+                    self.usage["completion_tokens"] = details["generated_tokens"]
+        elif choices:
+            # OpenAI-compatible chat / completion chunks (HF router, TGI /v1)
+            choice = choices[0] or {}
+            piece = (choice.get("delta") or {}).get("content") or choice.get("text")
+            if piece:
+                self._emit(piece, deltas)
+            if choice.get("finish_reason"):
+                self.finish_reason = choice["finish_reason"]
+        elif obj.get("generated_text") and not self.text_emitted:
+            # Non-streamed body: the whole answer at once
+            self._emit(obj["generated_text"], deltas)
+            self.finish_reason = self.finish_reason or "stop"
+
+        if isinstance(obj.get("usage"), dict):
+            self.usage.update(obj["usage"])
+
+    def _emit(self, text: str, deltas: List[str]):
+        self.text_emitted = True
+        self.tokens += 1
+        deltas.append(text)
+
+    def stats(self) -> Dict:
+        usage = dict(self.usage)
+        usage.setdefault("completion_tokens", self.tokens)
+        if "prompt_tokens" in usage and "total_tokens" not in usage:
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        return {"finish_reason": self.finish_reason or "stop", "usage": usage}
+
+
 class HuggingFaceChat:
     def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
         self.api_key = api_key or HF_API_KEY
         self.model = model or DEFAULT_MODEL
-        self.client = None
-        if InferenceClient and self.api_key:
-            try:
-                self.client = InferenceClient(self.api_key)
-            except Exception:
-                self.client = None
+        self.client = get_inference_client(self.api_key)
 
     def generate(
         self,
@@ -64,90 +246,98 @@ class HuggingFaceChat:
             "max_new_tokens": int(max_tokens),
         }
 
+        # Kept out of this function body: a `yield` here would turn the
+        # non-streaming call into a generator as well.
+        if stream:
+            return self._stream(prompt, parameters)
+        return self._complete(prompt, parameters)
+
+    def _endpoint(self):
+        url = f"{HF_API_BASE}/models/{self.model}"
+        headers = {"Accept": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return url, headers
+
+    def _stream(self, prompt: str, parameters: Dict) -> Generator[Dict[str, str], None, None]:
         # If we have huggingface_hub client and streaming requested, use it
-        if self.client and stream:
+        if self.client:
+            emitted = False
             try:
-                # huggingface_hub.InferenceClient.text_generation supports streaming
-                for chunk in self.client.text_generation(self.model, inputs=prompt, parameters=parameters, stream=True):
-                    # chunk is dict with 'generated_text' or token pieces depending on model
-                    text = chunk.get("generated_text") or chunk.get("token", "")
-                    yield {"delta": text}
+                finish_reason, tokens = None, 0
+                for chunk in self.client.text_generation(
+                    prompt, model=self.model, stream=True, details=True, **parameters
+                ):
+                    token = chunk.token
+                    if token.text and not token.special:
+                        emitted = True
+                        tokens += 1
+                        yield {"delta": token.text}
+                    if chunk.details is not None:
+                        finish_reason = chunk.details.finish_reason
+                        tokens = chunk.details.generated_tokens or tokens
+                yield {"delta": "", "finish_reason": finish_reason or "stop", "usage": {"completion_tokens": tokens}}
                 return
             except Exception:
-                # fall back to non-streaming path below
-                pass
+                # fall back to the raw HTTP stream below, unless the user has already seen tokens
+                if emitted:
+                    raise
 
-        # Non-streaming path using requests to HF Inference API
         import requests
 
-        url = f"https://api-inference.huggingface.co/models/{self.model}"
-        headers = {"Accept": "application/json"}
-        if self.api_key:
-            headers["Authorization"] = f"Bearer {self.api_key}"
+        url, headers = self._endpoint()
+        headers["Accept"] = "text/event-stream"
+        payload = {"inputs": prompt, "parameters": parameters, "stream": True}
 
-        payload = {"inputs": prompt, "parameters": parameters}
+        # Token stream over SSE / NDJSON (or a single JSON body if the backend can't stream)
+        try:
+            with get_session().post(url, headers=headers, json=payload, stream=True,
+                                    timeout=(HF_CONNECT_TIMEOUT, HF_READ_TIMEOUT)) as resp:
+                resp.raise_for_status()
+                parser = StreamParser()
+                for chunk in resp.iter_content(chunk_size=None):
+                    if not chunk:
+                        continue
+                    # Read to the end even after [DONE]: a fully consumed body lets
+                    # the connection go back to the keep-alive pool
+                    for text in parser.feed(chunk):
+                        yield {"delta": text}
+                for text in parser.close():
+                    yield {"delta": text}
+                # Final event: no text, only the finish reason and usage
+                yield {"delta": "", **parser.stats()}
+        except requests.HTTPError as http_e:
+            self._raise_http_error(http_e)
 
-        # Stream mode via requests streaming (some HF models emit chunks)
-        if stream:
-            try:
-                with requests.post(url, headers=headers, json=payload, stream=True, timeout=120) as resp:
-                    resp.raise_for_status()
-                    buffer = ""
-                    for chunk in resp.iter_content(chunk_size=None):
-                        if not chunk:
-                            continue
-                        part = chunk.decode(errors="ignore")
-                        buffer += part
-                        # Try to parse newline-delimited JSON or plain text
-                        try:
-                            data = json.loads(buffer)
-                            text = ""
-                            if isinstance(data, list) and data:
-                                text = data[0].get("generated_text", "")
-                            elif isinstance(data, dict):
-                                text = data.get("generated_text", "")
-                            if text:
-                                yield {"delta": text}
-                                buffer = ""
-                        except Exception:
-                            yield {"delta": part}
-                    return
-            except requests.HTTPError as http_e:
-                # If the model is not available via the Inference API, HF returns 410 Gone
-                status = None
-                try:
-                    status = http_e.response.status_code
-                except Exception:
-                    pass
-                if status == 410:
-                    raise RuntimeError(
-                        f"Model '{self.model}' is not available via the Hugging Face Inference API (HTTP 410 Gone).\n"
-                        "Possible fixes:\n"
-                        " - Choose a model that supports the Inference API (check the model page on huggingface.co).\n"
-                        " - Ensure your HUGGINGFACE_API_KEY has access to the model (private models require proper scopes).\n"
-                        " - Or run a local inference server (Ollama, TGI, or transformers) and configure HF_MODEL accordingly."
-                    ) from http_e
-                raise
+    def _raise_http_error(self, http_e):
+        # If the model is not available via the Inference API, HF returns 410 Gone
+        status = None
+        try:
+            status = http_e.response.status_code
+        except Exception:
+            pass
+        if status == 410:
+            raise RuntimeError(
+                f"Model '{self.model}' is not available via the Hugging Face Inference API (HTTP 410 Gone).\n"
+                "Possible fixes:\n"
+                " - Choose a model that supports the Inference API (check the model page on huggingface.co).\n"
+                " - Ensure your HUGGINGFACE_API_KEY has access to the model (private models require proper scopes).\n"
+                " - Or run a local inference server (Ollama, TGI, or transformers) and configure HF_MODEL accordingly."
+            ) from http_e
+        raise http_e
+
+    def _complete(self, prompt: str, parameters: Dict) -> Dict:
+        import requests
+
+        url, headers = self._endpoint()
+        payload = {"inputs": prompt, "parameters": parameters}
 
         # Non-streaming POST
-        resp = requests.post(url, headers=headers, json=payload, timeout=120)
+        resp = get_session().post(url, headers=headers, json=payload, timeout=(HF_CONNECT_TIMEOUT, HF_READ_TIMEOUT))
         try:
             resp.raise_for_status()
         except requests.HTTPError as http_e:
-            status = None
-            try:
-                status = resp.status_code
-            except Exception:
-                pass
-            if status == 410:
-                raise RuntimeError(
-                    f"Model '{self.model}' is not available via the Hugging Face Inference API (HTTP 410 Gone).\n"
-                    "Possible fixes:\n"
-                    " - Choose a model that supports the Inference API (check the model page on huggingface.co).\n"
-                    " - Ensure your HUGGINGFACE_API_KEY has access to the model (private models require proper scopes).\n"
-                    " - Or run a local inference server (Ollama, TGI, or transformers) and configure HF_MODEL accordingly."
-                ) from http_e
-            raise
+            self._raise_http_error(http_e)
         data = resp.json()
 
         # Normalize response into ChatGPT-like structure
@@ -181,5 +371,11 @@ def chat_completion(
     top_p: float = 1.0,
     stream: bool = False,
 ):
-    client = HuggingFaceChat(model=model)
+    key = (HF_API_KEY, model or DEFAULT_MODEL)
+    client = _chats.get(key)
+    if client is None:
+        # Built outside the lock (the constructor takes it for the InferenceClient)
+        client = HuggingFaceChat(model=model)
+        with _shared_lock:
+            client = _chats.setdefault(key, client)
     return client.generate(messages, system_prompt, temperature, max_tokens, top_p, stream)
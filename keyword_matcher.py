@@ -0,0 +1,167 @@
+from collections import deque, namedtuple
+
+# -----------------------------
+# 🔎 Көп үлгілі кілт сөз іздеу (Aho–Corasick)
+# -----------------------------
+# Автомат модуль импортталғанда бір рет құрылады; іздеу құны тек хабарлама
+# ұзындығына тәуелді (кілт сөздер саны мыңдаған болса да).
+#
+# Қалыпқа келтіру (мәтінге де, кілт сөздерге де бірдей қолданылады):
+#   * кіші әріп, қазақ әріптері орыс негізіне: ә->а, қ->к, ұ/ү->у, і->и ...
+#     («кан кету» мен «қан кету» бірдей табылады);
+#   * мәтінде латын әріптері болса, транслитерацияланған көшірмесі де тексеріледі:
+#     «qan ketu», «zhurek» -> «кан кету», «журек». Латын кілт сөздер («drug»)
+#     латынша қалады, сондықтан орысша «друг» оларға сәйкес келмейді;
+#   * кілт сөздің соңғы сөзінен қазақ жұрнақтары алынады
+#     («ұстамасы» -> «ұстама», «тану» -> «тан»), сондықтан «ұстамасын», «танып» те табылады.
+
+Match = namedtuple("Match", ["start", "end", "keyword"])
+
+_FOLD = {
+    "ә": "а", "ғ": "г", "қ": "к", "ң": "н", "ө": "о",
+    "ұ": "у", "ү": "у", "һ": "х", "і": "и", "ё": "е",
+}
+
+_LATIN_DIGRAPHS = {
+    "sh": "ш", "ch": "ч", "zh": "ж", "kh": "х", "ts": "ц",
+    "ya": "я", "yu": "ю", "yo": "е",
+}
+
+_LATIN = {
+    "a": "а", "ä": "а", "b": "б", "c": "с", "ç": "ч", "d": "д", "e": "е",
+    "f": "ф", "g": "г", "ğ": "г", "h": "х", "i": "и", "ı": "ы", "j": "ж",
+    "k": "к", "l": "л", "m": "м", "n": "н", "ñ": "н", "o": "о", "ö": "о",
+    "p": "п", "q": "к", "r": "р", "s": "с", "ş": "ш", "t": "т", "u": "у",
+    "ū": "у", "ü": "у", "v": "в", "w": "у", "x": "х", "y": "ы", "z": "з",
+}
+
+# Ұзыннан қысқаға: бірінші сәйкес келгені ғана алынады
+_KAZAKH_SUFFIXES = (
+    "лар", "лер", "дар", "дер", "тар", "тер",
+    "сы", "си", "ы", "и", "у",
+)
+_MIN_STEM = 3
+
+
+def _has_latin(text: str) -> bool:
+    return any(char in _LATIN for char in text.lower())
+
+
+def normalize(text: str, transliterate=False):
+    """Қалыпты мәтін және әр таңбаның бастапқы мәтіндегі (start, end) аралығы"""
+    lowered = []
+    for index, char in enumerate(text):
+        for low in char.lower():
+            lowered.append((low, index))
+
+    out = []
+    spans = []
+    i = 0
+    length = len(lowered)
+    while i < length:
+        char, src = lowered[i]
+        if transliterate and i + 1 < length:
+            pair = char + lowered[i + 1][0]
+            mapped = _LATIN_DIGRAPHS.get(pair)
+            if mapped is not None:
+                out.append(mapped)
+                spans.append((src, lowered[i + 1][1] + 1))
+                i += 2
+                continue
+        mapped = _FOLD.get(char) or (transliterate and _LATIN.get(char)) or char
+        out.append(mapped)
+        spans.append((src, src + 1))
+        i += 1
+    return "".join(out), spans
+
+
+def stem_keyword(keyword: str) -> str:
+    """Кілт сөздің соңғы сөзінен бір қазақ жұрнағын алып тастау.
+
+    Бір сөзді кілттерде түбір кемінде 4 әріп қалады («дәрі» -> «дар» болмауы үшін).
+    """
+    normalized, _ = normalize(keyword.strip())
+    if _has_latin(normalized):
+        return normalized
+    head, _, last = normalized.rpartition(" ")
+    min_stem = _MIN_STEM if head else _MIN_STEM + 1
+    for suffix in _KAZAKH_SUFFIXES:
+        if last.endswith(suffix) and len(last) - len(suffix) >= min_stem:
+            last = last[:-len(suffix)]
+            break
+    return f"{head} {last}" if head else last
+
+
+class KeywordMatcher:
+    """Aho–Corasick автоматы: бір өтуде барлық кілт сөздерді табады"""
+
+    def __init__(self, keywords, stem=True, word_start=True):
+        self.word_start = word_start
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for keyword in keywords:
+            pattern = stem_keyword(keyword) if stem else normalize(keyword)[0]
+            if pattern:
+                self._add(pattern, keyword)
+        self._build()
+
+    def __len__(self):
+        return sum(len(out) for out in self._out)
+
+    def _add(self, pattern, keyword):
+        node = 0
+        for char in pattern:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+        self._out[node] = self._out[node] + ((len(pattern), keyword),)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                # Шығыс тізімін fail сілтемесі бойынша біріктіру
+                if self._out[self._fail[child]]:
+                    self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def _scan_view(self, normalized, spans):
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, char in enumerate(normalized):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                for length, keyword in out[node]:
+                    start = i - length + 1
+                    if self.word_start and start > 0 and normalized[start - 1].isalnum():
+                        continue
+                    yield Match(spans[start][0], spans[i][1], keyword)
+
+    def _scan(self, text):
+        yield from self._scan_view(*normalize(text))
+        if _has_latin(text):
+            yield from self._scan_view(*normalize(text, transliterate=True))
+
+    def find_all(self, text):
+        """Барлық сәйкестіктер, бастапқы мәтіндегі орындарымен"""
+        return sorted(set(self._scan(text)))
+
+    def contains(self, text) -> bool:
+        """Кем дегенде бір кілт сөз бар ма (бірінші сәйкестікте тоқтайды)"""
+        for _ in self._scan(text):
+            return True
+        return False
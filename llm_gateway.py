@@ -0,0 +1,288 @@
+import random
+import threading
+import time
+from collections import deque
+
+import openai
+from openai import OpenAI
+
+from config import (
+    OPENAI_API_KEY, HUGGINGFACE_API_KEY,
+    LLM_TIMEOUT, LLM_DEADLINE, LLM_MAX_RETRIES, LLM_BACKOFF, LLM_MAX_CONCURRENCY,
+    LLM_POOL_SIZE, LLM_HF_FALLBACK,
+)
+
+# -----------------------------
+# 🤖 LLM шлюзі (барлық чат беттері үшін ортақ)
+# -----------------------------
+# Процесс бойынша бір OpenAI клиенті (httpx keep-alive пулы). Әр шақыру:
+#   * LLM_DEADLINE ішінде аяқталуы керек (кезек күту + қайталаулар қоса);
+#   * 429/5xx/байланыс қатесінде jitter қосылған экспоненциалды backoff
+#     (Retry-After тақырыбы болса, соны ескереміз);
+#   * LLM_MAX_CONCURRENCY семафорынан өтеді: шұғыл толқында сұраныстар
+#     провайдер шегіне соқпай, кезекте күтеді;
+#   * OpenAI мүлдем қолжетімсіз болса, HUGGINGFACE_API_KEY бар кезде
+#     huggingface_chat.HuggingFaceChat арқылы жауап береді.
+# Қателер шақырушыға жеткізіледі: пайдаланушыға мәтінді бет өзі құрастырады.
+
+_client_lock = threading.Lock()
+_client = None
+_hf_chat = None
+_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+_stats_lock = threading.Lock()
+_wait_ms = deque(maxlen=200)
+_stats = {
+    "calls": 0, "in_flight": 0, "queued": 0, "retries": 0, "failures": 0,
+    "fallbacks": 0, "busy_rejections": 0, "last_error": "",
+}
+
+
+class LLMBusyError(RuntimeError):
+    """Кезекте LLM_DEADLINE ішінде бос орын табылмады"""
+
+
+# -------------------- КЛИЕНТТЕР --------------------
+
+def _build_http_client():
+    try:
+        import httpx
+    except ImportError:
+        return None
+    return httpx.Client(
+        limits=httpx.Limits(max_connections=LLM_POOL_SIZE, max_keepalive_connections=LLM_POOL_SIZE),
+        timeout=LLM_TIMEOUT,
+    )
+
+
+def get_client() -> OpenAI:
+    """Ортақ OpenAI клиенті (SDK ішкі қайталаулары өшірулі — оларды шлюз басқарады)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OpenAI(
+                api_key=OPENAI_API_KEY,
+                http_client=_build_http_client(),
+                timeout=LLM_TIMEOUT,
+                max_retries=0,
+            )
+        return _client
+
+
+def _huggingface():
+    global _hf_chat
+    if not (LLM_HF_FALLBACK and HUGGINGFACE_API_KEY):
+        return None
+    with _client_lock:
+        if _hf_chat is None:
+            from huggingface_chat import HuggingFaceChat
+            _hf_chat = HuggingFaceChat(api_key=HUGGINGFACE_API_KEY)
+        return _hf_chat
+
+
+# -------------------- ҚАЙТАЛАУ / КЕЗЕК --------------------
+
+def _is_retryable(error) -> bool:
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def _retry_after(error):
+    """Retry-After тақырыбы (секунд) бар болса"""
+    try:
+        value = error.response.headers.get("retry-after")
+        return float(value) if value is not None else None
+    except Exception:
+        return None
+
+
+def _backoff(attempt, error, deadline):
+    """Келесі әрекетке дейінгі кідіріс; уақыт жетпесе None"""
+    delay = LLM_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5)
+    hinted = _retry_after(error)
+    if hinted is not None:
+        delay = max(delay, hinted)
+    if time.monotonic() + delay >= deadline:
+        return None
+    return delay
+
+
+def _acquire(deadline):
+    """Семафордан орын алу; кезекте тұрған уақыт статистикаға жазылады"""
+    started = time.monotonic()
+    with _stats_lock:
+        _stats["queued"] += 1
+    try:
+        acquired = _slots.acquire(timeout=max(deadline - started, 0))
+    finally:
+        with _stats_lock:
+            _stats["queued"] -= 1
+    if not acquired:
+        with _stats_lock:
+            _stats["busy_rejections"] += 1
+        raise LLMBusyError("Сервер бос емес, сәлден кейін қайталаңыз")
+    with _stats_lock:
+        _stats["in_flight"] += 1
+        _wait_ms.append((time.monotonic() - started) * 1000)
+
+
+def _release():
+    with _stats_lock:
+        _stats["in_flight"] -= 1
+    _slots.release()
+
+
+def _record_failure(error):
+    with _stats_lock:
+        _stats["failures"] += 1
+        _stats["last_error"] = f"{type(error).__name__}: {error}"
+
+
+def _with_retries(request, deadline):
+    """request(timeout) -> нәтиже; қайталанатын қатеде backoff, әйтпесе бірден көтеріледі"""
+    attempt = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        try:
+            return request(min(LLM_TIMEOUT, max(remaining, 1.0)))
+        except Exception as e:
+            delay = _backoff(attempt, e, deadline) if _is_retryable(e) and attempt < LLM_MAX_RETRIES else None
+            if delay is None:
+                raise
+            with _stats_lock:
+                _stats["retries"] += 1
+            attempt += 1
+            time.sleep(delay)
+
+
+# -------------------- API --------------------
+
+def _fill_usage(usage, backend, total_tokens=0):
+    if usage is not None:
+        usage["backend"] = backend
+        usage["total_tokens"] = total_tokens or 0
+
+
+def complete(messages, model="gpt-4o", temperature=0.7, max_tokens=512, usage=None, deadline=None, **kwargs):
+    """Толық жауап мәтіні. usage dict берілсе, total_tokens және backend толтырылады."""
+    deadline = time.monotonic() + (deadline or LLM_DEADLINE)
+    with _stats_lock:
+        _stats["calls"] += 1
+    _acquire(deadline)
+    try:
+        def request(timeout):
+            return get_client().chat.completions.create(
+                model=model, messages=messages, temperature=temperature,
+                max_tokens=max_tokens, timeout=timeout, **kwargs,
+            )
+
+        try:
+            response = _with_retries(request, deadline)
+        except Exception as e:
+            _record_failure(e)
+            fallback = _huggingface()
+            if fallback is None or isinstance(e, openai.BadRequestError):
+                raise
+            _fill_usage(usage, "huggingface")
+            return _hf_complete(fallback, messages, temperature, max_tokens)
+    finally:
+        _release()
+    _fill_usage(usage, "openai", getattr(getattr(response, "usage", None), "total_tokens", 0))
+    return response.choices[0].message.content
+
+
+def stream(messages, model="gpt-4o", temperature=0.7, max_tokens=512, usage=None, deadline=None, **kwargs):
+    """Токендер ағыны (мәтін бөліктері). usage dict берілсе, total_tokens және backend толтырылады.
+
+    Қайталау тек бірінші бөлік келгенге дейін мүмкін: жартылай берілген жауапты
+    қайта бастау пайдаланушыға екі жауап көрсетер еді.
+    """
+    deadline = time.monotonic() + (deadline or LLM_DEADLINE)
+    with _stats_lock:
+        _stats["calls"] += 1
+    _acquire(deadline)
+    try:
+        def request(timeout):
+            return get_client().chat.completions.create(
+                model=model, messages=messages, temperature=temperature, max_tokens=max_tokens,
+                timeout=timeout, stream=True, stream_options={"include_usage": True}, **kwargs,
+            )
+
+        try:
+            response = _with_retries(request, deadline)
+        except Exception as e:
+            _record_failure(e)
+            fallback = _huggingface()
+            if fallback is None or isinstance(e, openai.BadRequestError):
+                raise
+            _fill_usage(usage, "huggingface")
+            yield from _hf_stream(fallback, messages, temperature, max_tokens, usage)
+            return
+
+        _fill_usage(usage, "openai")
+        try:
+            for chunk in response:
+                chunk_usage = getattr(chunk, "usage", None)
+                if chunk_usage is not None:
+                    _fill_usage(usage, "openai", chunk_usage.total_tokens)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            _record_failure(e)
+            raise
+        finally:
+            close = getattr(response, "close", None)
+            if close:
+                close()
+    finally:
+        _release()
+
+
+def embed(text, model):
+    """Бір мәтіннің embedding векторы (қайталау + дедлайнмен, семафорсыз — жеңіл шақыру)"""
+    deadline = time.monotonic() + LLM_DEADLINE
+    response = _with_retries(
+        lambda timeout: get_client().embeddings.create(model=model, input=text, timeout=timeout),
+        deadline,
+    )
+    return response.data[0].embedding
+
+
+# -------------------- HUGGING FACE --------------------
+
+def _split_system(messages):
+    system = "\n".join(m["content"] for m in messages if m.get("role") == "system") or None
+    return system, [m for m in messages if m.get("role") != "system"]
+
+
+def _hf_complete(chat, messages, temperature, max_tokens):
+    with _stats_lock:
+        _stats["fallbacks"] += 1
+    system, rest = _split_system(messages)
+    result = chat.generate(rest, system, temperature=temperature, max_tokens=max_tokens)
+    return result["choices"][0]["message"]["content"]
+
+
+def _hf_stream(chat, messages, temperature, max_tokens, usage=None):
+    with _stats_lock:
+        _stats["fallbacks"] += 1
+    system, rest = _split_system(messages)
+    for part in chat.generate(rest, system, temperature=temperature, max_tokens=max_tokens, stream=True):
+        if part.get("delta"):
+            yield part["delta"]
+        if part.get("usage"):
+            hf_usage = part["usage"]
+            _fill_usage(usage, "huggingface", hf_usage.get("total_tokens") or hf_usage.get("completion_tokens"))
+
+
+# -------------------- СТАТИСТИКА --------------------
+
+def gateway_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+        waits = sorted(_wait_ms)
+    stats["max_concurrency"] = LLM_MAX_CONCURRENCY
+    stats["wait_p50_ms"] = round(waits[len(waits) // 2]) if waits else None
+    stats["wait_p95_ms"] = round(waits[max(int(len(waits) * 0.95) - 1, 0)]) if waits else None
+    stats["fallback_enabled"] = bool(LLM_HF_FALLBACK and HUGGINGFACE_API_KEY)
+    return stats
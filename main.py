@@ -1,14 +1,32 @@
+import importlib
 import streamlit as st
 from Login import check_login, login_page
 from AdminPanelLoginSystem import admin_login_page
-from Surak import surak_page
-from DariDarmek import daridarmek_page
-from Psixologia import psixologia_page
-from Motivation import motivation_page
-from Datasurak import datasurak_page
-from Analitika import analitika_page
-from SuraktardyBakulay import suraktardy_bakulay_page
-from Bagalay import bagalay_page
+from motivation_pool import start_motivation_pool
+import persistence_queue
+
+# -----------------------------
+# 🗂 Беттер тізілімі: модуль тек бет таңдалғанда импортталады
+# -----------------------------
+# Кіру экраны pandas/plotly/numpy пен OpenAI SDK-сыз ашылады; Аналитика мен
+# Сұрақтарды бақылау (ең ауыр беттер) тек админ оларға кіргенде жүктеледі.
+# Импортталған модульді sys.modules сақтайды: келесі көрсетулерде шығын жоқ.
+PAGES = {
+    "surak": ("Surak", "surak_page"),
+    "dari": ("DariDarmek", "daridarmek_page"),
+    "psixologia": ("Psixologia", "psixologia_page"),
+    "motivation": ("Motivation", "motivation_page"),
+    "datasurak": ("Datasurak", "datasurak_page"),
+    "analitika": ("Analitika", "analitika_page"),
+    "suraktardy": ("SuraktardyBakulay", "suraktardy_bakulay_page"),
+    "bagalay": ("Bagalay", "bagalay_page")
+}
+
+
+def load_page(page):
+    module_name, function_name = PAGES[page]
+    return getattr(importlib.import_module(module_name), function_name)
+
 
 # -----------------------------
 # 🌟 Бет конфигурациясы
@@ -93,6 +111,16 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# -----------------------------
+# 📮 Фондық жазу кезегі: алдыңғы іске қосудан қалған журналды қайталау
+# -----------------------------
+persistence_queue.start()
+
+# -----------------------------
+# ✨ Мотивациялар пулы: бүгінгі мәтіндерді фонда дайындау
+# -----------------------------
+start_motivation_pool()
+
 # -----------------------------
 # 📜 Қош келдіңіз баннері (нейтральный, без новогодней тематики)
 # -----------------------------
@@ -223,18 +251,8 @@ def main():
     show_sidebar()
     st.markdown("<div class='fade-in'>", unsafe_allow_html=True)
     page = st.session_state.current_page
-    pages = {
-        "surak": surak_page,
-        "dari": daridarmek_page,
-        "psixologia": psixologia_page,
-        "motivation": motivation_page,
-        "datasurak": datasurak_page,
-        "analitika": analitika_page,
-        "suraktardy": suraktardy_bakulay_page,
-        "bagalay": bagalay_page
-    }
-    if page in pages:
-        pages[page]()
+    if page in PAGES:
+        load_page(page)()
     st.markdown("</div>", unsafe_allow_html=True)
 
 if __name__ == "__main__":
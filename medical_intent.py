@@ -0,0 +1,288 @@
+import json
+import math
+import os
+import random
+import re
+import sys
+
+# -----------------------------
+# 🩺 Медициналық ниетті жергілікті анықтау
+# -----------------------------
+# Лексикон + таңбалық n-грам логистикалық регрессия (қазақ/орыс/ағылшын).
+# Модель кішкентай JSON артефакт ретінде сақталады және процесс ішінде
+# микросекундтарда жұмыс істейді. gate() жергілікті түрде тек сенімді
+# медициналық сұрақты қабылдайды; бас тарту үшін күшті медициналық емес белгі
+# керек (төмен ықтималдық + медициналық емес тақырып сөзі + медициналық сөз жоқ).
+# Қалғанының бәрі (лексиконнан тыс ауру/дәрі атаулары, басқа тұжырымдар) LLM-ге барады.
+#
+#   python medical_intent.py train   -> data/medical_intent_model.json
+#   python medical_intent.py eval    -> eval, tuning және heldout жиындарындағы дәлдік, recall, gate
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_PATH = os.path.join(BASE_DIR, "data", "medical_intent_labeled.jsonl")
+MODEL_PATH = os.getenv("MEDICAL_INTENT_MODEL", os.path.join(BASE_DIR, "data", "medical_intent_model.json"))
+
+# Медициналық түбірлер (сөздің басымен сәйкестік: «ауыр» -> «ауырады», «ауырып»).
+# Қысқа әрі көп мағыналы түбірлер («қан» -> «қанша», «бол» -> «болады»)
+# тек толық сөз ретінде MEDICAL_WORDS ішінде тексеріледі.
+MEDICAL_STEMS = (
+    # қазақша
+    "ауыр", "ауру", "температур", "дәрі", "дәрігер", "жөтел", "тұмау", "қысым",
+    "бөртпе", "аллерги", "диабет", "асқазан", "жүрек", "емде", "жүкті",
+    "витамин", "жарақат", "гастрит", "мұрын", "бүйрек", "бауыр", "тері",
+    "құлақ", "ұйқы", "тыныс", "буын", "қыши", "ангина", "антибиотик",
+    "қызу", "екіқабат", "улан", "инсульт", "инфаркт", "гипертон", "анеми",
+    # русский
+    "боли", "боль", "температур", "кашл", "кашел", "давлен", "лечи", "симптом",
+    "сыпь", "зуд", "тошн", "голов", "живот", "грипп", "горл", "насморк", "врач",
+    "таблет", "бессонниц", "спин", "груд", "аллерг", "зуб", "изжог", "отек",
+    "холестерин", "ибупрофен", "инсульт", "инфаркт", "анеми", "гипертон", "ковид",
+    "парацетамол", "аспирин", "антибиот", "вакцин", "прививк", "понос", "рвот",
+    "инфекц", "вирус", "беремен", "отравил",
+    # english
+    "hurt", "ache", "fever", "symptom", "treat", "cough", "dizz", "nause",
+    "rash", "itch", "pressure", "doctor", "medic", "sick", "throat", "stomach",
+    "aspirin", "diabet", "migraine", "stroke", "anemi", "hypertens", "covid",
+    "ibuprofen", "paracetamol", "antibiot", "vaccin", "vomit", "diarr", "infect",
+    "pregnan", "swell", "swoll", "fatigue", "tired", "exhaust", "triptan", "sumatriptan",
+    "tablet", "pill", "surger", "injur", "headache",
+)
+MEDICAL_WORDS = frozenset((
+    "қан", "қаным", "қанның", "тіс", "тісім", "көз", "көзім", "ісік", "ісіп",
+    "құсу", "айналу", "айналады", "жара", "жараны",
+    "pain", "painful", "flu", "chills", "кровь", "крови",
+))
+
+# Медициналық емес тақырыптар (ауа райы, ас, бағдарлама, қаржы, саяхат, ойын-сауық,
+# аударма). Жергілікті бас тарту тек осындай сөз болып, медициналық сөз болмағанда.
+# Түбірлер тек медициналық сөздің басы бола алмайтындары ғана; қысқа ағылшын
+# сөздері («tire» -> «tired», «trip» -> «triptan», «phone» -> «phonophobia»)
+# NON_MEDICAL_WORDS ішінде тек толық сөз ретінде тексеріледі.
+NON_MEDICAL_STEMS = (
+    # қазақша
+    "ауа рай", "пісір", "рецепт", "бағдарлама", "компьютер", "ноутбук", "телефон",
+    "интернет", "пойыз", "билет", "несие", "банк", "фильм", "музыка", "өлең",
+    "анекдот", "футбол", "матч", "аудар", "түйіндеме", "сыйлық", "пәтер", "мереке",
+    "ертегі", "машина", "велосипед", "сәлем",
+    # русский
+    "погод", "приготов", "программ", "ноутбук", "смартфон", "роутер", "билет",
+    "доллар", "евро", "ипотек", "кредит", "фильм", "сериал", "музык", "стих",
+    "анекдот", "футбол", "чемпионат", "перевед", "перевод", "поздравлен", "отдохн",
+    "привет", "колес", "рецепт",
+    # english
+    "weather", "recipe", "python", "javascript", "laptop", "router", "football",
+    "translat", "birthday", "president",
+)
+NON_MEDICAL_WORDS = frozenset((
+    "cook", "cooking", "bake", "baking", "phone", "phones", "ticket", "tickets",
+    "exchange", "bank", "banks", "movie", "movies", "film", "films", "music", "poem",
+    "poems", "joke", "jokes", "trip", "trips", "book", "books", "tire", "tires",
+    "capital",
+))
+
+NGRAM_SIZES = (3, 4)
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def normalize(text: str) -> str:
+    return text.lower().replace("ё", "е")
+
+
+def lexicon_hits(text: str):
+    """(медициналық, медициналық емес) лексикон сәйкестіктерінің саны"""
+    normalized = normalize(text)
+    tokens = _TOKEN_RE.findall(normalized)
+    medical = sum(1 for token in tokens if token in MEDICAL_WORDS or token.startswith(MEDICAL_STEMS))
+    # Көп сөзді түбірлер («ауа рай») үшін бүкіл мәтін бойынша да тексереміз
+    non_medical = sum(1 for token in tokens if token in NON_MEDICAL_WORDS or token.startswith(NON_MEDICAL_STEMS))
+    non_medical += sum(1 for stem in NON_MEDICAL_STEMS if " " in stem and stem in normalized)
+    return medical, non_medical
+
+
+def extract_features(text: str) -> dict:
+    """Сөз, таңбалық n-грам және лексикон белгілері (бар/жоқ мәндері)"""
+    tokens = _TOKEN_RE.findall(normalize(text))
+    features = {}
+    lex_hits = 0
+    for token in tokens:
+        features["w:" + token] = 1.0
+        padded = f"<{token}>"
+        for n in NGRAM_SIZES:
+            for i in range(len(padded) - n + 1):
+                features["c:" + padded[i:i + n]] = 1.0
+        if token in MEDICAL_WORDS or token.startswith(MEDICAL_STEMS):
+            lex_hits += 1
+    # Ұзын мәтіндер белгілер көп болғаны үшін ғана сенімді болып кетпеуі үшін
+    scale = 1.0 / math.sqrt(max(len(features), 1))
+    features = {name: value * scale for name, value in features.items()}
+    # Лексикон белгісі масштабталмайды. «Лексикон жоқ» белгісі әдейі қосылмайды:
+    # ол лексиконнан тыс кез келген тұжырымды медициналық емес деп үйретіп жіберген
+    features["lex"] = float(min(lex_hits, 2))
+    return features
+
+
+class MedicalIntentClassifier:
+    def __init__(self, weights=None, bias=0.0):
+        self.weights = weights or {}
+        self.bias = bias
+
+    def predict_proba(self, text: str) -> float:
+        """Медициналық сұрақ болу ықтималдығы (0..1)"""
+        weights = self.weights
+        z = self.bias
+        for name, value in extract_features(text).items():
+            w = weights.get(name)
+            if w is not None:
+                z += w * value
+        return 1.0 / (1.0 + math.exp(-max(min(z, 30.0), -30.0)))
+
+    def fit(self, samples, epochs=40, learning_rate=0.5, l2=1e-4, seed=13):
+        """Қарапайым SGD логистикалық регрессия (тәуелділіксіз)"""
+        rng = random.Random(seed)
+        featurized = [(extract_features(text), label) for text, label in samples]
+        weights = {}
+        bias = 0.0
+        for epoch in range(epochs):
+            rng.shuffle(featurized)
+            lr = learning_rate / (1.0 + epoch * 0.1)
+            for features, label in featurized:
+                z = bias + sum(weights.get(name, 0.0) * value for name, value in features.items())
+                p = 1.0 / (1.0 + math.exp(-max(min(z, 30.0), -30.0)))
+                grad = p - label
+                bias -= lr * grad
+                for name, value in features.items():
+                    w = weights.get(name, 0.0)
+                    weights[name] = w - lr * (grad * value + l2 * w)
+        self.weights = {name: round(w, 4) for name, w in weights.items() if abs(w) >= 1e-3}
+        self.bias = round(bias, 4)
+        return self
+
+    def save(self, path=MODEL_PATH):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "bias": self.bias, "weights": self.weights},
+                      f, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(weights=data["weights"], bias=data["bias"])
+
+
+_classifier = None
+_classifier_loaded = False
+
+
+def get_classifier():
+    """Артефактты бір рет жүктеу; файл жоқ болса None"""
+    global _classifier, _classifier_loaded
+    if not _classifier_loaded:
+        try:
+            _classifier = MedicalIntentClassifier.load()
+        except (OSError, ValueError, KeyError):
+            _classifier = None
+        _classifier_loaded = True
+    return _classifier
+
+
+def medical_probability(text: str):
+    """Медициналық ниет ықтималдығы немесе модель жоқ болса None"""
+    classifier = get_classifier()
+    if classifier is None:
+        return None
+    return classifier.predict_proba(text)
+
+
+def gate(text: str, low: float, high: float):
+    """Жергілікті шешім: True (медициналық), False (медициналық емес) немесе None (LLM шешсін).
+
+    Модель немесе артефакт жоқ болса да None — LLM gate бұрынғыдай шешеді.
+    """
+    probability = medical_probability(text)
+    if probability is None:
+        return None
+    if probability >= high:
+        return True
+    if probability <= low:
+        medical, non_medical = lexicon_hits(text)
+        if non_medical and not medical:
+            return False
+    return None
+
+
+def load_dataset(split=None, path=DATASET_PATH):
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                if split is None or row["split"] == split:
+                    rows.append(row)
+    return rows
+
+
+def evaluate(classifier, rows, threshold=0.5):
+    correct = sum(1 for row in rows if (classifier.predict_proba(row["text"]) >= threshold) == bool(row["label"]))
+    return correct / len(rows) if rows else 0.0
+
+
+def recall(classifier, rows, threshold=0.5):
+    """Медициналық сұрақтардың қаншасы threshold-тан жоғары бағаланды"""
+    medical = [row for row in rows if row["label"]]
+    found = sum(1 for row in medical if classifier.predict_proba(row["text"]) >= threshold)
+    return found / len(medical) if medical else 0.0
+
+
+def gate_report(rows, low, high) -> dict:
+    """gate() нәтижелері: жергілікті қабылдау/бас тарту, LLM-ге жіберілген, қате бас тартулар"""
+    report = {"accepted": 0, "rejected": 0, "deferred": 0, "false_rejects": [], "false_accepts": []}
+    for row in rows:
+        decision = gate(row["text"], low, high)
+        if decision is None:
+            report["deferred"] += 1
+        elif decision:
+            report["accepted"] += 1
+            if not row["label"]:
+                report["false_accepts"].append(row["text"])
+        else:
+            report["rejected"] += 1
+            if row["label"]:
+                report["false_rejects"].append(row["text"])
+    medical = sum(1 for row in rows if row["label"])
+    # LLM-ге жіберілгендер бас тартылмайды: gate recall = жергілікті бас тартылмаған медициналық үлес
+    report["gate_recall"] = (medical - len(report["false_rejects"])) / medical if medical else 0.0
+    return report
+
+
+def _print_split(model, name, low, high):
+    rows = load_dataset(name)
+    report = gate_report(rows, low, high)
+    print(f"{name} ({len(rows)}): дәлдік {evaluate(model, rows):.3f}, медициналық recall {recall(model, rows):.3f}")
+    print(f"  gate [{low}, {high}]: қабылдау {report['accepted']}, бас тарту {report['rejected']}, "
+          f"LLM-ге {report['deferred']}, gate recall {report['gate_recall']:.3f}")
+    for text in report["false_rejects"]:
+        print(f"  ✗ қате бас тарту: {text}")
+    for text in report["false_accepts"]:
+        print(f"  ✗ қате қабылдау: {text}")
+
+
+if __name__ == "__main__":
+    from config import MEDICAL_INTENT_LOW, MEDICAL_INTENT_HIGH
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "eval"
+    if command == "train":
+        train_rows = load_dataset("train")
+        model = MedicalIntentClassifier().fit([(row["text"], row["label"]) for row in train_rows])
+        model.save()
+        _classifier, _classifier_loaded = model, True
+        print(f"Сақталды: {MODEL_PATH} ({len(model.weights)} салмақ)")
+        print(f"train дәлдігі: {evaluate(model, train_rows):.3f}")
+    else:
+        model = get_classifier()
+    # tuning: бір сөзді ауру атаулары, дәрілер, симптом ғана, kk/ru/en — оның
+    # қателеріне қарап лексикон мен gate бапталған, сондықтан көрсеткіштері оптимистік.
+    # heldout: лексикон мен gate-ті баптауға ешқашан қолданылмайтын жиын. Оның
+    # қатесіне қарап лексиконды түзетсеңіз, жолдарды tuning-ке көшіріп, жаңа heldout жазыңыз.
+    for split in ("eval", "tuning", "heldout"):
+        _print_split(model, split, MEDICAL_INTENT_LOW, MEDICAL_INTENT_HIGH)
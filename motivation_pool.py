@@ -0,0 +1,195 @@
+import json
+import os
+import random
+import threading
+from datetime import date, datetime, timedelta
+
+from config import MOTIVATION_POOL_SIZE, MOTIVATION_POOL_PATH, MOTIVATION_RETRY_SECONDS
+
+# -----------------------------
+# ✨ Мотивациялар пулы (күніне бір рет алдын ала генерация)
+# -----------------------------
+# Фондық ағын әр тақырыпқа күніне MOTIVATION_POOL_SIZE мәтінді бір LLM
+# шақыруымен дайындайды және JSON файлға сақтайды. Бет пулдан кездейсоқ
+# мәтінді бірден береді: кідіріс тұрақты, LLM құны күніне тақырып санымен шектеулі.
+# Жаңа күннің пулы дайын болғанша кешегісі беріледі; пул мүлдем бос болса ғана
+# шақырушы өзінің fallback мәтінін қолданады.
+
+_lock = threading.Lock()
+_stop = threading.Event()
+_worker = None
+_pool = {}         # topic -> {"day": "YYYY-MM-DD", "items": [...]}
+_stats = {"generated": 0, "served": 0, "empty": 0, "failures": 0, "last_run": "", "last_error": ""}
+
+
+# -------------------- ФАЙЛ --------------------
+
+def _load():
+    try:
+        with open(MOTIVATION_POOL_PATH, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {
+        topic: entry for topic, entry in data.items()
+        if isinstance(entry, dict) and isinstance(entry.get("items"), list)
+    }
+
+
+def _save(pool):
+    """Атомды жазу: уақытша файл + replace"""
+    os.makedirs(os.path.dirname(MOTIVATION_POOL_PATH) or ".", exist_ok=True)
+    tmp_path = f"{MOTIVATION_POOL_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(pool, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, MOTIVATION_POOL_PATH)
+
+
+# -------------------- ГЕНЕРАЦИЯ --------------------
+
+def _stale_topics(topics, today):
+    with _lock:
+        # Күніне бір шақыру: модель азырақ мәтін қайтарса да, сол күні қайта сұралмайды
+        return [topic for topic in topics if _pool.get(topic, {}).get("day") != today]
+
+
+def refill(generate, topics) -> bool:
+    """Бүгінгі пулы жоқ тақырыптарды толтыру; бәрі сәтті болса True"""
+    today = date.today().isoformat()
+    ok = True
+    for topic in _stale_topics(topics, today):
+        if _stop.is_set():
+            return False
+        try:
+            items = [text.strip() for text in generate(topic, MOTIVATION_POOL_SIZE) if text and text.strip()]
+            if not items:
+                raise ValueError("бос жауап")
+        except Exception as e:
+            ok = False
+            with _lock:
+                _stats["failures"] += 1
+                _stats["last_error"] = f"{topic}: {e}"
+            continue
+        with _lock:
+            _pool[topic] = {"day": today, "items": items[:MOTIVATION_POOL_SIZE]}
+            _stats["generated"] += len(items)
+            snapshot = dict(_pool)
+        try:
+            _save(snapshot)
+        except OSError as e:
+            with _lock:
+                _stats["last_error"] = str(e)
+    with _lock:
+        _stats["last_run"] = datetime.now().isoformat(timespec="seconds")
+    return ok
+
+
+def _seconds_until_tomorrow():
+    now = datetime.now()
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (tomorrow - now).total_seconds() + 5
+
+
+def _run(generate, topics):
+    while not _stop.is_set():
+        ok = refill(generate, topics)
+        # Сағат ауысуы/ұйқы режимі үшін сағатына бір рет оянып тексереміз
+        delay = min(_seconds_until_tomorrow(), 3600) if ok else MOTIVATION_RETRY_SECONDS
+        _stop.wait(delay)
+
+
+def start(generate, topics):
+    """Файлдағы пулды жүктеп, фондық генераторды іске қосу (идемпотентті).
+
+    generate(topic, count) -> мәтіндер тізімі.
+    """
+    global _worker
+    with _lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        if not _pool:
+            _pool.update(_load())
+        _stop.clear()
+        _worker = threading.Thread(
+            target=_run, args=(generate, list(topics)), name="motivation-pool", daemon=True
+        )
+        _worker.start()
+
+
+def stop():
+    _stop.set()
+
+
+# -------------------- БЕРУ --------------------
+
+def pick(topic, exclude=()):
+    """Пулдан кездейсоқ мәтін (exclude-тағылар соңына қалдырылады); пул бос болса None"""
+    with _lock:
+        items = list(_pool.get(topic, {}).get("items", ()))
+        if not items:
+            _stats["empty"] += 1
+            return None
+        _stats["served"] += 1
+    fresh = [text for text in items if text not in exclude]
+    return random.choice(fresh or items)
+
+
+def pool_stats() -> dict:
+    today = date.today().isoformat()
+    with _lock:
+        stats = dict(_stats)
+        stats["topics"] = {
+            topic: {"items": len(entry["items"]), "today": entry.get("day") == today}
+            for topic, entry in _pool.items()
+        }
+    stats["running"] = _worker is not None and _worker.is_alive()
+    return stats
+
+
+# -------------------- ГЕНЕРАЦИЯ --------------------
+
+DAILY_TOPIC = "daily"
+TOPICS = ["Денсаулық", "Жұмыс", "Оқу", "Спорт", "Өзін-өзі дамыту", "Отбасы", "Достық", "Шығармашылық"]
+
+DAILY_SYSTEM_PROMPT = (
+    "Сіз мотивациялық көмекшісіз.\n"
+    "Күн сайын адамдарға жігерлендіретін, рухтандыратын сөздер айтыңыз.\n"
+    "Хабарлама 3-5 сөйлемнен тұруы тиіс, позитивті, іс-әрекетке шақыратын, күш-жігер беретін сөздер."
+    "Жауапты қазақ тілінде беріңіз."
+)
+
+
+def _topic_system_prompt(topic):
+    return f"""Сіз мотивациялық көмекшісіз. {topic} тақырыбы бойынша шабыттандыратын сөздер беріңіз."
+Жауап 3-5 сөйлемнен тұрсын, қазақ тілінде."""
+
+
+def generate_motivations(topic, count):
+    """Бір gpt-4o шақыруымен count мотивация (пул генераторы қолданады)"""
+    # Пул кіру экранында іске қосылады: OpenAI SDK тек генерация керек болғанда жүктеледі
+    import llm_gateway
+
+    if topic == DAILY_TOPIC:
+        system_prompt, request = DAILY_SYSTEM_PROMPT, "Маған бүгінге мотивация беріңіз"
+    else:
+        system_prompt, request = _topic_system_prompt(topic), f"{topic} туралы мотивация"
+    content = llm_gateway.complete(
+        [
+            {"role": "system", "content": system_prompt + (
+                f"\n\nБір-біріне ұқсамайтын {count} нұсқа жазыңыз. "
+                'Тек JSON қайтарыңыз: {"motivations": ["...", "..."]}'
+            )},
+            {"role": "user", "content": request}
+        ],
+        model="gpt-4o",
+        temperature=0.9,
+        max_tokens=250 * count,
+        response_format={"type": "json_object"},
+    )
+    items = json.loads(content).get("motivations", [])
+    return [item for item in items if isinstance(item, str)]
+
+
+def start_motivation_pool():
+    """main.py шақырады: Motivation бетін импорттамай пулды іске қосу"""
+    start(generate_motivations, [DAILY_TOPIC] + TOPICS)
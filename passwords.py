@@ -0,0 +1,169 @@
+import base64
+import hashlib
+import hmac
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (
+    PASSWORD_HASH_MS, PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P,
+    PASSWORD_MAX_MEMORY_MB, PASSWORD_WORKERS,
+)
+
+# -----------------------------
+# 🔑 Құпия сөз хэші (scrypt, тұзбен)
+# -----------------------------
+# Сақталатын пішім: scrypt$N$r$p$<тұз base64>$<хэш base64>. Параметрлер хэштің
+# ішінде, сондықтан оларды өзгерту ескі хэштерді бұзбайды: needs_rehash() кіру
+# сәтті болғанда ағымдағыдан әлсіз хэшті қайта хэштеуді сұрайды. 64 таңбалы hex жол —
+# бұрынғы тұзсыз SHA-256, ол да тексеріледі және бірінші кіруде ауыстырылады.
+#
+# N PASSWORD_SCRYPT_N-нен алынады; 0 болса, бірінші қолданғанда осы машинада
+# өлшеп (calibrate) бір хэш PASSWORD_HASH_MS-тен аспайтын ең үлкен 2^k таңдалады.
+# Есептеу PASSWORD_WORKERS ағынды пулда жүреді: hashlib.scrypt GIL-ді босатады,
+# ал пул өлшемі бір мезгілдегі жады шығынын (128·r·N байт × ағын) шектейді.
+
+PREFIX = "scrypt"
+SALT_BYTES = 16
+KEY_BYTES = 32
+MIN_N = 2 ** 14
+LEGACY_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+_lock = threading.Lock()
+_params = None       # (n, r, p) калибрлеуден кейін
+_calibration = {}    # n -> өлшенген мс (Аналитика/бенчмарк үшін)
+_executor = ThreadPoolExecutor(max_workers=max(PASSWORD_WORKERS, 1), thread_name_prefix="password-kdf")
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _maxmem(n, r):
+    # OpenSSL шегі: 128·r·N буферден сәл артық орын керек
+    return 128 * r * n + 1024 * 1024
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                          maxmem=_maxmem(n, r), dklen=KEY_BYTES)
+
+
+# -------------------- КАЛИБРЛЕУ --------------------
+
+def measure(n, r=PASSWORD_SCRYPT_R, p=PASSWORD_SCRYPT_P, repeat=3) -> float:
+    """Бір scrypt хэшінің медианалық уақыты (мс)"""
+    salt = os.urandom(SALT_BYTES)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        _scrypt("calibration", salt, n, r, p)
+        timings.append((time.perf_counter() - started) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+
+def calibrate(target_ms=PASSWORD_HASH_MS, r=PASSWORD_SCRYPT_R, p=PASSWORD_SCRYPT_P,
+              max_memory_mb=PASSWORD_MAX_MEMORY_MB) -> dict:
+    """target_ms-тен аспайтын ең үлкен N (2-нің дәрежесі, MIN_N-нен кем емес)"""
+    timings = {}
+    n = MIN_N
+    timings[n] = measure(n, r, p)
+    while 128 * r * n * 2 <= max_memory_mb * 1024 * 1024:
+        # Келесі N шамамен екі есе ұзақ: өлшемей-ақ бюджеттен асатыны белгілі болса тоқтаймыз
+        if timings[n] * 2 > target_ms * 1.1:
+            break
+        timings[n * 2] = measure(n * 2, r, p)
+        if timings[n * 2] > target_ms:
+            break
+        n *= 2
+    return {"n": n, "r": r, "p": p, "ms": round(timings[n], 1), "timings": timings}
+
+
+def current_params():
+    """(n, r, p): PASSWORD_SCRYPT_N берілсе сол, әйтпесе бір рет калибрлеу"""
+    global _params
+    with _lock:
+        if _params is None:
+            if PASSWORD_SCRYPT_N:
+                _params = (PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P)
+            else:
+                result = calibrate()
+                _calibration.update(result["timings"])
+                _params = (result["n"], result["r"], result["p"])
+        return _params
+
+
+# -------------------- ХЭШ / ТЕКСЕРУ --------------------
+
+def _hash(password):
+    n, r, p = current_params()
+    salt = os.urandom(SALT_BYTES)
+    return f"{PREFIX}${n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, n, r, p))}"
+
+
+def _verify(password, encoded):
+    if not encoded:
+        return False
+    if LEGACY_SHA256.match(encoded):
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, encoded)
+    try:
+        prefix, n, r, p, salt, expected = encoded.split("$")
+        if prefix != PREFIX:
+            return False
+        actual = _scrypt(password, _unb64(salt), int(n), int(r), int(p))
+    except (ValueError, TypeError):
+        return False
+    return hmac.compare_digest(actual, _unb64(expected))
+
+
+def hash_password(password: str) -> str:
+    """Жаңа тұзбен scrypt хэші (пулда есептеледі)"""
+    return _executor.submit(_hash, password).result()
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    """Құпия сөз сақталған хэшке сәйкес пе (scrypt немесе бұрынғы SHA-256)"""
+    return _executor.submit(_verify, password, encoded).result()
+
+
+def needs_rehash(encoded: str) -> bool:
+    """Бұрынғы SHA-256 немесе ағымдағы параметрлерден әлсіз хэш.
+
+    Күштірек хэш қалдырылады: калибрлеу процестер арасында 2^k бір сатыға
+    ауытқуы мүмкін, әйтпесе әр кіру хэшті ары-бері ауыстырар еді.
+    """
+    if not encoded or not encoded.startswith(PREFIX + "$"):
+        return True
+    try:
+        _, n, r, p, _, _ = encoded.split("$")
+        current_n, current_r, current_p = current_params()
+        return int(n) < current_n or int(r) < current_r or int(p) < current_p
+    except ValueError:
+        return True
+
+
+def password_stats() -> dict:
+    """Ағымдағы параметрлер. Калибрлеуді өзі іске қоспайды: әлі хэш жасалмаған
+    процесте n/r/p None болып, ready=False қайтады (бетті көрсету секундқа созылмауы үшін)."""
+    with _lock:
+        params = _params
+        timings = dict(_calibration)
+    stats = {
+        "ready": params is not None,
+        "n": None, "r": None, "p": None, "memory_mb": None, "calibrated_ms": None,
+        "target_ms": PASSWORD_HASH_MS,
+        "calibrated": not PASSWORD_SCRYPT_N,
+        "workers": max(PASSWORD_WORKERS, 1),
+    }
+    if params is not None:
+        n, r, p = params
+        stats.update(n=n, r=r, p=p, memory_mb=round(128 * r * n / (1024 * 1024), 1),
+                     calibrated_ms=round(timings[n], 1) if n in timings else None)
+    return stats
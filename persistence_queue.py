@@ -0,0 +1,338 @@
+import atexit
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from postgrest.exceptions import APIError
+
+from config import (
+    get_supabase_client,
+    PERSIST_BATCH_SIZE,
+    PERSIST_FLUSH_INTERVAL,
+    PERSIST_MAX_RETRIES,
+    PERSIST_BACKOFF,
+    PERSIST_SHUTDOWN_TIMEOUT,
+    PERSIST_JOURNAL_PATH,
+    PERSIST_MAX_REPLAYS,
+    PERSIST_DEAD_LETTER_PATH,
+)
+from data_cache import invalidate
+
+# -----------------------------
+# 📮 Фондық жазу кезегі (write-behind)
+# -----------------------------
+# Чат беттері жауапты көрсеткеннен кейін Supabase insert-ін күтпейді:
+# жол кезекке қойылады, фондық ағын оларды көп жолды insert-пен жібереді.
+#
+#   * flush: PERSIST_BATCH_SIZE жол жиналғанда немесе PERSIST_FLUSH_INTERVAL өткенде;
+#   * қате болса экспоненциалды backoff (jitter) арқылы қайталау;
+#   * қайталау таусылса немесе процесс тоқтаса, жолдар журналға (JSONL, тек қосу)
+#     жазылады және келесі іске қосылғанда қайта кезекке қойылады;
+#   * қайталауға келмейтін қате (CHECK/UNIQUE шектеуі, бағана жоқ т.б.) партияны
+#     бұзбайды: жолдар бір-бірлеп қайта жіберіледі, сонда да өтпегені dead-letter
+#     файлына (PERSIST_DEAD_LETTER_PATH) қатесімен бірге жазылады. Журнал арқылы
+#     PERSIST_MAX_REPLAYS рет қайталанған жол да сонда кетеді — журнал әр іске
+#     қосылғанда мәңгі қайталанатын жолдармен толмайды.
+#
+# Кепілдік «кем дегенде бір рет»: insert сәтті өтіп, жауап келмей қалса,
+# журналдан қайталау жолды екі рет жазуы мүмкін.
+
+_cond = threading.Condition()
+_pending = deque()       # (table, row, журналдан қайталау саны)
+_inflight = []           # фондық ағын қазір жіберіп жатқан жолдар
+_worker = None
+_stopping = False
+_flush_requested = False
+_journal_lock = threading.Lock()
+_flush_ms = deque(maxlen=200)
+_stats = {
+    "enqueued": 0, "flushed": 0, "batches": 0, "failed_batches": 0,
+    "retries": 0, "journaled": 0, "replayed": 0, "dead_lettered": 0, "lost": 0, "last_error": "",
+}
+
+# PostgreSQL/PostgREST қате кодтары: деректер қатесі (22), шектеу бұзылуы (23),
+# схема қатесі (42), сұраныс қатесі (PGRST1xx-3xx). Қайталау оларды түзетпейді.
+# PGRST000-003 (байланыс, пул) және 5xx уақытша деп саналады.
+PERMANENT_CODE_PREFIXES = ("22", "23", "42", "PGRST1", "PGRST2", "PGRST3")
+
+
+def _is_permanent(error) -> bool:
+    code = getattr(error, "code", None) if isinstance(error, APIError) else None
+    return bool(code) and str(code).startswith(PERMANENT_CODE_PREFIXES)
+
+
+# -------------------- ЖУРНАЛ --------------------
+
+def _append_lines(path, records):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with _journal_lock:
+        with open(path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _spill(items):
+    """Жолдарды журналға қосу (fsync-пен)"""
+    if not items:
+        return
+    _append_lines(PERSIST_JOURNAL_PATH, (
+        {"table": table, "row": row, "attempts": attempts} for table, row, attempts in items
+    ))
+    with _cond:
+        _stats["journaled"] += len(items)
+
+
+def _dead_letter(items, error):
+    """Қайта жіберуге болмайтын жолдар: журналдан тыс, қатесімен бірге (қолмен қарау үшін)"""
+    if not items:
+        return
+    failed_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+    _append_lines(PERSIST_DEAD_LETTER_PATH, (
+        {"table": table, "row": row, "attempts": attempts, "error": str(error), "failed_at": failed_at}
+        for table, row, attempts in items
+    ))
+    with _cond:
+        _stats["dead_lettered"] += len(items)
+
+
+def _replay_journal():
+    """Журналдағы жолдарды кезекке қайтару (іске қосылғанда бір рет)"""
+    replay_path = PERSIST_JOURNAL_PATH + ".replay"
+    with _journal_lock:
+        # Алдыңғы қайталау үзілсе, .replay файлы қалуы мүмкін: оны да оқимыз
+        if os.path.exists(PERSIST_JOURNAL_PATH):
+            if os.path.exists(replay_path):
+                with open(PERSIST_JOURNAL_PATH, encoding="utf-8") as src, \
+                        open(replay_path, "a", encoding="utf-8") as dst:
+                    dst.write(src.read())
+                os.remove(PERSIST_JOURNAL_PATH)
+            else:
+                os.replace(PERSIST_JOURNAL_PATH, replay_path)
+        if not os.path.exists(replay_path):
+            return 0
+
+        items = []
+        with open(replay_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    items.append((record["table"], record["row"], int(record.get("attempts", 0))))
+                except (ValueError, KeyError, TypeError):
+                    continue
+
+    with _cond:
+        _pending.extend(items)
+        _stats["replayed"] += len(items)
+        _cond.notify_all()
+    # Жолдар енді жадта: қайта тоқтаса, shutdown оларды журналға қайта жазады
+    with _journal_lock:
+        os.remove(replay_path)
+    return len(items)
+
+
+# -------------------- ФОНДЫҚ АҒЫН --------------------
+
+def _next_batch():
+    global _flush_requested
+    with _cond:
+        while not _pending and not _stopping:
+            _cond.wait()
+        if not _pending:
+            return None
+        deadline = time.monotonic() + PERSIST_FLUSH_INTERVAL
+        while len(_pending) < PERSIST_BATCH_SIZE and not _stopping and not _flush_requested:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            _cond.wait(remaining)
+        batch = [_pending.popleft() for _ in range(min(len(_pending), PERSIST_BATCH_SIZE))]
+        if not _pending:
+            _flush_requested = False
+        _inflight.extend(batch)
+        return batch
+
+
+def _insert_with_retry(table, rows):
+    """None — сәтті; әйтпесе соңғы қате (қайталауға келмейтін қатеде бірден)"""
+    for attempt in range(max(PERSIST_MAX_RETRIES, 0) + 1):
+        try:
+            get_supabase_client().table(table).insert(rows).execute()
+            return None
+        except Exception as e:
+            with _cond:
+                _stats["last_error"] = str(e)
+                if _is_permanent(e) or attempt == PERSIST_MAX_RETRIES or _stopping:
+                    return e
+                _stats["retries"] += 1
+                delay = min(PERSIST_BACKOFF * (2 ** attempt), 30.0) * random.uniform(0.5, 1.0)
+                # Тоқтату сигналы келсе, күтуді бірден үзу
+                _cond.wait_for(lambda: _stopping, delay)
+
+
+def _insert_items(table, items):
+    """(қайталанатындар, dead-letter [(item, қате), ...]) — сақталмаған жолдар"""
+    error = _insert_with_retry(table, [row for _, row, _ in items])
+    if error is None:
+        return [], []
+    if not _is_permanent(error):
+        return items, []
+    if len(items) == 1:
+        return [], [(items[0], error)]
+    # Бір жаман жол бүкіл партияны тоқтатпауы үшін: бір-бірлеп
+    retry, dead = [], []
+    for item in items:
+        item_retry, item_dead = _insert_items(table, [item])
+        retry.extend(item_retry)
+        dead.extend(item_dead)
+    return retry, dead
+
+
+def _file_error(where, error, lost=0):
+    with _cond:
+        _stats["last_error"] = f"{where}: {error}"
+        _stats["lost"] += lost
+
+
+def _store_unsaved(failed, dead):
+    """Сақталмаған жолдар: уақытша қате — журналға, қалғаны — dead-letter файлына.
+
+    Файл қатесі (диск толы, рұқсат жоқ) ағынды тоқтатпайды: журналға жазылмаған
+    жолдар жадтағы кезекке қайтады, dead-letter-ге жазылмағандары lost-қа саналады.
+    """
+    # PERSIST_MAX_REPLAYS рет қайталанғаны журналға емес, dead-letter-ге
+    retry = [(table, row, attempts + 1) for table, row, attempts in failed]
+    journal = [item for item in retry if item[2] <= PERSIST_MAX_REPLAYS]
+    expired = [item for item in retry if item[2] > PERSIST_MAX_REPLAYS]
+    try:
+        _spill(journal)
+    except OSError as e:
+        _file_error("journal", e)
+        with _cond:
+            _pending.extend(journal)
+            _cond.notify_all()
+    dead_letters = [(expired, f"{PERSIST_MAX_REPLAYS} рет қайталаудан кейін: {_stats['last_error']}")]
+    dead_letters += [([item], error) for item, error in dead]
+    for items, error in dead_letters:
+        try:
+            _dead_letter(items, error)
+        except OSError as e:
+            _file_error("dead-letter", e, lost=len(items))
+
+
+def _flush_batch(batch):
+    by_table = {}
+    for item in batch:
+        by_table.setdefault(item[0], []).append(item)
+
+    start = time.perf_counter()
+    unsaved = len(batch)
+    try:
+        failed = []
+        dead = []
+        for table, items in by_table.items():
+            table_failed, table_dead = _insert_items(table, items)
+            if len(table_failed) + len(table_dead) < len(items):
+                invalidate(table)
+            failed.extend(table_failed)
+            dead.extend(table_dead)
+        unsaved = len(failed) + len(dead)
+        _store_unsaved(failed, dead)
+    finally:
+        # Қате болса да: flush() күтушілері босатылады, _inflight тазаланады
+        with _cond:
+            _flush_ms.append((time.perf_counter() - start) * 1000)
+            _stats["batches"] += 1
+            _stats["flushed"] += len(batch) - unsaved
+            if unsaved:
+                _stats["failed_batches"] += 1
+            del _inflight[:]
+            _cond.notify_all()
+
+
+def _run():
+    while True:
+        batch = _next_batch()
+        if batch is None:
+            return
+        try:
+            _flush_batch(batch)
+        except Exception as e:
+            # Бір партияның күтпеген қатесі фондық ағынды өлтірмеуі керек
+            _file_error("flush", e, lost=len(batch))
+
+
+# -------------------- ЖАРИЯ API --------------------
+
+def start():
+    """Журналды қайталау және фондық ағынды іске қосу (қайта шақыру қауіпсіз)"""
+    global _worker
+    with _cond:
+        if _worker is not None:
+            return
+        _worker = threading.Thread(target=_run, name="persistence-queue", daemon=True)
+    try:
+        _replay_journal()
+    except OSError as e:
+        with _cond:
+            _stats["last_error"] = f"journal: {e}"
+    _worker.start()
+    atexit.register(shutdown)
+
+
+def enqueue(table, row):
+    """Жолды фондық жазуға қою (блоктамайды)"""
+    start()
+    with _cond:
+        _pending.append((table, row, 0))
+        _stats["enqueued"] += 1
+        _cond.notify_all()
+
+
+def flush(timeout=5.0) -> bool:
+    """Кезек босағанша күту (мысалы, тарихты оқу не өшіру алдында)"""
+    global _flush_requested
+    with _cond:
+        if not _pending and not _inflight:
+            return True
+        _flush_requested = True
+        _cond.notify_all()
+        return _cond.wait_for(lambda: not _pending and not _inflight, timeout)
+
+
+def shutdown(timeout=None):
+    """Ағынды тоқтату; үлгермеген жолдар журналға жазылады"""
+    global _stopping
+    with _cond:
+        if _worker is None or _stopping:
+            return
+        _stopping = True
+        _cond.notify_all()
+    _worker.join(PERSIST_SHUTDOWN_TIMEOUT if timeout is None else timeout)
+    with _cond:
+        leftover = list(_pending)
+        _pending.clear()
+        if _worker.is_alive():
+            # insert әлі аяқталмаған: жоғалтқаннан гөрі қайталаған дұрыс
+            leftover = list(_inflight) + leftover
+    try:
+        _spill(leftover)
+    except OSError as e:
+        _file_error("journal", e, lost=len(leftover))
+
+
+def queue_stats() -> dict:
+    """Кезек тереңдігі, flush кідірісі және журнал есептегіштері"""
+    with _cond:
+        stats = dict(_stats)
+        stats["depth"] = len(_pending) + len(_inflight)
+        latencies = sorted(_flush_ms)
+        stats["last_flush_ms"] = round(_flush_ms[-1], 1) if _flush_ms else None
+    stats["flush_p50_ms"] = round(latencies[len(latencies) // 2], 1) if latencies else None
+    stats["flush_p95_ms"] = round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)], 1) if latencies else None
+    stats["journal_path"] = PERSIST_JOURNAL_PATH
+    return stats